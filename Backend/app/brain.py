@@ -1,31 +1,35 @@
+import asyncio
+import logging
 import os
+import threading
+from types import SimpleNamespace
 from typing import TypedDict, Literal, Optional
-from langgraph.graph import StateGraph, END
 
-# LangChain Imports
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
+from app.config import global_state
+from app.services import canned_responses, grounding, tracing
 load_dotenv()
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-if not GROQ_API_KEY:
-    raise RuntimeError("No GROQ_API_KEY found.")
+logger = logging.getLogger("brain")
 
-llm_flash = ChatGroq(model="llama-3.3-70b-versatile", api_key=GROQ_API_KEY, temperature=0)
-llm_behavior = ChatGroq(model="llama-3.3-70b-versatile", api_key=GROQ_API_KEY, temperature=0)
+# LangChain / LangGraph are heavy to import (~1.5s) and the graph compile is not
+# free either, so both happen in _build_runtime() on first use (or in the
+# background via warm()) instead of at import time.
+
+LLM_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 
 class AgentState(TypedDict):
     """The shared memory passed between all agents."""
     user_input: str
     persona_prompt: str      # The personality instructions
+    persona_key: str         # Persona id (selects the canned END / SAFETY_BLOCK variant)
     knowledge_context: str   # The content of the uploaded PDF/Doc
-    intent: str              # Classified by Orchestrator (CHAT or END)
+    intent: str              # Classified by Orchestrator (CHAT, END or SAFETY_BLOCK)
     response_text: str       # Generated by Narrative
     is_grounded: bool        # Checked by Hallucination Grader
     behavior_json: dict      # Generated by Behavior
+    budgets: dict            # Per-node generation budget overrides (from the persona)
 
 # --- OUTPUT MODELS (PYDANTIC) ---
 
@@ -39,8 +43,19 @@ class AnimationSignal(BaseModel):
     gesture: str = Field(description="One of: idle, wave, bow, talk_excited, shrug, scratch_head")
 
 # --- PROMPTS ---
+# Each prompt is a sequence of segments, most stable first. Everything before
+# the "turn" segment is sent as the system message and is byte-identical across
+# the turns of a conversation, so providers with automatic prefix caching only
+# re-process the turn. The knowledge base leads in every node that reads it,
+# so the narrative and grader calls (and all personas) share that prefix too.
+# Report the cacheable share per persona with tools/prompt_cache_report.py.
+
+CONTEXT_SEGMENT = """
+KNOWLEDGE BASE (TRUTH SOURCE):
+{knowledge_context}
+"""
 
-ORCHESTRATOR_PROMPT = """
+ORCHESTRATOR_INSTRUCTIONS = """
 ROLE:
 You are the Router for an advanced AI Avatar system. Your ONLY job is to classify the user's input into a specific category. Do not answer the user. Do not be polite. Just classify.
 
@@ -50,64 +65,60 @@ CATEGORIES:
 3. SAFETY_BLOCK: The user is asking for illegal, harmful, or explicit content.
 
 INSTRUCTIONS:
-- Analyze the input below.
+- Analyze the user input.
 - Return ONLY the category name (CHAT, END, or SAFETY_BLOCK).
 - Do not add punctuation or explanation.
+"""
 
+ORCHESTRATOR_TURN = """
 USER INPUT:
 {user_input}
 """
 
-NARRATIVE_PROMPT = """
-IDENTITY & PERSONA:
-{persona_prompt}
-
-KNOWLEDGE BASE (TRUTH SOURCE):
-{knowledge_context}
-
+NARRATIVE_INSTRUCTIONS = """
 INSTRUCTIONS:
-1. You are the avatar described in the "IDENTITY" section. You must stay in character at all times.
+1. You are the avatar described in the "IDENTITY" section below. You must stay in character at all times.
 2. Your answers must be based PRIMARILY on the "KNOWLEDGE BASE" provided above.
 3. If the user asks a specific factual question (e.g., "What is your refund policy?") and the answer is NOT in the Knowledge Base, you must admit you do not know. Do not make up facts.
 4. Keep your responses short and spoken-style (under 3 sentences). Long blocks of text look bad on a 3D avatar.
 5. Do not use emojis. (The 3D model cannot render them).
-
-USER MESSAGE:
-{user_input}
 """
 
-GRADER_PROMPT = """
-You are a lenient fact-checker. 
-Compare the [Document], [User Input], and the [Response].
-
-[Document]: 
-{knowledge_context}
+NARRATIVE_PERSONA = """
+IDENTITY & PERSONA:
+{persona_prompt}
+"""
 
-[User Input]:
+NARRATIVE_TURN = """
+USER MESSAGE:
 {user_input}
+"""
 
-[Response]: 
-{response_text}
+GRADER_INSTRUCTIONS = """
+You are a lenient fact-checker.
+Compare the [User Input] and the [Response] with the KNOWLEDGE BASE above.
 
 TASK:
-Determine if the Response is consistent with the Document.
+Determine if the Response is consistent with the KNOWLEDGE BASE.
 - If the User Input is a greeting (hello, hi, hey, greetings, good morning, etc.) AND the Response is a greeting response, score 'yes' (greetings don't need to be in the document).
 - If the Response is just polite chit-chat ("Hello", "Sorry", "Thank you", "You're welcome"), score 'yes'.
-- If the Response implies facts not found in the Document, score 'no'.
-- If the Response matches the Document, score 'yes'.
+- If the Response implies facts not found in the KNOWLEDGE BASE, score 'no'.
+- If the Response matches the KNOWLEDGE BASE, score 'yes'.
 
 Be generous. If you are unsure, score 'yes'.
 """
 
-BEHAVIOR_PROMPT = """
-ROLE:
-You are the Animation Director for a 3D character. You do not write text; you output JSON instructions for the body and face.
+GRADER_TURN = """
+[User Input]:
+{user_input}
 
-USER INPUT (What the user said):
-"{user_input}"
+[Response]:
+{response_text}
+"""
 
-AVATAR RESPONSE (What the avatar is saying):
-"{response_text}"
+BEHAVIOR_INSTRUCTIONS = """
+ROLE:
+You are the Animation Director for a 3D character. You do not write text; you output JSON instructions for the body and face.
 
 AVAILABLE ANIMATIONS (Strict List):
 - Gestures: [idle, wave, talk]
@@ -130,16 +141,134 @@ You must return ONLY a raw JSON object. Do not wrap it in markdown blocks.
   "gesture": "selected_gesture"
 }}
 """
+
+BEHAVIOR_TURN = """
+USER INPUT (What the user said):
+"{user_input}"
+
+AVATAR RESPONSE (What the avatar is saying):
+"{response_text}"
+"""
+
+PROMPT_LAYOUTS = {
+    "orchestrator": (("instructions", ORCHESTRATOR_INSTRUCTIONS), ("turn", ORCHESTRATOR_TURN)),
+    "narrative": (("context", CONTEXT_SEGMENT), ("instructions", NARRATIVE_INSTRUCTIONS),
+                  ("persona", NARRATIVE_PERSONA), ("turn", NARRATIVE_TURN)),
+    "hallucination_check": (("context", CONTEXT_SEGMENT), ("instructions", GRADER_INSTRUCTIONS),
+                            ("turn", GRADER_TURN)),
+    "behavior": (("instructions", BEHAVIOR_INSTRUCTIONS), ("turn", BEHAVIOR_TURN)),
+}
+
+# Lookup Table for Personas (Hardcoded for Hackathon)
+PERSONAS = {
+    "sarcastic": "You are a sarcastic tech support agent. You are helpful but slightly rude.",
+    "professional": "You are a polite, corporate customer service representative.",
+    "excited": "You are a super high-energy sales rep! Use lots of exclamation marks."
+}
+
+# --- GENERATION BUDGETS ---
+# Per-node caps. The router answers with one word and the grader/behavior nodes
+# with a small tool call, so tight caps cost nothing and stop runaway replies;
+# the narrative cap keeps spoken replies (and TTS time) short. The grader's cap
+# leaves room for the tool-call envelope around its yes/no verdict: a truncated
+# verdict cannot be parsed.
+# A persona can override any of these via persona["budgets"], e.g.
+#   {"narrative": {"max_tokens": 200}}
+NODE_BUDGETS = {
+    "orchestrator": {"max_tokens": 6, "stop": ["\n"]},
+    "narrative": {"max_tokens": 160, "max_context_tokens": 6000},
+    "hallucination_check": {"max_tokens": 128},
+    "behavior": {"max_tokens": 64},
+}
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token) for prompt-size accounting."""
+    return (len(text) + 3) // 4
+
+def _node_budget(node: str, state: AgentState) -> dict:
+    budget = dict(NODE_BUDGETS.get(node, {}))
+    budget.update((state.get("budgets") or {}).get(node, {}))
+    return budget
+
+def _budgeted_llm(llm, node: str, state: AgentState):
+    """Copy of `llm` with the node's max_tokens/stop applied (cached per budget)."""
+    budget = _node_budget(node, state)
+    stop = budget.get("stop")
+    key = (id(llm), budget.get("max_tokens"), tuple(stop) if stop else None)
+    rt = _get_runtime()
+    cached = rt.budgeted_llms.get(key)
+    if cached is None:
+        cached = rt.budgeted_llms[key] = llm.model_copy(
+            update={"max_tokens": budget.get("max_tokens"), "stop": stop}
+        )
+    return cached
+
+def _truncate_context(text: str, max_tokens) -> str:
+    if not max_tokens or estimate_tokens(text) <= max_tokens:
+        return text
+    logger.debug("Knowledge context truncated to ~%d tokens", max_tokens)
+    tracing.set_attributes(context_truncated_to=max_tokens)
+    return text[: max_tokens * 4]
+
+def _knowledge_context(state: AgentState) -> str:
+    """The context as the narrative saw it; the grader reuses it so both share the prompt prefix."""
+    return _truncate_context(
+        state.get("knowledge_context") or "No context provided.",
+        _node_budget("narrative", state).get("max_context_tokens"),
+    )
+
+def render_segments(node: str, values: dict) -> list:
+    """[(segment, text), ...] of a node's prompt in PROMPT_LAYOUTS order."""
+    return [(segment, template.format(**values)) for segment, template in PROMPT_LAYOUTS[node]]
+
+def _build_prompt(node: str, values: dict):
+    """
+    Chat messages for a node: the static segments as one system message (the
+    cacheable prefix), the turn as the human message. Estimated tokens are
+    counted per segment; returns (messages, estimated prompt tokens).
+    """
+    rt = _get_runtime()
+    segments = render_segments(node, values)
+    total = 0
+    for segment, text in segments:
+        tokens = estimate_tokens(text)
+        total += tokens
+        global_state.incr(f"prompt.{node}.{segment}", tokens)
+    prefix = "".join(text for segment, text in segments if segment != "turn")
+    turn = "".join(text for segment, text in segments if segment == "turn")
+    return [rt.SystemMessage(content=prefix), rt.HumanMessage(content=turn)], total
+
+def _record_usage(node: str, message, estimated_prompt_tokens: int):
+    """Count tokens per node, preferring the provider's usage over estimates."""
+    usage = getattr(message, "usage_metadata", None)
+    cached_tokens = 0
+    if usage:
+        prompt_tokens = usage.get("input_tokens", 0)
+        completion_tokens = usage.get("output_tokens", 0)
+        # Prompt tokens served from the provider's prefix cache
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    else:
+        prompt_tokens = estimated_prompt_tokens
+        completion_tokens = estimate_tokens(str(getattr(message, "content", "") or ""))
+    tracing.set_attributes(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                           cached_tokens=cached_tokens)
+    global_state.incr(f"tokens.{node}.calls")
+    global_state.incr(f"tokens.{node}.prompt", prompt_tokens)
+    global_state.incr(f"tokens.{node}.completion", completion_tokens)
+    global_state.incr(f"tokens.{node}.cached", cached_tokens)
+
 # --- AGENT NODES ---
 
 def orchestrator_node(state: AgentState):
     """Classifies user intent."""
-    prompt = ChatPromptTemplate.from_template(ORCHESTRATOR_PROMPT)
-    chain = prompt | llm_flash
-    result = chain.invoke({"user_input": state["user_input"]})
+    rt = _get_runtime()
+    llm = _budgeted_llm(rt.llm_flash, "orchestrator", state)
+    messages, prompt_tokens = _build_prompt("orchestrator", {"user_input": state["user_input"]})
+    result = llm.invoke(messages)
+    _record_usage("orchestrator", result, prompt_tokens)
     
     cleaned_intent = result.content.strip().upper()
-    if cleaned_intent not in ["CHAT", "END"]:
+    if cleaned_intent not in ["CHAT", "END", "SAFETY_BLOCK"]:
         cleaned_intent = "CHAT" # Fallback
         
     print(f"--- ORCHESTRATOR: Intent is {cleaned_intent} ---")
@@ -147,34 +276,61 @@ def orchestrator_node(state: AgentState):
 
 def narrative_node(state: AgentState):
     """Generates the text response."""
-    prompt = ChatPromptTemplate.from_template(NARRATIVE_PROMPT)
-    chain = prompt | llm_flash
-    result = chain.invoke({
+    rt = _get_runtime()
+    llm = _budgeted_llm(rt.llm_flash, "narrative", state)
+    messages, prompt_tokens = _build_prompt("narrative", {
         "persona_prompt": state["persona_prompt"],
-        "knowledge_context": state.get("knowledge_context", "No context provided."),
+        "knowledge_context": _knowledge_context(state),
         "user_input": state["user_input"]
     })
+    result = llm.invoke(messages)
+    _record_usage("narrative", result, prompt_tokens)
     
     print(f"--- NARRATIVE: Generated text ---")
     return {"response_text": result.content}
 
-def hallucination_check_node(state: AgentState):
-    """Verifies if the text matches the knowledge base."""
-    structured_llm = llm_flash.with_structured_output(GradeHallucinations)
-    prompt = ChatPromptTemplate.from_template(GRADER_PROMPT)
-    chain = prompt | structured_llm
-    
-    score = chain.invoke({
-        "knowledge_context": state.get("knowledge_context", ""),
+def llm_grade(state: AgentState) -> bool:
+    """LLM grader verdict: True if the response is grounded in the knowledge context."""
+    rt = _get_runtime()
+    llm = _budgeted_llm(rt.llm_flash, "hallucination_check", state)
+    structured_llm = llm.with_structured_output(GradeHallucinations, include_raw=True)
+    messages, prompt_tokens = _build_prompt("hallucination_check", {
+        "knowledge_context": _knowledge_context(state),
         "user_input": state.get("user_input", ""),
         "response_text": state["response_text"]
     })
     
-    is_grounded = score.binary_score == 'yes'
+    result = structured_llm.invoke(messages)
+    _record_usage("hallucination_check", result["raw"], prompt_tokens)
+    score = result["parsed"]
+    if score is None:
+        # The grader is lenient by design, but an unparseable (e.g. truncated)
+        # verdict is counted and logged so a too-tight budget shows up in /metrics
+        global_state.incr("grounding.unparsed")
+        tracing.set_attributes(grounding_verdict="unparsed")
+        logger.warning("Grader verdict unparseable, accepting the response: %s", result.get("parsing_error"))
+        return True
+    return score.binary_score == 'yes'
+
+def hallucination_check_node(state: AgentState):
+    """Verifies if the text matches the knowledge base."""
+    # Cheap lexical pre-check first; only uncertain responses pay for the LLM grader
+    verdict = grounding.precheck(
+        state.get("user_input", ""), state["response_text"], state.get("knowledge_context", "")
+    )
+    tracing.set_attributes(grounding=verdict.reason)
+    if verdict.grounded:
+        global_state.incr("grounding.skipped")
+        logger.debug("Grader skipped (%s)", verdict.reason)
+        return {"is_grounded": True, "response_text": state["response_text"]}
+
+    global_state.incr("grounding.graded")
+    is_grounded = llm_grade(state)
     final_text = state['response_text']
     
     # If hallucination detected, override text
     if not is_grounded:
+        global_state.incr("grounding.rejected")
         print("--- GRADER: Hallucination Detected! Overriding. ---")
         final_text = "I apologize, but I cannot verify that information based on my internal guidelines."
     else:
@@ -187,23 +343,29 @@ def hallucination_check_node(state: AgentState):
 
 def behavior_node(state: AgentState):
     """Generates JSON for gestures."""
-    structured_llm = llm_behavior.with_structured_output(AnimationSignal)
-    prompt = ChatPromptTemplate.from_template(BEHAVIOR_PROMPT)
-    chain = prompt | structured_llm
-    
-    result = chain.invoke({
+    rt = _get_runtime()
+    llm = _budgeted_llm(rt.llm_behavior, "behavior", state)
+    structured_llm = llm.with_structured_output(AnimationSignal, include_raw=True)
+    messages, prompt_tokens = _build_prompt("behavior", {
         "user_input": state.get("user_input", ""),
         "response_text": state["response_text"]
     })
     
-    print(f"--- BEHAVIOR: {result.json()} ---")
-    return {"behavior_json": result.dict()}
-
-def end_node(state: AgentState):
-    """Hardcoded exit response."""
+    result = structured_llm.invoke(messages)
+    _record_usage("behavior", result["raw"], prompt_tokens)
+    signal = result["parsed"] or AnimationSignal(emotion="neutral", gesture="talk")
+    
+    print(f"--- BEHAVIOR: {signal.model_dump_json()} ---")
+    return {"behavior_json": signal.model_dump()}
+
+def canned_node(state: AgentState):
+    """Fixed per-persona reply for END and SAFETY_BLOCK (app/services/canned_responses.py); no LLM call."""
+    canned = canned_responses.reply(state["intent"], state.get("persona_key"))
+    logger.debug("Canned %s reply", state["intent"])
+    tracing.set_attributes(intent=state["intent"])
     return {
-        "response_text": "Goodbye! Have a great day.",
-        "behavior_json": {"emotion": "happy", "gesture": "wave"}
+        "response_text": canned["text"],
+        "behavior_json": canned["signals"]
     }
 
 # --- GRAPH CONSTRUCTION ---
@@ -211,41 +373,85 @@ def end_node(state: AgentState):
 def route_decision(state: AgentState):
     if state["intent"] == "END":
         return "end_conversation"
+    if state["intent"] == "SAFETY_BLOCK":
+        return "safety_block"
     return "narrative"
 
-workflow = StateGraph(AgentState)
-
-# Add Nodes
-workflow.add_node("orchestrator", orchestrator_node)
-workflow.add_node("narrative", narrative_node)
-workflow.add_node("hallucination_check", hallucination_check_node)
-workflow.add_node("behavior", behavior_node)
-workflow.add_node("end_conversation", end_node)
-
-# Entry Point
-workflow.set_entry_point("orchestrator")
-
-# Edges
-workflow.add_conditional_edges(
-    "orchestrator",
-    route_decision,
-    {
-        "narrative": "narrative",
-        "end_conversation": "end_conversation"
-    }
-)
-
-workflow.add_edge("narrative", "hallucination_check")
-workflow.add_edge("hallucination_check", "behavior")
-workflow.add_edge("behavior", END)
-workflow.add_edge("end_conversation", END)
-
-# Compile Application
-brain_app = workflow.compile()
+def _build_runtime():
+    """Import LangChain/LangGraph, create the LLM clients and compile the graph."""
+    GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    if not GROQ_API_KEY:
+        raise RuntimeError("No GROQ_API_KEY found.")
+
+    from langchain_core.messages import HumanMessage, SystemMessage
+    from langchain_groq import ChatGroq
+    from langgraph.graph import StateGraph, END
+
+    llm_flash = ChatGroq(model=LLM_MODEL, api_key=GROQ_API_KEY, temperature=0)
+    llm_behavior = ChatGroq(model=LLM_MODEL, api_key=GROQ_API_KEY, temperature=0)
+
+    workflow = StateGraph(AgentState)
+
+    # Add Nodes (each run is a span of the request trace when sampled)
+    workflow.add_node("orchestrator", tracing.traced("brain.orchestrator")(orchestrator_node))
+    workflow.add_node("narrative", tracing.traced("brain.narrative")(narrative_node))
+    workflow.add_node("hallucination_check", tracing.traced("brain.hallucination_check")(hallucination_check_node))
+    workflow.add_node("behavior", tracing.traced("brain.behavior")(behavior_node))
+    workflow.add_node("end_conversation", tracing.traced("brain.end_conversation")(canned_node))
+    workflow.add_node("safety_block", tracing.traced("brain.safety_block")(canned_node))
+
+    # Entry Point
+    workflow.set_entry_point("orchestrator")
+
+    # Edges
+    workflow.add_conditional_edges(
+        "orchestrator",
+        route_decision,
+        {
+            "narrative": "narrative",
+            "end_conversation": "end_conversation",
+            "safety_block": "safety_block"
+        }
+    )
+
+    workflow.add_edge("narrative", "hallucination_check")
+    workflow.add_edge("hallucination_check", "behavior")
+    workflow.add_edge("behavior", END)
+    workflow.add_edge("end_conversation", END)
+    # Refusals skip narrative, grader and behavior entirely
+    workflow.add_edge("safety_block", END)
+
+    # Compile Application
+    return SimpleNamespace(
+        llm_flash=llm_flash,
+        llm_behavior=llm_behavior,
+        SystemMessage=SystemMessage,
+        HumanMessage=HumanMessage,
+        budgeted_llms={},
+        brain_app=workflow.compile(),
+    )
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+def _get_runtime():
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = _build_runtime()
+    return _runtime
+
+def is_loaded() -> bool:
+    return _runtime is not None
+
+def warm():
+    """Load the runtime ahead of the first request (blocking; run it off the event loop)."""
+    _get_runtime()
 
 # --- HELPER FOR FASTAPI ---
 
-async def run_chat_brain(user_input: str, persona_key: str = None, context_text: str = "", persona_prompt: str = None):
+async def run_chat_brain(user_input: str, persona_key: str = None, context_text: str = "", persona_prompt: str = None, budgets: dict = None):
     """
     Main entry point to be called by FastAPI.
     
@@ -254,14 +460,8 @@ async def run_chat_brain(user_input: str, persona_key: str = None, context_text:
         persona_key: Optional persona ID to lookup (e.g., "professional", "sarcastic")
         context_text: The knowledge context/knowledge base text
         persona_prompt: Optional direct persona prompt (overrides persona_key if provided)
+        budgets: Optional per-node overrides of NODE_BUDGETS
     """
-    # Lookup Table for Personas (Hardcoded for Hackathon)
-    PERSONAS = {
-        "sarcastic": "You are a sarcastic tech support agent. You are helpful but slightly rude.",
-        "professional": "You are a polite, corporate customer service representative.",
-        "excited": "You are a super high-energy sales rep! Use lots of exclamation marks."
-    }
-    
     # Use direct persona_prompt if provided, otherwise lookup by persona_key
     final_persona_prompt = persona_prompt
     if not final_persona_prompt:
@@ -270,14 +470,22 @@ async def run_chat_brain(user_input: str, persona_key: str = None, context_text:
     inputs = {
         "user_input": user_input,
         "persona_prompt": final_persona_prompt,
-        "knowledge_context": context_text
+        "persona_key": persona_key or "professional",
+        "knowledge_context": context_text,
+        "budgets": budgets or {}
     }
     
+    # Requests that arrive before the background warm() finishes wait for it in a
+    # thread: building the runtime (or waiting on its lock) must not block the event loop
+    if not is_loaded():
+        await asyncio.to_thread(warm)
+
     # Run the graph
-    result = await brain_app.ainvoke(inputs)
+    result = await _get_runtime().brain_app.ainvoke(inputs)
     
     return {
         "text": result["response_text"],
-        "behavior": result["behavior_json"]
+        "behavior": result["behavior_json"],
+        "intent": result.get("intent", "CHAT")
     }
 
@@ -1,8 +1,209 @@
 import asyncio
+import multiprocessing
+import os
+from typing import Optional
+
+# Upstream concurrency limits (global across workers in multi-worker mode)
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "6"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
 
 # Limit concurrent TTS calls
-TTS_SEMAPHORE = asyncio.Semaphore(6)
+TTS_SEMAPHORE = asyncio.Semaphore(TTS_CONCURRENCY)
+# Limit concurrent brain (LLM) runs
+LLM_SEMAPHORE = asyncio.Semaphore(LLM_CONCURRENCY)
+
+# Brain nodes that call the LLM (token usage is counted per node)
+BRAIN_NODES = ("orchestrator", "narrative", "hallucination_check", "behavior")
+
+# Prompt segments, most stable first (estimated tokens are counted per node and segment)
+PROMPT_SEGMENTS = ("context", "instructions", "persona", "turn")
+
+# TTS backends (calls, failures and synthesis time are counted per backend)
+TTS_BACKEND_NAMES = ("edge", "espeak")
+
+# Metrics state: fixed counter names so every worker maps them to the same slot
+COUNTERS = (
+    "requests",
+    "latency_ms_total",
+    "ws.sessions_opened",
+    "ws.sessions_closed",
+    "ws.turns",
+    "ws.dropped_frames",
+    "ws.slow_closes",
+    "grounding.skipped",
+    "grounding.graded",
+    "grounding.rejected",
+    "grounding.unparsed",
+    "disk.read_bytes",
+    "disk.write_bytes",
+    "disk.metered_requests",
+    "canned.hits",
+    "canned.misses",
+) + tuple(f"tokens.{node}.{kind}" for node in BRAIN_NODES for kind in ("calls", "prompt", "completion", "cached")) \
+  + tuple(f"prompt.{node}.{segment}" for node in BRAIN_NODES for segment in PROMPT_SEGMENTS) \
+  + tuple(f"tts.{name}.{kind}" for name in TTS_BACKEND_NAMES for kind in ("calls", "failures", "ms"))
+_COUNTER_INDEX = {name: i for i, name in enumerate(COUNTERS)}
+_local_counters = dict.fromkeys(COUNTERS, 0.0)
+
+# Startup state: component -> ready flag (/health/ready requires all of them),
+# plus per-phase timings in ms and load errors
+readiness = {}
+startup_profile = {}
+startup_errors = {}
+
+# Set by enable_multiprocess() in the launcher, before workers are forked
+WORKERS = 1
+# Index of this worker (set by serve.py in each forked worker)
+WORKER_INDEX = 0
+_shared_counters = None
+_shared_semaphores = []
+_leader_flags = {}
+# pid of each worker index, and one pipe per worker for messages relayed to it
+_worker_pids = None
+_relay_pipes = []
+
+
+class SharedSemaphore:
+    """
+    Async context manager over a cross-process semaphore.
+
+    multiprocessing semaphores block the thread, so acquisition is polled with
+    a short exponential backoff instead of blocking the event loop.
+    Permits are counted per worker, so the launcher can return the permits of
+    a worker that died while holding them (reclaim()).
+    """
+
+    def __init__(self, value: int, ctx, workers: int, min_poll: float = 0.002, max_poll: float = 0.05):
+        self._sem = ctx.BoundedSemaphore(value)
+        # Each slot is written only by its own worker (and by the launcher once it is dead)
+        self._held = ctx.Array("i", workers, lock=False)
+        self._min_poll = min_poll
+        self._max_poll = max_poll
+
+    async def __aenter__(self):
+        delay = self._min_poll
+        while not self._sem.acquire(block=False):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._max_poll)
+        self._held[WORKER_INDEX] += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._sem.release()
+        self._held[WORKER_INDEX] -= 1
+
+    def reclaim(self, index: int) -> int:
+        """Release the permits a dead worker still held; returns how many."""
+        released = 0
+        for _ in range(self._held[index]):
+            try:
+                self._sem.release()
+            except ValueError:  # died between its release and the bookkeeping
+                break
+            released += 1
+        self._held[index] = 0
+        return released
+
+
+def enable_multiprocess(workers: int):
+    """
+    Switch limits, counters and leader election to shared memory.
+    Must run in the launcher process before forking workers.
+    """
+    global TTS_SEMAPHORE, LLM_SEMAPHORE, WORKERS, _shared_counters, _worker_pids
+
+    ctx = multiprocessing.get_context("fork")
+    WORKERS = workers
+    TTS_SEMAPHORE = SharedSemaphore(TTS_CONCURRENCY, ctx, workers)
+    LLM_SEMAPHORE = SharedSemaphore(LLM_CONCURRENCY, ctx, workers)
+    _shared_semaphores[:] = [TTS_SEMAPHORE, LLM_SEMAPHORE]
+    _shared_counters = ctx.Array("d", len(COUNTERS))
+    # 0 = unclaimed, otherwise the leader's WORKER_INDEX + 1
+    _leader_flags["prewarm"] = ctx.Value("i", 0)
+    _leader_flags["scratch_sweep"] = ctx.Value("i", 0)
+    _worker_pids = ctx.Array("i", workers, lock=False)
+    # (reader, writer, write lock): any worker writes, only the owning worker reads
+    _relay_pipes[:] = [(*ctx.Pipe(duplex=False), ctx.Lock()) for _ in range(workers)]
+
+
+def incr(name: str, value: float = 1):
+    if _shared_counters is None:
+        _local_counters[name] += value
+        return
+    with _shared_counters.get_lock():
+        _shared_counters[_COUNTER_INDEX[name]] += value
+
+
+def counters() -> dict:
+    """Counter values, aggregated across all workers in multi-worker mode."""
+    if _shared_counters is None:
+        return dict(_local_counters)
+    with _shared_counters.get_lock():
+        return {name: _shared_counters[i] for name, i in _COUNTER_INDEX.items()}
+
+
+def record_request(elapsed_ms: float):
+    incr("requests")
+    incr("latency_ms_total", elapsed_ms)
+
+
+def claim_leader(role: str) -> bool:
+    """True for exactly one worker per role (always True in single-process mode)."""
+    flag = _leader_flags.get(role)
+    if flag is None:
+        return True
+    with flag.get_lock():
+        if flag.value:
+            return False
+        flag.value = WORKER_INDEX + 1
+        return True
+
+
+def reclaim_worker(index: int) -> dict:
+    """
+    Undo what a dead worker held: semaphore permits go back to the pool and its
+    leader roles become claimable again (by the replacement worker, on startup).
+    Called by the launcher after reaping the worker.
+    """
+    permits = sum(sem.reclaim(index) for sem in _shared_semaphores)
+    roles = []
+    for role, flag in _leader_flags.items():
+        with flag.get_lock():
+            if flag.value == index + 1:
+                flag.value = 0
+                roles.append(role)
+    return {"permits": permits, "roles": roles}
+
+
+# --- Cross-worker relay ---
+
+def register_worker():
+    """Record this worker's pid under its index (serve.py, right after fork)."""
+    if _worker_pids is not None:
+        _worker_pids[WORKER_INDEX] = os.getpid()
+
+
+def relay_enabled() -> bool:
+    return bool(_relay_pipes)
+
+
+def worker_index_of(pid: int) -> Optional[int]:
+    """Index of the live worker with this pid, or None (unknown, or since restarted)."""
+    if _worker_pids is None:
+        return None
+    for index in range(WORKERS):
+        if _worker_pids[index] == pid:
+            return index
+    return None
+
+
+def relay(index: int, message: bytes):
+    """Send a message to worker `index` (blocking; run it off the event loop)."""
+    _, writer, lock = _relay_pipes[index]
+    with lock:
+        writer.send_bytes(message)
+
 
-# Metrics state
-requests_count = 0
-total_latency = 0
+def relay_inbox():
+    """This worker's end of its relay pipe (None in single-process mode)."""
+    return _relay_pipes[WORKER_INDEX][0] if _relay_pipes else None
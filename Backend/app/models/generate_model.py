@@ -6,8 +6,13 @@ class GenerateRequest(BaseModel):
     persona: Optional[Dict[str, Any]] = None
     # Accept either a dict payload or a simple string for context.
     nodeGraph: Optional[Union[Dict[str, Any], str]] = None
+    # Inline audio as base64 only up to this size; 0 = URL only.
+    # None uses the server default (AUDIO_INLINE_MAX_BYTES).
+    inline_audio_max_bytes: Optional[int] = None
 
 class GenerateResponse(BaseModel):
     text: str
-    audio: str        # base64
+    audio: str        # base64 (empty when not inlined)
+    audio_url: str    # /audio/{content hash}, "" when there is no audio
+    audio_mime: str   # "audio/mpeg", or "audio/wav" from a local TTS backend
     signals: Dict     # e.g. {"gesture":"wave"}
@@ -0,0 +1,55 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
+from app.services import animation_catalog
+
+router = APIRouter()
+
+# Clip bytes never change for a given hash, and the manifest is revalidated by ETag
+CLIP_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MANIFEST_CACHE_CONTROL = "public, max-age=300, must-revalidate"
+
+
+def _split(values: str):
+    return [v.strip() for v in values.split(",") if v.strip()]
+
+
+@router.get("/manifest")
+async def manifest(request: Request):
+    """Full clip catalog: per-clip metadata plus signal -> candidate clip mapping."""
+    data = await asyncio.to_thread(animation_catalog.get_manifest)
+    etag = f'"{animation_catalog.manifest_etag()}"'
+    headers = {"ETag": etag, "Cache-Control": MANIFEST_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(data, headers=headers)
+
+
+@router.get("/preload")
+async def preload(body: str = "feminine", gestures: str = "idle,talk,wave", emotions: str = ""):
+    """
+    Only the clips needed for the given gestures/emotions, e.g.
+    /animations/preload?body=feminine&gestures=idle,talk,wave&emotions=happy
+    """
+    if body not in animation_catalog.BODY_TYPES:
+        raise HTTPException(status_code=400, detail=f"body must be one of {animation_catalog.BODY_TYPES}")
+    await asyncio.to_thread(animation_catalog.get_manifest)
+    clips = animation_catalog.preload_set(body, _split(gestures), _split(emotions))
+    for clip in clips:
+        clip["url"] = f"/animations/clips/{clip['id']}.glb"
+    return {"body": body, "clips": clips, "bytes": sum(c["bytes"] for c in clips)}
+
+
+@router.get("/clips/{clip_id:path}.glb")
+async def clip(clip_id: str, request: Request):
+    """Serve an indexed GLB clip with immutable caching keyed by its content hash."""
+    await asyncio.to_thread(animation_catalog.get_manifest)
+    path = animation_catalog.clip_path(clip_id)
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=404, detail="Clip not found")
+
+    etag = f'"{animation_catalog.get_manifest()["clips"][clip_id]["hash"]}"'
+    headers = {"ETag": etag, "Cache-Control": CLIP_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="model/gltf-binary", headers=headers)
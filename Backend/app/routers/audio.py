@@ -0,0 +1,72 @@
+import os
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from app.services import cache_service, canned_responses, audio_store, scratch_space, tts_service
+
+router = APIRouter()
+
+# Clips are content-addressed, so a URL's bytes never change
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def _parse_range(header: str, size: int):
+    """Parse a single "bytes=start-end" range; None if unsatisfiable."""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_s, _, end_s = spec.strip().partition("-")
+    try:
+        if not start_s:  # suffix range: last N bytes
+            length = int(end_s)
+            if length <= 0:
+                return None
+            return max(size - length, 0), size - 1
+        start = int(start_s)
+        end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+@router.api_route("/{audio_hash}", methods=["GET", "HEAD"])
+async def get_audio(audio_hash: str, request: Request):
+    """Serve a synthesized clip by content hash with ETag, caching and Range support."""
+    if not audio_store.is_valid_hash(audio_hash):
+        raise HTTPException(status_code=404, detail="Audio not found")
+
+    etag = f'"{audio_hash}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Accept-Ranges": "bytes"}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    # Canned replies are pinned in memory for the life of the process
+    audio = cache_service.audio_cache.get(audio_hash) or canned_responses.clip(audio_hash)
+    if audio is None:
+        # Synthesized by another worker or evicted from memory: serve the stored file
+        path = audio_store.path_for(audio_hash)
+        if path is None:
+            raise HTTPException(status_code=404, detail="Audio not found")
+        with open(path, "rb") as f:
+            media_type = tts_service.audio_media_type(f.read(12))
+        scratch_space.record_read(os.path.getsize(path))
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    size = len(audio)
+    media_type = tts_service.audio_media_type(audio)
+    range_header = request.headers.get("range")
+    if range_header:
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        # memoryview slice: no copy of the cached clip
+        return Response(memoryview(audio)[start:end + 1], status_code=206,
+                        media_type=media_type, headers=headers)
+
+    return Response(audio, media_type=media_type, headers=headers)
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.services import tracing
+
+router = APIRouter()
+
+@router.get("/traces")
+async def traces(
+    order: str = Query("slowest", pattern="^(slowest|recent)$"),
+    limit: int = Query(20, ge=1, le=1000),
+    format: str = Query("summary", pattern="^(summary|otlp)$"),
+):
+    """
+    Flight recorder of this worker: the slowest (or most recent) sampled requests.
+    format=otlp returns OTLP/JSON that can be posted to an OpenTelemetry collector.
+    """
+    found = tracing.recorder.slowest(limit) if order == "slowest" else tracing.recorder.recent(limit)
+    if format == "otlp":
+        return tracing.to_otlp(found)
+    return {
+        "sample_rate": tracing.TRACE_SAMPLE_RATE,
+        "recorded": tracing.recorder.recorded,
+        "traces": [tracing.summary(t) for t in found],
+    }
+
+@router.get("/traces/{trace_id}")
+async def trace_detail(trace_id: str, format: str = Query("summary", pattern="^(summary|otlp)$")):
+    """One trace by trace id or request id (X-Request-ID)."""
+    found = tracing.recorder.find(trace_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Trace not recorded (not sampled or evicted)")
+    return tracing.to_otlp([found]) if format == "otlp" else tracing.summary(found)
@@ -1,132 +1,253 @@
 from fastapi import APIRouter, HTTPException
-from app.models.generate_model import GenerateRequest
-from app.services import tts_service, cache_service
-from app.config.global_state import TTS_SEMAPHORE, requests_count, total_latency
+from app.models.generate_model import GenerateRequest, GenerateResponse
+from app.services import tts_service, cache_service, cache_keys, audio_store, audio_metadata, canned_responses, tracing, fast_json, scratch_space
+from app.services.circuit_breaker import get_breaker, CircuitOpenError
+from app.config import global_state
 
 import logging
+import os
 import time
 import asyncio
 import base64
-from typing import Dict
+from typing import Any, Dict, Optional, Tuple
 
 # --- Router ---
-router = APIRouter()
+router = APIRouter(route_class=fast_json.ORJSONRoute)
 logger = logging.getLogger("generate")
 
+# --- Upstream timeouts ---
+BRAIN_TIMEOUT_S = float(os.getenv("BRAIN_TIMEOUT_S", "20"))
+TTS_TIMEOUT_S = float(os.getenv("TTS_TIMEOUT_S", "10"))
+
+# Clips up to this size are inlined as base64 besides the URL; -1 = always inline
+AUDIO_INLINE_MAX_BYTES = int(os.getenv("AUDIO_INLINE_MAX_BYTES", "-1"))
+
 # --- Import brain.py ---
 try:
     from .. import brain
     run_chat_brain = brain.run_chat_brain
+    LLM_UPSTREAM = f"llm:{brain.LLM_MODEL}"
 except ImportError:
     logger.warning("'brain.py' not found. Using fallback brain.")
+    LLM_UPSTREAM = "llm:fallback"
 
     async def run_chat_brain(user_input: str, persona_key: str, context_text: str) -> Dict:
         return {"response_text": f"Echo: {user_input}", "behavior_json": {"gesture": "idle"}}
 
 
-@router.post("/")
-async def generate(req: GenerateRequest):
+async def call_brain(cache_key: str, **kwargs) -> Dict:
     """
-    Process a GenerateRequest:
+    Call the brain behind the LLM circuit breaker.
+    Raises CircuitOpenError / TimeoutError / upstream errors to the caller.
+    """
+    if cache_key in cache_service.negative_cache:
+        raise CircuitOpenError("brain input recently failed")
+
+    breaker = get_breaker(LLM_UPSTREAM)
+    breaker.check()
+    try:
+        with tracing.span("brain"):
+            async with tracing.acquire("llm.semaphore_wait", global_state.LLM_SEMAPHORE):
+                result = await asyncio.wait_for(run_chat_brain(**kwargs), timeout=BRAIN_TIMEOUT_S)
+    except Exception:
+        breaker.record_failure()
+        cache_service.negative_cache[cache_key] = True
+        raise
+    breaker.record_success()
+    return result
+
+
+async def synthesize(text: str, voice: str, tts_cache_key: str) -> Tuple[bytes, str, bool]:
+    """
+    TTS behind the per-voice circuit breaker; successful audio is stored under
+    its content hash and, unless a fallback backend produced it, cached by
+    `tts_cache_key`.
+    Returns (audio, content hash, cached), or (silent audio, "", False) when the
+    upstream is failing: the placeholder is neither cached nor served under a URL.
+    """
+    if tts_cache_key in cache_service.negative_cache:
+        return tts_service.SILENT_MP3, "", False
+
+    breaker = get_breaker(f"tts:{voice}")
+    if not breaker.allow():
+        logger.warning("TTS breaker open for %s, returning silent audio", voice)
+        return tts_service.SILENT_MP3, "", False
+
+    start = time.perf_counter()
+    try:
+        with tracing.span("tts.synthesize", voice=voice, chars=len(text)) as tts_span:
+            async with tracing.acquire("tts.semaphore_wait", global_state.TTS_SEMAPHORE):
+                audio, backend = await asyncio.wait_for(
+                    tts_service.synthesize(text, voice=voice), timeout=TTS_TIMEOUT_S
+                )
+            tts_span.set(bytes=len(audio), backend=backend)
+    except Exception:
+        logger.exception("TTS generation failed")
+        audio = b""
+
+    if not audio:
+        breaker.record_failure()
+        cache_service.negative_cache[tts_cache_key] = True
+        return tts_service.SILENT_MP3, "", False
+
+    breaker.record_success()
+    # Synthesis time is the eviction cost: slow clips are the ones worth keeping
+    audio_hash = cache_service.put_audio(audio, cost=(time.perf_counter() - start) * 1000)
+    cached = tts_service.is_cacheable(backend)
+    if cached:
+        cache_service.audio_index[tts_cache_key] = audio_hash
+    # Duration/bitrate/levels, parsed once here and cached next to the clip
+    audio_metadata.for_clip(audio_hash, audio)
+    audio_store.schedule_save(audio_hash, audio)
+    logger.info(f"TTS generated audio successfully with {backend} ({len(audio)} bytes)")
+    return audio, audio_hash, cached
+
+
+async def run_turn(prompt: str, persona: Optional[Dict[str, Any]] = None, node_graph=None) -> Dict:
+    """
+    One conversational turn, shared by POST /generate/ and the WebSocket session:
     1. Check AI cache
     2. Call brain.py if not cached
-    3. Generate TTS audio (base64)
-    4. Update request metrics
+    3. Generate TTS audio (cached by text + voice); END / SAFETY_BLOCK / FALLBACK
+       replies use their pinned canned clip instead
+    Returns {"text", "signals", "audio" (MP3 bytes), "audio_hash" ("" for the
+    silent placeholder, which has no URL)}; signals carry
+    the clip's "audio_meta" (duration_ms, bitrate_kbps, peak_db, rms_db, ...).
     """
-    global requests_count, total_latency
-
-    if len(req.prompt) > 5000:
-        raise HTTPException(status_code=400, detail="Prompt too long")
-
-    start_time = time.time()
+    persona_dict = persona or {}
+    persona_key = persona_dict.get("id", "professional")
 
     # --- 1) AI Cache ---
-    cache_key = (req.prompt, str(req.persona))
-    ai_out = cache_service.ai_cache.get(cache_key)
+    with tracing.span("cache.brain_lookup") as lookup_span:
+        cache_key = cache_keys.brain_key(prompt, persona, node_graph)
+        ai_out = cache_service.ai_cache.get(cache_key)
+        lookup_span.set(hit=bool(ai_out))
     if ai_out:
         logger.info("🧠 Brain Cache Hit")
     else:
         # --- 2) Call brain.py ---
         # Map API fields to brain.py variables:
-        # - req.prompt → user_input
-        # - req.nodeGraph (string) → knowledge_context
-        # - req.persona.prompt or req.persona.persona_prompt → persona_prompt (direct)
-        # - req.persona.id → persona_key (fallback lookup)
-        context_text = req.nodeGraph if isinstance(req.nodeGraph, str) else ""
-        persona_dict = req.persona or {}
+        # - prompt → user_input
+        # - nodeGraph (string) → knowledge_context
+        # - persona.prompt or persona.persona_prompt → persona_prompt (direct)
+        # - persona.id → persona_key (fallback lookup)
+        context_text = node_graph if isinstance(node_graph, str) else ""
         persona_prompt = persona_dict.get("prompt") or persona_dict.get("persona_prompt")
-        persona_key = persona_dict.get("id", "professional")
-        
+
         try:
-            logger.info(f"Calling brain with: user_input='{req.prompt[:50]}...', persona_key='{persona_key}', context_len={len(context_text)}")
-            brain_result = await run_chat_brain(
-                user_input=req.prompt,
+            logger.info(f"Calling brain with: user_input='{prompt[:50]}...', persona_key='{persona_key}', context_len={len(context_text)}")
+            brain_result = await call_brain(
+                cache_key,
+                user_input=prompt,
                 persona_key=persona_key,
                 context_text=context_text,
-                persona_prompt=persona_prompt
+                persona_prompt=persona_prompt,
+                budgets=persona_dict.get("budgets")
             )
             logger.info(f"Brain returned type: {type(brain_result)}, value: {brain_result}")
             
             if not brain_result:
                 logger.error("Brain returned None or empty result")
-                ai_out = {"text": "Brain returned empty result", "signals": {"gesture": "idle"}}
+                ai_out = {**canned_responses.reply("FALLBACK", persona_key), "intent": "FALLBACK"}
             else:
                 # brain.py returns {"text": ..., "behavior": ...}
                 # Handle both formats for compatibility
                 text = brain_result.get("text") or brain_result.get("response_text") or ""
                 signals = brain_result.get("behavior") or brain_result.get("behavior_json") or {}
-                ai_out = {"text": text, "signals": signals}
+                ai_out = {"text": text, "signals": signals, "intent": brain_result.get("intent", "CHAT")}
                 logger.info(f"Extracted ai_out: text='{text[:100] if text else '(empty)'}', signals={signals}")
                 cache_service.ai_cache[cache_key] = ai_out
-        except Exception as e:
+        except CircuitOpenError as e:
+            logger.warning("Brain fast-fail: %s", e)
+            ai_out = {**canned_responses.reply("FALLBACK", persona_key), "intent": "FALLBACK"}
+        except Exception:
             logger.exception("❌ Brain failed")
-            ai_out = {"text": f"Error processing prompt: {str(e)}", "signals": {"gesture": "idle"}}
+            ai_out = {**canned_responses.reply("FALLBACK", persona_key), "intent": "FALLBACK"}
 
     text = ai_out.get("text", "")
     signals = ai_out.get("signals", {})
+    intent = ai_out.get("intent", "CHAT")
 
     # --- 3) TTS (with cache) ---
-    persona_dict = req.persona or {}
-    voice = persona_dict.get("voice", "en-US-GuyNeural")
+    voice = persona_dict.get("voice", tts_service.DEFAULT_VOICE)
     
     # Validate text before TTS
-    if not text or not text.strip():
+    audio_hash = ""
+    canned = canned_responses.audio_for(intent, persona_key, voice, text) if canned_responses.is_canned(intent) else None
+    if canned:
+        audio_hash, audio = canned
+        # Keep the stored copy fresh for workers that have not pinned this clip
+        audio_store.schedule_save(audio_hash, audio)
+    elif not text or not text.strip():
         logger.warning("Empty text received from brain, skipping TTS")
-        audio_b64 = ""
+        audio = b""
     else:
-        tts_cache_key = f"{text}::{voice}"
-        audio_b64 = cache_service.audio_cache.get(tts_cache_key)
-
-        if not audio_b64:
-            try:
-                logger.info(f"TTS input (voice={voice}): {text[:200]}")
-                async with TTS_SEMAPHORE:
-                    audio_b64 = await tts_service.text_to_speech_base64(text, voice=voice)
-                if audio_b64:
-                    cache_service.audio_cache[tts_cache_key] = audio_b64
-                    logger.info(f"TTS generated audio successfully ({len(audio_b64)} chars base64)")
-                else:
-                    logger.warning("TTS returned empty audio")
-            except Exception as e:
-                logger.exception("TTS generation failed")
-                audio_b64 = ""
-
-    # --- 4) Debug: Save MP3 locally ---
-    if audio_b64:
-        try:
-            with open("audio.mp3", "wb") as f:
-                f.write(base64.b64decode(audio_b64))
-            logger.info("Debug MP3 written to audio_output.mp3")
-        except Exception as e:
-            logger.warning("Failed to write debug MP3: %s", e)
+        with tracing.span("cache.audio_lookup") as lookup_span:
+            tts_cache_key = cache_keys.audio_key(text, voice)
+            cached = cache_service.lookup_audio(tts_cache_key)
+            lookup_span.set(hit=cached is not None)
 
-    # --- 5) Update metrics ---
-    elapsed_ms = (time.time() - start_time) * 1000
-    requests_count += 1
-    total_latency += elapsed_ms
-    logger.info("✅ Generate processed in %.1fms", elapsed_ms)
+        if cached:
+            audio_hash, audio = cached
+        else:
+            logger.info(f"TTS input (voice={voice}): {text[:200]}")
+            audio, audio_hash, cached = await synthesize(text, voice, tts_cache_key)
+            if cached and canned_responses.is_canned(intent):
+                canned_responses.remember(intent, persona_key, voice, text, audio_hash, audio)
 
-    return {"text": text, "audio": audio_b64, "signals": signals}
+    # A copy: the brain's signals dict is shared with the AI cache
+    audio_meta = audio_metadata.for_clip(audio_hash, audio) if audio_hash else None
+    if audio_meta:
+        signals = {**signals, "audio_meta": audio_meta}
+
+    return {"text": text, "signals": signals, "audio": audio, "audio_hash": audio_hash}
+
+
+@router.post("/", response_model=GenerateResponse)
+async def generate(req: GenerateRequest):
+    """
+    Process a GenerateRequest:
+    1. Run the turn (brain + TTS, both cached)
+    2. Return the audio URL, plus base64 audio when small enough
+    3. Update request metrics
+    The response is built with model_construct() and serialized once with orjson.
+    """
+    if len(req.prompt) > 5000:
+        raise HTTPException(status_code=400, detail="Prompt too long")
+
+    start_time = time.time()
+    disk_io = scratch_space.start_meter()
+
+    turn = await run_turn(req.prompt, req.persona, req.nodeGraph)
+    text, signals, audio = turn["text"], turn["signals"], turn["audio"]
+
+    # Audio is served by content hash from /audio/; inline it only when small enough
+    audio_url = f"/audio/{turn['audio_hash']}" if turn["audio_hash"] else ""
+    inline_max = req.inline_audio_max_bytes
+    if inline_max is None:
+        inline_max = AUDIO_INLINE_MAX_BYTES
+    inline = audio and (inline_max < 0 or len(audio) <= inline_max)
+    audio_b64 = base64.b64encode(audio).decode("utf-8") if inline else ""
+
+    # --- Debug: sampled audio capture (DEBUG_AUDIO_SAMPLE_RATE), written off the event loop ---
+    audio_mime = tts_service.audio_media_type(audio) if audio else ""
+    scratch_space.capture_debug_audio(audio, tracing.current_request_id(),
+                                      ext="wav" if audio_mime == "audio/wav" else "mp3")
+
+    # --- Update metrics ---
+    elapsed_ms = (time.time() - start_time) * 1000
+    global_state.record_request(elapsed_ms)
+    tracing.set_attributes(**disk_io.as_dict())
+    logger.info("✅ Generate processed in %.1fms (request %s, disk r/w %d/%d bytes)", elapsed_ms,
+                tracing.current_request_id(), disk_io.read_bytes, disk_io.write_bytes)
+
+    return fast_json.json_response(GenerateResponse.model_construct(
+        text=text,
+        audio=audio_b64,
+        audio_url=audio_url,
+        audio_mime=audio_mime,
+        signals=signals,
+    ))
 
 
 
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.config import global_state
+
+router = APIRouter()
+
+@router.get("/live")
+async def live():
+    """Liveness: the process is up and serving the event loop."""
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def ready():
+    """Readiness: every startup component has finished loading."""
+    is_ready = all(global_state.readiness.values())
+    body = {
+        "status": "ready" if is_ready else "starting",
+        "components": dict(global_state.readiness),
+        "startup_ms": dict(global_state.startup_profile),
+        "errors": dict(global_state.startup_errors),
+    }
+    return JSONResponse(body, status_code=200 if is_ready else 503)
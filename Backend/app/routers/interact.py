@@ -14,7 +14,8 @@
 
 from fastapi import APIRouter
 from app.models.request_model import InteractRequest
-from app.services.tts_service import text_to_speech_base64
+from app.services import scratch_space
+from app.services.tts_service import audio_media_type, text_to_speech_base64
 import base64
 
 router = APIRouter()
@@ -30,8 +31,9 @@ async def interact(req: InteractRequest):
     # decode base64 to raw bytes to save
     audio_bytes = base64.b64decode(audio_b64)
 
-    with open("debug_output.wav", "wb") as f:
-        f.write(audio_bytes)
+    scratch_space.capture_debug_audio(
+        audio_bytes, "interact", ext="wav" if audio_media_type(audio_bytes) == "audio/wav" else "mp3"
+    )
 
     # Simple behavior mapping (mock)
     behavior = {"gesture": "idle", "emotion": "neutral"}
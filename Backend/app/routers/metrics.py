@@ -1,10 +1,65 @@
+import os
 from fastapi import APIRouter
+from app.config import global_state
+from app.services import cache_service, cache_keys, cache_snapshot, canned_responses, scratch_space, session_hub, tts_backends
+from app.services.circuit_breaker import breaker_stats
 
 router = APIRouter()
-requests_count = 0
-total_latency = 0
 
 @router.get("/metrics")
 async def metrics():
-    avg_latency = total_latency / requests_count if requests_count else 0
-    return {"requests": requests_count, "avg_latency_ms": avg_latency}
+    counters = global_state.counters()
+    requests_count = int(counters["requests"])
+    avg_latency = counters["latency_ms_total"] / requests_count if requests_count else 0
+    return {
+        # request counters are aggregated across workers; cache and breaker
+        # stats below are for the worker that served this request
+        "workers": global_state.WORKERS,
+        "worker_pid": os.getpid(),
+        "requests": requests_count,
+        "avg_latency_ms": avg_latency,
+        "cache": {
+            "ai_entries": len(cache_service.ai_cache),
+            "audio": cache_service.audio_cache.stats(),
+            "key_cardinality": cache_keys.key_stats(),
+            "negative_entries": len(cache_service.negative_cache),
+            "snapshot": cache_snapshot.stats(),
+            # END / SAFETY_BLOCK / FALLBACK replies served with pinned audio (hits aggregated across workers)
+            "canned": canned_responses.stats(),
+        },
+        "breakers": breaker_stats(),
+        # disk bytes are aggregated across workers; write_bytes_per_request covers /generate/
+        "disk": scratch_space.stats(),
+        "tts_backends": tts_backends.stats(),
+        "sessions": {
+            **session_hub.stats(),
+            "opened": int(counters["ws.sessions_opened"]),
+            "closed": int(counters["ws.sessions_closed"]),
+            "turns": int(counters["ws.turns"]),
+            "dropped_frames": int(counters["ws.dropped_frames"]),
+            "slow_closes": int(counters["ws.slow_closes"]),
+        },
+        "grounding": {
+            # skipped = accepted by the local pre-check, graded = sent to the LLM grader,
+            # unparsed = graded but the verdict could not be read (accepted)
+            "skipped": int(counters["grounding.skipped"]),
+            "graded": int(counters["grounding.graded"]),
+            "rejected": int(counters["grounding.rejected"]),
+            "unparsed": int(counters["grounding.unparsed"]),
+        },
+        "tokens": {
+            node: {
+                "calls": int(counters[f"tokens.{node}.calls"]),
+                "prompt": int(counters[f"tokens.{node}.prompt"]),
+                "completion": int(counters[f"tokens.{node}.completion"]),
+                # prompt tokens the provider served from its prefix cache
+                "cached": int(counters[f"tokens.{node}.cached"]),
+                # estimated prompt tokens per segment (all but "turn" form the cacheable prefix)
+                "segments": {
+                    segment: int(counters[f"prompt.{node}.{segment}"])
+                    for segment in global_state.PROMPT_SEGMENTS
+                },
+            }
+            for node in global_state.BRAIN_NODES
+        },
+    }
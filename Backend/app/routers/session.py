@@ -0,0 +1,137 @@
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from app.routers.generate import run_turn
+from app.routers.trigger import TriggerActionRequest
+from app.services import session_hub, tracing, tts_service, fast_json
+from app.config import global_state
+
+import asyncio
+import logging
+import os
+import time
+
+# --- Router ---
+router = APIRouter()
+logger = logging.getLogger("session")
+
+# Audio is pushed as binary frames of this size after the reply frame
+WS_AUDIO_CHUNK_BYTES = int(os.getenv("WS_AUDIO_CHUNK_BYTES", "16384"))
+# Chat turns run one at a time per session; further ones wait here (or are refused)
+WS_MAX_PENDING_TURNS = int(os.getenv("WS_MAX_PENDING_TURNS", "4"))
+MAX_PROMPT_CHARS = 5000
+
+# Protocol (JSON text frames unless noted)
+#   client -> server
+#     {"type": "session", "persona": {...}, "nodeGraph": ...}   defaults for later turns
+#     {"type": "chat", "id": "...", "prompt": "...", ["persona"], ["nodeGraph"], ["trace": true]}
+#     {"type": "trigger", "action": "wave"}
+#     {"type": "ping"} / {"type": "pong"}
+#   server -> client
+#     {"type": "hello", "session_id": "...", "heartbeat_s": 20}
+#     {"type": "reply", "id", "text", "signals", "audio_url", "audio_bytes", "audio_mime"}
+#     <binary MP3 chunks>, then {"type": "audio_end", "id"}
+#     {"type": "behavior", "behavior": "wave", "source": "client" | "server"}
+#     {"type": "ping"} / {"type": "pong"} / {"type": "error", "id", "detail"}
+
+
+async def _run_chat(session: session_hub.Session, msg: dict, defaults: dict):
+    start_time = time.time()
+    turn_id = msg.get("id")
+    prompt = msg.get("prompt")
+    if not isinstance(prompt, str) or not prompt or len(prompt) > MAX_PROMPT_CHARS:
+        await session.send({"type": "error", "id": turn_id, "detail": "Invalid or too long prompt"})
+        return
+
+    turn = await run_turn(
+        prompt,
+        msg.get("persona", defaults.get("persona")),
+        msg.get("nodeGraph", defaults.get("nodeGraph")),
+    )
+    audio = turn["audio"]
+    await session.send({
+        "type": "reply",
+        "id": turn_id,
+        "text": turn["text"],
+        "signals": turn["signals"],
+        "audio_url": f"/audio/{turn['audio_hash']}" if turn["audio_hash"] else "",
+        "audio_bytes": len(audio),
+        "audio_mime": tts_service.audio_media_type(audio) if audio else "",
+    })
+    if audio:
+        view = memoryview(audio)
+        for offset in range(0, len(audio), WS_AUDIO_CHUNK_BYTES):
+            await session.send(bytes(view[offset: offset + WS_AUDIO_CHUNK_BYTES]))
+        await session.send({"type": "audio_end", "id": turn_id})
+
+    global_state.incr("ws.turns")
+    global_state.record_request((time.time() - start_time) * 1000)
+
+
+async def _turn_worker(session: session_hub.Session, turns: asyncio.Queue, defaults: dict):
+    """Drains queued chat turns in order, then exits (idle sessions hold no worker)."""
+    while not turns.empty() and not session.closed:
+        msg = turns.get_nowait()
+        try:
+            with tracing.trace("WS chat", force=msg.get("trace") is True, session_id=session.id):
+                await _run_chat(session, msg, defaults)
+        except Exception:
+            logger.exception("Session %s turn failed", session.id)
+            await session.send({"type": "error", "id": msg.get("id"), "detail": "Turn failed"})
+
+
+@router.websocket("/ws/session")
+async def session_socket(websocket: WebSocket):
+    """Long-lived channel multiplexing chat turns, audio, behaviors and heartbeats."""
+    await websocket.accept()
+    session = session_hub.Session(websocket)
+    session_hub.register(session)
+    session.offer({"type": "hello", "session_id": session.id, "heartbeat_s": session_hub.WS_HEARTBEAT_S})
+
+    defaults = {}
+    turns: asyncio.Queue = asyncio.Queue(maxsize=WS_MAX_PENDING_TURNS)
+    worker = None
+
+    try:
+        while not session.closed:
+            try:
+                msg = fast_json.loads(await websocket.receive_text())
+            except (ValueError, KeyError):
+                session.offer({"type": "error", "detail": "Expected a JSON text frame"})
+                continue
+            session.touch()
+            kind = msg.get("type") if isinstance(msg, dict) else None
+
+            if kind == "chat":
+                try:
+                    turns.put_nowait(msg)
+                except asyncio.QueueFull:
+                    session.offer({"type": "error", "id": msg.get("id"), "detail": "Too many pending turns"})
+                    continue
+                if worker is None or worker.done():
+                    worker = asyncio.create_task(_turn_worker(session, turns, defaults))
+            elif kind == "session":
+                for field in ("persona", "nodeGraph"):
+                    if field in msg:
+                        defaults[field] = msg[field]
+            elif kind == "trigger":
+                try:
+                    action = TriggerActionRequest(action=msg.get("action", "idle")).action
+                except ValidationError:
+                    session.offer({"type": "error", "detail": "Unknown action"})
+                    continue
+                session.offer({"type": "behavior", "behavior": action, "source": "client"})
+            elif kind == "ping":
+                session.offer({"type": "pong", "t": msg.get("t")})
+            elif kind == "pong":
+                pass
+            else:
+                session.offer({"type": "error", "detail": f"Unknown message type: {kind}"})
+    except WebSocketDisconnect:
+        pass
+    except RuntimeError as e:
+        # receive after close (e.g. closed by the heartbeat or a slow-client timeout)
+        logger.debug("Session %s receive stopped: %s", session.id, e)
+    finally:
+        if worker is not None:
+            worker.cancel()
+        await session_hub.unregister(session)
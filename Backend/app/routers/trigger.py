@@ -1,30 +1,45 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Literal
+from typing import Literal, Optional
+from app.services import session_hub
 
 router = APIRouter()
 
 class TriggerActionRequest(BaseModel):
     """Request model for triggering avatar actions."""
     action: Literal["wave", "nod", "idle"] = "idle"
+    # Push to one WebSocket session only; None = every connected session
+    session_id: Optional[str] = None
 
 class TriggerActionResponse(BaseModel):
     """Response model for trigger action endpoint."""
     success: bool
     behavior: str
     message: str
+    delivered: int = 0  # WebSocket sessions of the serving worker the behavior was pushed to
+    forwarded: int = 0  # other workers it was relayed to (they deliver to their own sessions)
 
 @router.post("/trigger-action", response_model=TriggerActionResponse)
 async def trigger_action(req: TriggerActionRequest):
     """
     Simple endpoint to trigger avatar behaviors.
-    Returns JSON response with the behavior to trigger.
+    Returns JSON response with the behavior to trigger, and pushes it to
+    connected /ws/session clients of every worker.
+    404 if `session_id` is given but that session is not connected.
     """
     behavior = req.action
+    try:
+        delivered, forwarded = await session_hub.dispatch(
+            {"type": "behavior", "behavior": behavior, "source": "server"}, session_id=req.session_id
+        )
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Session not found")
     
     return {
         "success": True,
         "behavior": behavior,
-        "message": f"Triggered {behavior} animation"
+        "message": f"Triggered {behavior} animation",
+        "delivered": delivered,
+        "forwarded": forwarded,
     }
 
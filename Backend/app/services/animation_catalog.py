@@ -0,0 +1,241 @@
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.services.glb import GLBError, read_glb_json
+
+logger = logging.getLogger("animation_catalog")
+
+# Backend/ lives next to animation-library-master/ in this repo
+_REPO_ROOT = Path(__file__).resolve().parents[3]
+ANIMATION_LIBRARY_DIR = Path(os.getenv("ANIMATION_LIBRARY_DIR", _REPO_ROOT / "animation-library-master"))
+ANIMATION_MANIFEST_PATH = Path(os.getenv(
+    "ANIMATION_MANIFEST_PATH", _REPO_ROOT / "Backend" / "animation_manifest.json"
+))
+# Optional JSON file overriding SIGNAL_RULES (same shape) with curated clip patterns
+ANIMATION_SIGNAL_MAP = os.getenv("ANIMATION_SIGNAL_MAP", "")
+
+MANIFEST_VERSION = 1
+BODY_TYPES = ("feminine", "masculine")
+
+# Keep preload small: at most this many candidate clips per signal value
+MAX_CANDIDATES = 3
+
+# Signal value -> clip id patterns ("<category>/<clip name>"), first match first.
+# Gestures come from AnimationSignal / trigger actions, emotions from AnimationSignal.
+# Only signals the library names are mapped here: its Standing_Expressions clips
+# are just numbered, so wave/nod/bow/shrug/scratch_head and the other emotions
+# stay unmapped (preload falls back to the idle clips) until ANIMATION_SIGNAL_MAP
+# supplies a curated mapping.
+SIGNAL_RULES = {
+    "gesture": {
+        "idle": ["idle/*Standing_Idle_0*", "idle/*Standing_Idle_Variations*"],
+        "talk": ["expression/*Talking_Variations*"],
+        "talk_excited": ["expression/*Talking_Variations*", "dance/*"],
+    },
+    "emotion": {
+        "neutral": ["idle/*Standing_Idle*"],
+        "happy": ["dance/*"],
+    },
+}
+
+# Preloaded for signals without candidate clips
+FALLBACK_GESTURE = "idle"
+
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def describe_clip(gltf: Dict[str, Any]) -> Dict[str, Any]:
+    """Duration, bone count and keyframe stats from a clip's glTF JSON."""
+    accessors = gltf.get("accessors", [])
+    duration = 0.0
+    keyframes = 0
+    animated_nodes = set()
+    tracks = 0
+    for anim in gltf.get("animations", []):
+        for sampler in anim.get("samplers", []):
+            times = accessors[sampler["input"]]
+            duration = max(duration, (times.get("max") or [0.0])[0])
+            keyframes = max(keyframes, times.get("count", 0))
+        for channel in anim.get("channels", []):
+            tracks += 1
+            node = channel.get("target", {}).get("node")
+            if node is not None:
+                animated_nodes.add(node)
+    return {
+        "duration_s": round(duration, 3),
+        "bones": len(animated_nodes),
+        "nodes": len(gltf.get("nodes", [])),
+        "tracks": tracks,
+        "keyframes": keyframes,
+    }
+
+
+def scan_library(root: Path = None, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Index every clip under <root>/<body>/glb/<category>/*.glb.
+    Entries from `previous` are reused when file size and mtime are unchanged,
+    so re-running the scan only re-reads new or modified clips.
+    """
+    root = Path(root or ANIMATION_LIBRARY_DIR)
+    previous_clips = (previous or {}).get("clips", {})
+    clips = {}
+
+    for body in BODY_TYPES:
+        glb_dir = root / body / "glb"
+        if not glb_dir.is_dir():
+            continue
+        for path in sorted(glb_dir.glob("*/*.glb")):
+            category = path.parent.name
+            clip_id = f"{body}/{category}/{path.stem}"
+            stat = path.stat()
+
+            old = previous_clips.get(clip_id)
+            if old and old.get("bytes") == stat.st_size and old.get("mtime") == int(stat.st_mtime):
+                clips[clip_id] = old
+                continue
+
+            try:
+                info = describe_clip(read_glb_json(str(path)))
+            except (GLBError, OSError, ValueError, KeyError, IndexError) as e:
+                logger.warning("Skipping %s: %s", path, e)
+                continue
+
+            clips[clip_id] = {
+                "name": path.stem,
+                "body": body,
+                "category": category,
+                "path": path.relative_to(root).as_posix(),
+                "bytes": stat.st_size,
+                "mtime": int(stat.st_mtime),
+                "hash": _file_hash(path),
+                **info,
+            }
+
+    return {
+        "version": MANIFEST_VERSION,
+        "generated_at": int(time.time()),
+        "clips": clips,
+        "signals": map_signals(clips),
+    }
+
+
+def _load_rules() -> Dict[str, Dict[str, List[str]]]:
+    if not ANIMATION_SIGNAL_MAP:
+        return SIGNAL_RULES
+    with open(ANIMATION_SIGNAL_MAP) as f:
+        overrides = json.load(f)
+    rules = {kind: dict(values) for kind, values in SIGNAL_RULES.items()}
+    for kind, values in overrides.items():
+        rules.setdefault(kind, {}).update(values)
+    return rules
+
+
+def map_signals(clips: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """body -> signal kind -> value -> candidate clip ids (smallest first)."""
+    rules = _load_rules()
+    signals = {}
+    for body in BODY_TYPES:
+        body_clips = sorted(
+            (c for c in clips.items() if c[1]["body"] == body),
+            key=lambda item: (item[1]["bytes"], item[0]),
+        )
+        by_kind = {}
+        for kind, values in rules.items():
+            by_kind[kind] = {}
+            for value, patterns in values.items():
+                picked = []
+                for pattern in patterns:
+                    for clip_id, clip in body_clips:
+                        if clip_id in picked:
+                            continue
+                        if fnmatch.fnmatch(f"{clip['category']}/{clip['name']}", pattern):
+                            picked.append(clip_id)
+                    if len(picked) >= MAX_CANDIDATES:
+                        break
+                by_kind[kind][value] = picked[:MAX_CANDIDATES]
+        signals[body] = by_kind
+    return signals
+
+
+def write_manifest(manifest: Dict[str, Any], path: Path = None):
+    path = Path(path or ANIMATION_MANIFEST_PATH)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, separators=(",", ":"), sort_keys=True))
+    os.replace(tmp_path, path)
+
+
+def load_manifest(path: Path = None) -> Optional[Dict[str, Any]]:
+    path = Path(path or ANIMATION_MANIFEST_PATH)
+    try:
+        manifest = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def build_manifest(path: Path = None, root: Path = None) -> Dict[str, Any]:
+    """Incrementally rebuild the manifest file and return it."""
+    manifest = scan_library(root, previous=load_manifest(path))
+    write_manifest(manifest, path)
+    return manifest
+
+
+# --- Cached manifest for the API ---
+_manifest = None
+_manifest_etag = None
+
+
+def get_manifest() -> Dict[str, Any]:
+    """Manifest from disk, or scanned in-process if no manifest file exists yet."""
+    global _manifest, _manifest_etag
+    if _manifest is None:
+        manifest = load_manifest()
+        if manifest is None:
+            logger.info("No animation manifest at %s, scanning library", ANIMATION_MANIFEST_PATH)
+            manifest = scan_library()
+        _manifest = manifest
+        _manifest_etag = hashlib.blake2b(
+            json.dumps(manifest["clips"], sort_keys=True).encode("utf-8"), digest_size=16
+        ).hexdigest()
+    return _manifest
+
+
+def manifest_etag() -> str:
+    get_manifest()
+    return _manifest_etag
+
+
+def preload_set(body: str, gestures: List[str], emotions: List[str]) -> List[Dict[str, Any]]:
+    """The few clips a persona needs for the given gestures/emotions (unmapped ones get the idle clips)."""
+    manifest = get_manifest()
+    signals = manifest["signals"].get(body, {})
+    fallback = signals.get("gesture", {}).get(FALLBACK_GESTURE, [])
+    clip_ids = []
+    for kind, values in (("gesture", gestures), ("emotion", emotions)):
+        for value in values:
+            for clip_id in signals.get(kind, {}).get(value) or fallback:
+                if clip_id not in clip_ids:
+                    clip_ids.append(clip_id)
+    return [{"id": clip_id, **manifest["clips"][clip_id]} for clip_id in clip_ids]
+
+
+def clip_path(clip_id: str) -> Optional[Path]:
+    """Filesystem path of an indexed clip (only manifest entries are servable)."""
+    clip = get_manifest()["clips"].get(clip_id)
+    if clip is None:
+        return None
+    return ANIMATION_LIBRARY_DIR / clip["path"]
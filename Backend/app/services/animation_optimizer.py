@@ -0,0 +1,416 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from app.services import animation_catalog
+from app.services.glb import build_glb, read_glb
+
+logger = logging.getLogger("animation_optimizer")
+
+# Offline pipeline: library clips -> one animation-only GLB bundle per body type.
+#   1. read every clip's animation tracks (nothing else is kept)
+#   2. optionally resample to a fixed frame rate
+#   3. drop keyframes that interpolation reproduces within tolerance
+#   4. quantize rotations to normalized int16 (core glTF 2.0, no extension needed)
+#   5. write all clips against a single shared skeleton, with identical
+#      accessors stored once
+# Processed clips are cached by source content hash + settings, so re-runs only
+# touch new or changed clips.
+
+_BACKEND_DIR = Path(__file__).resolve().parents[2]
+ANIMATION_BUNDLE_DIR = Path(os.getenv("ANIMATION_BUNDLE_DIR", _BACKEND_DIR / "animation_bundles"))
+
+DEFAULT_SETTINGS = {
+    "fps": 0,                       # 0 = keep source key times
+    "rotation_tolerance_deg": 0.25,
+    "translation_tolerance": 0.0005,  # metres
+    "scale_tolerance": 0.0005,
+    "quantize_rotations": True,
+}
+
+FLOAT = 5126
+SHORT = 5122
+_COMPONENTS = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4}
+_COMPONENT_FORMAT = {5120: "b", 5121: "B", 5122: "h", 5123: "H", 5125: "I", 5126: "f"}
+_NORMALIZE = {5120: 127.0, 5121: 255.0, 5122: 32767.0, 5123: 65535.0}
+
+PIPELINE_VERSION = 1
+
+
+# --- accessor I/O ---
+
+def read_accessor(gltf: Dict[str, Any], bin_chunk: bytes, index: int) -> List[Tuple[float, ...]]:
+    accessor = gltf["accessors"][index]
+    view = gltf["bufferViews"][accessor["bufferView"]]
+    comp = accessor["componentType"]
+    width = _COMPONENTS[accessor["type"]]
+    fmt = _COMPONENT_FORMAT[comp]
+    item_size = struct.calcsize(fmt)
+    stride = view.get("byteStride") or item_size * width
+    start = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+    count = accessor["count"]
+
+    if stride == item_size * width:
+        flat = array(fmt, bin_chunk[start: start + count * stride])
+        rows = [tuple(flat[i * width:(i + 1) * width]) for i in range(count)]
+    else:
+        unpack = struct.Struct("<" + fmt * width).unpack_from
+        rows = [unpack(bin_chunk, start + i * stride) for i in range(count)]
+
+    if accessor.get("normalized") and comp in _NORMALIZE:
+        scale = _NORMALIZE[comp]
+        rows = [tuple(max(v / scale, -1.0) for v in row) for row in rows]
+    return rows
+
+
+# --- interpolation and error metrics ---
+
+def _lerp(a, b, t):
+    return tuple(x + (y - x) * t for x, y in zip(a, b))
+
+
+def _slerp(a, b, t):
+    dot = sum(x * y for x, y in zip(a, b))
+    if dot < 0.0:
+        b = tuple(-y for y in b)
+        dot = -dot
+    if dot > 0.9995:
+        out = _lerp(a, b, t)
+    else:
+        theta = math.acos(dot)
+        sin_theta = math.sin(theta)
+        wa = math.sin((1 - t) * theta) / sin_theta
+        wb = math.sin(t * theta) / sin_theta
+        out = tuple(wa * x + wb * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(v * v for v in out)) or 1.0
+    return tuple(v / norm for v in out)
+
+
+def _rotation_error(a, b) -> float:
+    """Angle between two rotations, in radians (inputs need not be exactly unit length)."""
+    norm = math.sqrt(sum(x * x for x in a) * sum(y * y for y in b)) or 1.0
+    dot = abs(sum(x * y for x, y in zip(a, b))) / norm
+    return 2.0 * math.acos(min(dot, 1.0))
+
+
+def _vector_error(a, b) -> float:
+    return max(abs(x - y) for x, y in zip(a, b))
+
+
+def _interp(path, interpolation):
+    if interpolation == "STEP":
+        return lambda a, b, t: a
+    return _slerp if path == "rotation" else _lerp
+
+
+def sample(times, values, t, path, interpolation="LINEAR"):
+    """Evaluate a track at time t."""
+    if t <= times[0]:
+        return values[0]
+    if t >= times[-1]:
+        return values[-1]
+    lo, hi = 0, len(times) - 1
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if times[mid] <= t:
+            lo = mid
+        else:
+            hi = mid
+    span = times[hi] - times[lo]
+    u = (t - times[lo]) / span if span else 0.0
+    return _interp(path, interpolation)(values[lo], values[hi], u)
+
+
+# --- per-track optimization ---
+
+def resample(times, values, fps, path, interpolation):
+    if fps <= 0 or len(times) < 2:
+        return times, values
+    step = 1.0 / fps
+    frames = int(math.floor((times[-1] - times[0]) / step + 1e-6))
+    new_times = [times[0] + i * step for i in range(frames + 1)]
+    if new_times[-1] < times[-1] - 1e-6:
+        new_times.append(times[-1])
+    return new_times, [sample(times, values, t, path, interpolation) for t in new_times]
+
+
+def reduce_keyframes(times, values, path, tolerance, interpolation="LINEAR"):
+    """
+    Drop keys that interpolation between the surrounding kept keys reproduces
+    within `tolerance`. Greedy: each segment is extended while every original
+    key inside it stays within tolerance.
+    """
+    n = len(times)
+    if n <= 2 or interpolation == "CUBICSPLINE":
+        return times, values
+
+    error = _rotation_error if path == "rotation" else _vector_error
+    interp = _interp(path, interpolation)
+
+    # Constant track: a single key holds the pose for the whole clip
+    if all(error(values[0], v) <= tolerance for v in values[1:]):
+        return [times[0]], [values[0]]
+
+    kept = [0]
+    anchor = 0
+    j = 2
+    while j < n:
+        fits = True
+        t0, t1 = times[anchor], times[j]
+        for k in range(anchor + 1, j):
+            u = (times[k] - t0) / (t1 - t0) if t1 > t0 else 0.0
+            if error(interp(values[anchor], values[j], u), values[k]) > tolerance:
+                fits = False
+                break
+        if fits:
+            j += 1
+        else:
+            anchor = j - 1
+            kept.append(anchor)
+            j = anchor + 2
+    kept.append(n - 1)
+    return [times[i] for i in kept], [values[i] for i in kept]
+
+
+def quantize_rotation(values):
+    """Normalized int16 quaternions (what the GPU/three.js will decode)."""
+    ints = [tuple(int(round(max(-1.0, min(1.0, v)) * 32767)) for v in q) for q in values]
+    return ints, [tuple(c / 32767.0 for c in q) for q in ints]
+
+
+# --- clips ---
+
+def skeleton_of(gltf: Dict[str, Any]) -> Dict[str, Any]:
+    """Node hierarchy (names, rest pose, children) without meshes/skins/cameras."""
+    nodes = []
+    for node in gltf["nodes"]:
+        out = {"name": node.get("name", "")}
+        for key in ("translation", "rotation", "scale", "children"):
+            if key in node:
+                out[key] = node[key]
+        nodes.append(out)
+    roots = gltf.get("scenes", [{}])[gltf.get("scene", 0)].get("nodes", [0])
+    return {"nodes": nodes, "roots": roots}
+
+
+def skeleton_signature(skeleton: Dict[str, Any]) -> str:
+    """Identity of a skeleton's topology: node names and parent/child links."""
+    shape = [(n["name"], n.get("children", [])) for n in skeleton["nodes"]]
+    return hashlib.blake2b(json.dumps(shape).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def optimize_clip(path: Path, settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Read one GLB clip and return its optimized tracks plus a size/accuracy report."""
+    gltf, bin_chunk = read_glb(str(path))
+    skeleton = skeleton_of(gltf)
+    names = [n["name"] for n in skeleton["nodes"]]
+
+    tolerances = {
+        "rotation": math.radians(settings["rotation_tolerance_deg"]),
+        "translation": settings["translation_tolerance"],
+        "scale": settings["scale_tolerance"],
+    }
+
+    tracks = []
+    keys_before = keys_after = 0
+    max_error = {"rotation": 0.0, "translation": 0.0, "scale": 0.0}
+
+    for anim in gltf.get("animations", []):
+        for channel in anim["channels"]:
+            target = channel["target"]
+            target_path = target["path"]
+            if target_path not in tolerances or target.get("node") is None:
+                continue  # morph target weights etc. are not used by the avatar
+            sampler = anim["samplers"][channel["sampler"]]
+            interpolation = sampler.get("interpolation", "LINEAR")
+            times = [t[0] for t in read_accessor(gltf, bin_chunk, sampler["input"])]
+            values = read_accessor(gltf, bin_chunk, sampler["output"])
+            keys_before += len(times)
+
+            new_times, new_values = resample(times, values, settings["fps"], target_path, interpolation)
+            new_times, new_values = reduce_keyframes(
+                new_times, new_values, target_path, tolerances[target_path], interpolation
+            )
+            stored = new_values
+            if target_path == "rotation" and settings["quantize_rotations"] and interpolation != "CUBICSPLINE":
+                stored, new_values = quantize_rotation(new_values)
+            keys_after += len(new_times)
+
+            # Accuracy against every source key, after reduction and quantization
+            error = _rotation_error if target_path == "rotation" else _vector_error
+            if interpolation != "CUBICSPLINE":
+                worst = max(
+                    error(sample(new_times, new_values, t, target_path, interpolation), v)
+                    for t, v in zip(times, values)
+                )
+                max_error[target_path] = max(max_error[target_path], worst)
+
+            tracks.append({
+                "node": names[target["node"]],
+                "path": target_path,
+                "interpolation": interpolation,
+                "times": new_times,
+                "values": [list(v) for v in stored],
+                "quantized": stored is not new_values,
+            })
+
+    return {
+        "name": gltf.get("animations", [{}])[0].get("name") or path.stem,
+        "skeleton": skeleton,
+        "signature": skeleton_signature(skeleton),
+        "tracks": tracks,
+        "report": {
+            "source_bytes": path.stat().st_size,
+            "tracks": len(tracks),
+            "keys_before": keys_before,
+            "keys_after": keys_after,
+            "max_rotation_error_deg": round(math.degrees(max_error["rotation"]), 4),
+            "max_translation_error": round(max_error["translation"], 6),
+            "max_scale_error": round(max_error["scale"], 6),
+        },
+    }
+
+
+# --- bundle writer ---
+
+class _BinaryBuilder:
+    """Accumulates accessors into one buffer, storing identical data once."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.buffer_views = []
+        self.accessors = []
+        self._by_content = {}
+
+    def add(self, rows, accessor_type, component_type, normalized=False, with_bounds=False) -> int:
+        fmt = _COMPONENT_FORMAT[component_type]
+        flat = array(fmt, [v for row in rows for v in row])
+        if flat.itemsize != struct.calcsize(fmt):
+            raise RuntimeError("unexpected array item size")
+        payload = flat.tobytes()
+        key = (accessor_type, component_type, normalized, payload)
+        if key in self._by_content:
+            return self._by_content[key]
+
+        self.data.extend(b"\x00" * (-len(self.data) % 4))
+        self.buffer_views.append({"buffer": 0, "byteOffset": len(self.data), "byteLength": len(payload)})
+        self.data.extend(payload)
+
+        accessor = {
+            "bufferView": len(self.buffer_views) - 1,
+            "componentType": component_type,
+            "count": len(rows),
+            "type": accessor_type,
+        }
+        if normalized:
+            accessor["normalized"] = True
+        if with_bounds:
+            width = len(rows[0])
+            accessor["min"] = [min(r[i] for r in rows) for i in range(width)]
+            accessor["max"] = [max(r[i] for r in rows) for i in range(width)]
+        self.accessors.append(accessor)
+        index = self._by_content[key] = len(self.accessors) - 1
+        return index
+
+
+def build_bundle(clips: List[Dict[str, Any]]) -> bytes:
+    """One GLB: the shared skeleton once, plus one animation per clip."""
+    skeleton = clips[0]["skeleton"]
+    node_index = {n["name"]: i for i, n in enumerate(skeleton["nodes"])}
+    builder = _BinaryBuilder()
+    animations = []
+
+    for clip in clips:
+        samplers, channels = [], []
+        for track in clip["tracks"]:
+            node = node_index.get(track["node"])
+            if node is None:
+                continue
+            times = [(t,) for t in track["times"]]
+            input_acc = builder.add(times, "SCALAR", FLOAT, with_bounds=True)
+            width = len(track["values"][0])
+            acc_type = {3: "VEC3", 4: "VEC4"}[width]
+            if track["quantized"]:
+                output_acc = builder.add(track["values"], acc_type, SHORT, normalized=True)
+            else:
+                output_acc = builder.add(track["values"], acc_type, FLOAT)
+            samplers.append({"input": input_acc, "output": output_acc, "interpolation": track["interpolation"]})
+            channels.append({"sampler": len(samplers) - 1, "target": {"node": node, "path": track["path"]}})
+        animations.append({"name": clip["name"], "samplers": samplers, "channels": channels})
+
+    gltf = {
+        "asset": {"version": "2.0", "generator": f"PersonaFlow animation_optimizer v{PIPELINE_VERSION}"},
+        "scene": 0,
+        "scenes": [{"nodes": skeleton["roots"]}],
+        "nodes": skeleton["nodes"],
+        "animations": animations,
+        "accessors": builder.accessors,
+        "bufferViews": builder.buffer_views,
+        "buffers": [{"byteLength": len(builder.data) + (-len(builder.data) % 4)}],
+    }
+    return build_glb(gltf, bytes(builder.data))
+
+
+# --- pipeline ---
+
+def _settings_hash(settings: Dict[str, Any]) -> str:
+    blob = json.dumps({"v": PIPELINE_VERSION, **settings}, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(blob, digest_size=8).hexdigest()
+
+
+def run_pipeline(out_dir: Path = None, settings: Dict[str, Any] = None,
+                 manifest: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Optimize every clip in the catalog manifest and write one bundle (plus a
+    report) per body type and skeleton. Returns the combined report.
+    """
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    out_dir = Path(out_dir or ANIMATION_BUNDLE_DIR)
+    cache_dir = out_dir / ".cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    settings_key = _settings_hash(settings)
+
+    manifest = manifest or animation_catalog.build_manifest()
+    groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    reused = 0
+
+    for clip_id, entry in sorted(manifest["clips"].items()):
+        cache_file = cache_dir / f"{entry['hash']}_{settings_key}.json"
+        if cache_file.exists():
+            clip = json.loads(cache_file.read_text())
+            reused += 1
+        else:
+            clip = optimize_clip(animation_catalog.ANIMATION_LIBRARY_DIR / entry["path"], settings)
+            cache_file.write_text(json.dumps(clip, separators=(",", ":")))
+        clip["id"] = clip_id
+        groups.setdefault((entry["body"], clip["signature"]), []).append(clip)
+
+    report = {"settings": settings, "reused_clips": reused, "bundles": {}}
+    signatures_per_body = {}
+    for body, signature in groups:
+        signatures_per_body[body] = signatures_per_body.get(body, 0) + 1
+
+    for (body, signature), clips in sorted(groups.items()):
+        name = body if signatures_per_body[body] == 1 else f"{body}_{signature}"
+        bundle = build_bundle(clips)
+        bundle_path = out_dir / f"{name}.glb"
+        bundle_path.write_bytes(bundle)
+
+        source_bytes = sum(c["report"]["source_bytes"] for c in clips)
+        report["bundles"][name] = {
+            "path": bundle_path.name,
+            "clips": len(clips),
+            "source_bytes": source_bytes,
+            "bundle_bytes": len(bundle),
+            "ratio": round(len(bundle) / source_bytes, 4) if source_bytes else 0,
+            "per_clip": {c["id"]: c["report"] for c in clips},
+        }
+
+    (out_dir / "report.json").write_text(json.dumps(report, indent=1, sort_keys=True))
+    return report
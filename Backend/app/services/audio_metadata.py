@@ -0,0 +1,269 @@
+import math
+import struct
+import sys
+from array import array
+from operator import mul
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services import cache_service
+
+# Duration, bitrate and level of a synthesized clip, computed once per clip
+# without decoding it, so clients can schedule gestures before playback.
+# MP3: a pure-Python frame-header scanner. Levels come from each Layer III
+# granule's global_gain, the quantizer step (1.5 dB per unit, 0 dB at gain 210).
+# The step follows the signal level, so the estimate ranks frames and clips
+# and finds silence, but it is not a calibrated dBFS value ("levels": "estimated";
+# None for an all-silent clip).
+# WAV (local TTS): peak/RMS in dBFS over ~8k evenly strided 16-bit samples
+# (constant cost per clip; "levels": "sampled").
+
+SILENCE_DB = -96.0  # 16-bit digital silence
+_MAX_MEMOIZED_HEADERS = 4096
+
+_BITRATES = {  # (MPEG-1?, layer) -> kbps by index 1..14
+    (True, 1): (32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+# global_gain -> squared quantizer step, 2 ** ((gain - 210) / 2)
+_GAIN_POWER = [2.0 ** ((gain - 210) / 2) for gain in range(256)]
+_GAIN_DB = 20 * math.log10(2) / 4
+
+
+class _Frame:
+    """Everything derived from one 4-byte frame header (memoized per distinct header)."""
+
+    __slots__ = ("length", "samples", "sample_rate", "kbps", "channels",
+                 "side_offset", "side_length", "granules")
+
+    def __init__(self, length, samples, sample_rate, kbps, channels, side_offset, side_length, granules):
+        self.length = length
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.kbps = kbps
+        self.channels = channels
+        self.side_offset = side_offset
+        self.side_length = side_length
+        # [(part2_3_length shift, global_gain shift)] per granule and channel, into the side info int
+        self.granules = granules
+
+
+def _layer3_granules(mpeg1: bool, channels: int, side_length: int) -> List[Tuple[int, int]]:
+    bits = side_length * 8
+    if mpeg1:
+        offset = 9 + (5 if channels == 1 else 3) + 4 * channels  # main_data_begin, private, scfsi
+        block, count = 59, 2 * channels
+    else:
+        offset = 8 + (1 if channels == 1 else 2)
+        block, count = 63, channels
+    granules = []
+    for i in range(count):
+        start = offset + i * block
+        granules.append((bits - start - 12, bits - start - 21 - 8))
+    return granules
+
+
+def _parse_header(header: bytes) -> Optional[_Frame]:
+    b1, b2, b3 = header[1], header[2], header[3]
+    if header[0] != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+    version, layer_bits = (b1 >> 3) & 3, (b1 >> 1) & 3
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+    if version == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None  # reserved, free-format or invalid
+    mpeg1 = version == 3
+    layer = 4 - layer_bits
+    kbps = _BITRATES[(mpeg1, layer)][bitrate_index - 1]
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 1
+    channels = 1 if b3 >> 6 == 3 else 2
+
+    if layer == 1:
+        samples = 384
+        length = (12 * kbps * 1000 // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        length = samples // 8 * kbps * 1000 // sample_rate + padding
+
+    side_offset = 4 if b1 & 1 else 6  # CRC follows the header when the protection bit is 0
+    side_length, granules = 0, []
+    if layer == 3:
+        side_length = (17 if channels == 1 else 32) if mpeg1 else (9 if channels == 1 else 17)
+        granules = _layer3_granules(mpeg1, channels, side_length)
+    return _Frame(length, samples, sample_rate, kbps, channels, side_offset, side_length, granules)
+
+
+_frames: Dict[bytes, Optional[_Frame]] = {}
+
+
+def _frame_at(data: bytes, pos: int) -> Optional[_Frame]:
+    header = data[pos:pos + 4]
+    try:
+        return _frames[header]
+    except KeyError:
+        pass
+    frame = _parse_header(header) if len(header) == 4 else None
+    if len(_frames) >= _MAX_MEMOIZED_HEADERS:
+        _frames.clear()  # junk data can produce many distinct candidates
+    _frames[header] = frame
+    return frame
+
+
+def _skip_id3v2(data: bytes) -> int:
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+
+def _db(power: float, floor: Optional[float] = SILENCE_DB) -> Optional[float]:
+    return round(10 * math.log10(power), 1) if power > 0 else floor
+
+
+def scan_mp3(data: bytes) -> Optional[Dict[str, Any]]:
+    """Duration, bitrate and estimated levels of an MP3 clip; None if no frames are found."""
+    pos = _skip_id3v2(data)
+    end = len(data)
+    if end - pos > 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128  # ID3v1 trailer
+
+    frames = samples = audio_bytes = 0
+    sample_rate = channels = 0
+    granules = voiced = 0
+    power_sum = 0.0
+    peak_gain = -1
+    synced = False
+    xing_frames = None
+
+    while pos + 4 <= end:
+        frame = _frame_at(data, pos)
+        if frame is None or (not synced and not _confirmed(data, pos, frame, end)):
+            # Lost sync (junk or a false sync word): look for the next frame header
+            synced = False
+            pos = data.find(b"\xff", pos + 1, end)
+            if pos < 0:
+                break
+            continue
+        synced = True
+        if pos + frame.length > end:
+            break
+
+        side_start = pos + frame.side_offset
+        if frame.granules:
+            side = int.from_bytes(data[side_start:side_start + frame.side_length], "big")
+            if frames == 0 and xing_frames is None:
+                tag_at = side_start + frame.side_length
+                if data[tag_at:tag_at + 4] in (b"Xing", b"Info"):
+                    # VBR header frame: carries the frame count, no audio
+                    flags = int.from_bytes(data[tag_at + 4:tag_at + 8], "big")
+                    xing_frames = int.from_bytes(data[tag_at + 8:tag_at + 12], "big") if flags & 1 else 0
+                    pos += frame.length
+                    continue
+            for part23_shift, gain_shift in frame.granules:
+                granules += 1
+                if (side >> part23_shift) & 0xFFF:  # no Huffman bits at all = digital silence
+                    gain = (side >> gain_shift) & 0xFF
+                    power_sum += _GAIN_POWER[gain]
+                    voiced += 1
+                    if gain > peak_gain:
+                        peak_gain = gain
+
+        frames += 1
+        samples += frame.samples
+        audio_bytes += frame.length
+        sample_rate, channels = frame.sample_rate, frame.channels
+        pos += frame.length
+
+    if not frames:
+        return None
+    if xing_frames and xing_frames > frames:
+        samples = samples * xing_frames // frames  # truncated stream: trust the header's count
+    duration_s = samples / sample_rate
+    return {
+        "format": "mp3",
+        "duration_ms": round(duration_s * 1000),
+        "bitrate_kbps": round(audio_bytes * 8 / duration_s / 1000, 1),
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "frames": frames,
+        "peak_db": round((peak_gain - 210) * _GAIN_DB, 1) if peak_gain >= 0 else None,
+        "rms_db": _db(power_sum / granules, floor=None) if granules else None,
+        "voiced_ratio": round(voiced / granules, 3) if granules else 0.0,
+        "levels": "estimated",
+    }
+
+
+def _confirmed(data: bytes, pos: int, frame: _Frame, end: int) -> bool:
+    """A candidate header counts only if the next frame (or the end of data) follows it."""
+    nxt = pos + frame.length
+    return nxt >= end or (nxt + 4 <= end and _frame_at(data, nxt) is not None)
+
+
+def scan_wav(data: bytes, level_samples: int = 8192) -> Optional[Dict[str, Any]]:
+    """Duration, bitrate and levels of a PCM WAV clip (levels for 16-bit only)."""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    pos, fmt, samples_data = 12, None, None
+    while pos + 8 <= len(data):
+        chunk_id, size = data[pos:pos + 4], struct.unpack_from("<I", data, pos + 4)[0]
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+        elif chunk_id == b"data":
+            # Streamed WAVs (espeak-ng --stdout) carry a placeholder size
+            if size == 0 or body + size > len(data):
+                size = len(data) - body
+            samples_data = memoryview(data)[body:body + size]
+            break
+        pos = body + size + (size & 1)
+    if fmt is None or samples_data is None:
+        return None
+
+    _, channels, sample_rate, byte_rate, block_align, bits = fmt
+    if not byte_rate or not block_align:
+        return None
+    duration_s = len(samples_data) / byte_rate
+    meta = {
+        "format": "wav",
+        "duration_ms": round(duration_s * 1000),
+        "bitrate_kbps": round(byte_rate * 8 / 1000, 1),
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "peak_db": None,
+        "rms_db": None,
+        "levels": None,
+    }
+    if bits == 16 and len(samples_data) >= 2:
+        pcm = array("h")
+        pcm.frombytes(samples_data[:len(samples_data) & ~1])
+        if sys.byteorder == "big":
+            pcm.byteswap()
+        # Visiting every sample would cost ~2ms per second of audio in pure Python
+        sampled = pcm[::max(1, len(pcm) // level_samples)]
+        peak = max(max(sampled), -min(sampled)) / 32768
+        mean_square = sum(map(mul, sampled, sampled)) / len(sampled) / 32768 ** 2
+        meta.update(peak_db=_db(peak * peak), rms_db=_db(mean_square), levels="sampled")
+    return meta
+
+
+def describe(audio: bytes) -> Optional[Dict[str, Any]]:
+    """Metadata of a synthesized clip (MP3 or WAV); None if the format is not recognized."""
+    if not audio:
+        return None
+    if audio[:4] == b"RIFF":
+        return scan_wav(audio)
+    return scan_mp3(audio)
+
+
+def for_clip(audio_hash: str, audio: bytes) -> Optional[Dict[str, Any]]:
+    """describe(), cached per content hash next to the clip itself."""
+    meta = cache_service.audio_meta.get(audio_hash)
+    if meta is None:
+        meta = describe(audio)
+        if meta is not None:
+            cache_service.audio_meta[audio_hash] = meta
+    return meta
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import os
+import re
+import tempfile
+from typing import Optional
+
+from app.services import scratch_space
+
+logger = logging.getLogger("audio_store")
+
+# Content-addressed copies of synthesized clips on disk, so /audio/{hash} can be
+# served by any worker (and after the clip left the in-memory cache).
+# Set AUDIO_STORE_DIR="" to keep audio in memory only.
+AUDIO_STORE_DIR = os.getenv(
+    "AUDIO_STORE_DIR", os.path.join(tempfile.gettempdir(), "personaflow_audio")
+)
+
+_HASH_RE = re.compile(r"^[0-9a-f]{32}$")
+_pending = set()
+
+if AUDIO_STORE_DIR:
+    os.makedirs(AUDIO_STORE_DIR, exist_ok=True)
+
+
+def is_valid_hash(audio_hash: str) -> bool:
+    return bool(_HASH_RE.match(audio_hash))
+
+
+def path_for(audio_hash: str) -> Optional[str]:
+    """Path of a stored clip, or None if it is not on disk."""
+    if not AUDIO_STORE_DIR or not is_valid_hash(audio_hash):
+        return None
+    path = os.path.join(AUDIO_STORE_DIR, f"{audio_hash}.mp3")
+    return path if os.path.exists(path) else None
+
+
+def _write(audio_hash: str, audio: bytes):
+    path = os.path.join(AUDIO_STORE_DIR, f"{audio_hash}.mp3")
+    if os.path.exists(path):
+        # Produced again: refresh the age the sweeper goes by
+        os.utime(path)
+        return
+    # write-then-rename so concurrent readers never see a partial file
+    scratch_space.write_atomic(path, audio)
+
+
+async def save(audio_hash: str, audio: bytes):
+    if not AUDIO_STORE_DIR:
+        return
+    try:
+        await asyncio.to_thread(_write, audio_hash, audio)
+    except OSError as e:
+        logger.warning("Failed to store audio %s: %s", audio_hash, e)
+
+
+def schedule_save(audio_hash: str, audio: bytes):
+    """Persist a clip off the event loop without delaying the response."""
+    if not AUDIO_STORE_DIR:
+        return
+    task = asyncio.get_running_loop().create_task(save(audio_hash, audio))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
@@ -0,0 +1,184 @@
+import heapq
+import itertools
+import time
+from typing import Any, Dict, Hashable, Optional
+
+
+class _Entry:
+    __slots__ = ("value", "size", "cost", "freq", "priority", "expires")
+
+    def __init__(self, value: bytes, size: int, cost: float, expires: float):
+        self.value = value
+        self.size = size
+        self.cost = cost
+        self.freq = 1
+        self.priority = 0.0
+        self.expires = expires
+
+
+class ByteBudgetCache:
+    """
+    In-memory bytes cache bounded by total stored size rather than entry count.
+
+    Eviction is GreedyDual-Size-Frequency (GDSF): each entry's priority is
+        clock + freq * cost / size
+    so small, frequently hit and expensive-to-recreate entries survive, while
+    large one-off entries go first. `clock` is raised to the priority of each
+    evicted entry, which ages out entries that stopped being hit.
+    Entries also expire after `ttl` seconds.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float, timer=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.timer = timer
+
+        self._entries: Dict[Hashable, _Entry] = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._clock = 0.0
+        self._last_sweep = timer()
+
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    # --- mapping-style access ---
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and entry.expires > self.timer()
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value: bytes):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        entry = self._entries.pop(key)
+        self.resident_bytes -= entry.size
+
+    def get(self, key, default=None) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        if entry.expires <= self.timer():
+            self._drop(key, entry)
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        entry.freq += 1
+        self._push(key, entry)
+        return entry.value
+
+    def set(self, key, value: bytes, cost: float = 1.0, ttl: Optional[float] = None, freq: int = 1):
+        """
+        Store `value`; `cost` is what a miss would cost to recompute (e.g. synthesis ms).
+        `ttl` and `freq` override the defaults for entries restored from a snapshot.
+        """
+        size = len(value)
+        if size > self.max_bytes:
+            self.rejected += 1
+            return
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.resident_bytes -= old.size
+
+        entry = _Entry(value, size, max(cost, 1e-3), self.timer() + (self.ttl if ttl is None else ttl))
+        entry.freq = max(freq, 1)
+        self._entries[key] = entry
+        self.resident_bytes += size
+        self._push(key, entry)
+
+        self._sweep_expired()
+        self._evict_to_budget(protect=key)
+
+    def pop(self, key, default=None):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return default
+        self.resident_bytes -= entry.size
+        return entry.value
+
+    def clear(self):
+        self._entries.clear()
+        self._heap.clear()
+        self.resident_bytes = 0
+
+    def ranked(self):
+        """Live entries as (key, value, freq, cost, seconds left), most frequently hit first."""
+        now = self.timer()
+        items = [(k, e) for k, e in self._entries.items() if e.expires > now]
+        items.sort(key=lambda item: item[1].freq, reverse=True)
+        return [(k, e.value, e.freq, e.cost, e.expires - now) for k, e in items]
+
+    # --- internals ---
+
+    def _push(self, key, entry: _Entry):
+        entry.priority = self._clock + entry.freq * entry.cost / max(entry.size, 1)
+        heapq.heappush(self._heap, (entry.priority, next(self._seq), key))
+        # Stale heap items (superseded priorities) are skipped lazily; compact
+        # when they dominate so the heap does not grow with the hit count.
+        if len(self._heap) > 4 * len(self._entries) + 64:
+            self._heap = [
+                (e.priority, next(self._seq), k) for k, e in self._entries.items()
+            ]
+            heapq.heapify(self._heap)
+
+    def _drop(self, key, entry: _Entry):
+        del self._entries[key]
+        self.resident_bytes -= entry.size
+
+    def _evict_to_budget(self, protect=None):
+        deferred = []
+        while self.resident_bytes > self.max_bytes and self._heap:
+            priority, seq, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is None or entry.priority != priority:
+                continue  # stale heap item
+            if key == protect:
+                deferred.append((priority, seq, key))
+                continue
+            self._clock = priority
+            self._drop(key, entry)
+            self.evictions += 1
+        for item in deferred:
+            heapq.heappush(self._heap, item)
+
+    def _sweep_expired(self):
+        now = self.timer()
+        if now - self._last_sweep < self.ttl / 10:
+            return
+        self._last_sweep = now
+        for key, entry in list(self._entries.items()):
+            if entry.expires <= now:
+                self._drop(key, entry)
+                self.expirations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "resident_bytes": self.resident_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Any, Dict, Optional, Union
+
+# Canonical cache keys for the brain and audio caches.
+# Keys are fixed-size hex digests so the caches never hold full prompts,
+# persona dicts or knowledge documents as keys.
+
+DIGEST_SIZE = 16  # bytes -> 32 hex chars
+
+# Persona fields that actually influence the brain output.
+# Voice (and anything else) only matters for TTS, so it must not split the brain cache.
+BRAIN_PERSONA_FIELDS = ("id", "prompt", "persona_prompt", "budgets")
+
+# Per-component cardinality tracking is bounded so it can't grow without limit.
+MAX_TRACKED_VALUES = 10000
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s.!?]+$")
+
+
+def _digest(data: str) -> str:
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=DIGEST_SIZE).hexdigest()
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Unicode-normalize and collapse whitespace, keeping case."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def normalize_prompt(prompt: Optional[str]) -> str:
+    """Normalize a user prompt so trivially different inputs share a key.
+
+    "Hello!", "  hello " and "HELLO" all map to "hello".
+    """
+    text = normalize_text(prompt).casefold()
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+
+def canonical_json(value: Any) -> str:
+    """Deterministic JSON for dicts/lists (sorted keys, no whitespace)."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def prompt_digest(prompt: Optional[str]) -> str:
+    return _digest(normalize_prompt(prompt))
+
+
+def persona_digest(persona: Optional[Dict[str, Any]]) -> str:
+    persona = persona or {}
+    relevant = {
+        k: normalize_text(persona[k]) if isinstance(persona[k], str) else persona[k]
+        for k in BRAIN_PERSONA_FIELDS if persona.get(k)
+    }
+    return _digest(canonical_json(relevant))
+
+
+def context_digest(node_graph: Optional[Union[Dict[str, Any], str]]) -> str:
+    if node_graph is None:
+        return _digest("")
+    if isinstance(node_graph, str):
+        return _digest(normalize_text(node_graph))
+    return _digest(canonical_json(node_graph))
+
+
+# --- Cardinality stats ---
+_component_values = defaultdict(set)
+_component_overflow = defaultdict(bool)
+
+
+def _track(component: str, value: str):
+    seen = _component_values[component]
+    if value in seen:
+        return
+    if len(seen) >= MAX_TRACKED_VALUES:
+        _component_overflow[component] = True
+        return
+    seen.add(value)
+
+
+def brain_key(prompt: str, persona: Optional[Dict[str, Any]], node_graph=None) -> str:
+    """Cache key for brain output: (normalized prompt, persona, context)."""
+    prompt_part = prompt_digest(prompt)
+    persona_part = persona_digest(persona)
+    context_part = context_digest(node_graph)
+
+    _track("brain.prompt", prompt_part)
+    _track("brain.persona", persona_part)
+    _track("brain.context", context_part)
+
+    key = _digest(f"brain|{prompt_part}|{persona_part}|{context_part}")
+    _track("brain.key", key)
+    return key
+
+
+def audio_key(text: str, voice: str) -> str:
+    """Cache key for synthesized audio: (whitespace-normalized text, voice)."""
+    text_part = _digest(normalize_text(text))
+    voice_part = normalize_text(voice).lower()
+
+    _track("audio.text", text_part)
+    _track("audio.voice", voice_part)
+
+    key = _digest(f"audio|{text_part}|{voice_part}")
+    _track("audio.key", key)
+    return key
+
+
+def key_stats() -> Dict[str, Dict[str, Any]]:
+    """Distinct values seen per key component.
+
+    If brain.key cardinality tracks brain.context or brain.persona rather than
+    brain.prompt, the low hit rate comes from varying context/persona, not prompts.
+    """
+    return {
+        component: {
+            "distinct": len(values),
+            "saturated": _component_overflow[component],
+        }
+        for component, values in sorted(_component_values.items())
+    }
+
+
+def reset_stats():
+    _component_values.clear()
+    _component_overflow.clear()
+
+
+def content_hash(data: bytes) -> str:
+    """Content address for stored blobs (audio served under /audio/{hash})."""
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).hexdigest()
@@ -1,5 +1,93 @@
-from cachetools import TTLCache
+import os
+from typing import Optional, Tuple
+from cachetools import TLRUCache, TTLCache
+from app.services.byte_cache import ByteBudgetCache
+from app.services.cache_keys import content_hash
 
-# small in-memory cache for hackathon
-audio_cache = TTLCache(maxsize=512, ttl=60*60)  # 1 hour TTL
-ai_cache    = TTLCache(maxsize=1024, ttl=60*30) # 30 min
+
+class RankedTTLCache(TLRUCache):
+    """
+    TTLCache that also counts hits per key, so the hottest entries can be
+    snapshotted (app/services/cache_snapshot.py), and accepts a shorter TTL
+    for a single entry (restored entries keep their remaining lifetime).
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize, ttu=self._ttu)
+        self.ttl = ttl
+        self.hits = {}
+        self.expires = {}
+        self._next_ttl = None
+
+    def _ttu(self, key, value, now):
+        ttl = self.ttl if self._next_ttl is None else self._next_ttl
+        self.expires[key] = now + ttl
+        return now + ttl
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.hits[key] = self.hits.get(key, 0) + 1
+        return value
+
+    def set(self, key, value, ttl: Optional[float] = None, hits: int = 0):
+        self._next_ttl = ttl
+        try:
+            self[key] = value
+        finally:
+            self._next_ttl = None
+        if hits:
+            self.hits[key] = hits
+        self._prune()
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._prune()
+
+    def ranked(self):
+        """Live entries as (key, value, hits, seconds left), most hit first."""
+        self._prune(force=True)
+        now = self.timer()
+        # TLRUCache.__getitem__ directly: reading for a snapshot is not a hit
+        items = [(k, TLRUCache.__getitem__(self, k), self.hits.get(k, 0), self.expires[k] - now)
+                 for k in list(self.keys())]
+        items.sort(key=lambda item: item[2], reverse=True)
+        return items
+
+    def _prune(self, force: bool = False):
+        # Bookkeeping for evicted/expired keys is dropped lazily
+        if force or len(self.expires) > 2 * self.maxsize:
+            for key in [k for k in self.expires if k not in self]:
+                self.expires.pop(key, None)
+                self.hits.pop(key, None)
+
+
+# raw MP3 bytes keyed by content hash, bounded by memory rather than entry count
+AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+audio_cache = ByteBudgetCache(max_bytes=AUDIO_CACHE_MAX_BYTES, ttl=60*60)  # 1 hour TTL
+# audio key (text + voice) -> content hash
+audio_index = RankedTTLCache(maxsize=8192, ttl=60*60)
+ai_cache    = RankedTTLCache(maxsize=1024, ttl=60*30) # 30 min
+# content hash -> duration/bitrate/level metadata (app/services/audio_metadata.py)
+audio_meta  = TTLCache(maxsize=8192, ttl=60*60)
+
+# short-lived negative cache: inputs whose upstream call just failed
+negative_cache = TTLCache(maxsize=1024, ttl=int(os.getenv("NEGATIVE_CACHE_TTL_S", "15")))
+
+
+def put_audio(audio: bytes, cost: float = 1.0) -> str:
+    """Store a clip under its content hash and return the hash."""
+    audio_hash = content_hash(audio)
+    if audio_hash not in audio_cache:
+        audio_cache.set(audio_hash, audio, cost=cost)
+    return audio_hash
+
+
+def lookup_audio(key: str) -> Optional[Tuple[str, bytes]]:
+    """(content hash, bytes) for an audio key, or None on a miss."""
+    audio_hash = audio_index.get(key)
+    if audio_hash is None:
+        return None
+    audio = audio_cache.get(audio_hash)
+    if audio is None:
+        return None
+    return audio_hash, audio
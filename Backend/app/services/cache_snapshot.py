@@ -0,0 +1,219 @@
+import asyncio
+import glob
+import logging
+import os
+import re
+import struct
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from app.config import global_state
+from app.services import cache_service, fast_json, scratch_space
+
+logger = logging.getLogger("cache_snapshot")
+
+# Hot cache entries are written here periodically and on shutdown, and
+# restored on startup, so a deploy does not start with cold caches.
+# Set CACHE_SNAPSHOT_PATH="" to disable. Under serve.py each worker snapshots
+# its own caches to "<path>.w<index>", and every worker restores the union of
+# all snapshot files, so no worker's hot entries are lost.
+CACHE_SNAPSHOT_PATH = os.getenv(
+    "CACHE_SNAPSHOT_PATH", os.path.join(tempfile.gettempdir(), "personaflow_cache.snap")
+)
+CACHE_SNAPSHOT_INTERVAL_S = float(os.getenv("CACHE_SNAPSHOT_INTERVAL_S", "300"))
+# Brain outputs kept per snapshot, most hit first
+CACHE_SNAPSHOT_MAX_ENTRIES = int(os.getenv("CACHE_SNAPSHOT_MAX_ENTRIES", "512"))
+# Audio bytes kept per snapshot, most hit clips first
+CACHE_SNAPSHOT_MAX_BYTES = int(os.getenv("CACHE_SNAPSHOT_MAX_BYTES", str(16 * 1024 * 1024)))
+# /health/ready waits until this share of the snapshot is restored (0 = never wait)
+CACHE_RESTORE_READY_FRACTION = float(os.getenv("CACHE_RESTORE_READY_FRACTION", "0"))
+# Entries restored between event-loop yields
+_RESTORE_BATCH = 64
+
+# File layout: MAGIC, header length (uint32 BE), JSON header, audio blobs back to back.
+# Header: {"saved_at": unix ts,
+#          "ai": [[key, value, hits, ttl_left], ...],
+#          "audio_index": [[key, hash, hits, ttl_left], ...],
+#          "audio": [[hash, size, freq, cost, ttl_left], ...]}  (blob order)
+MAGIC = b"PFCACHE1"
+_WORKER_FILE_RE = re.compile(r"\.w\d+$")
+
+_state: Dict[str, Any] = {
+    "restored": False,
+    "restore_progress": 0.0,
+    "restored_entries": 0,
+    "restore_skipped": 0,
+    "saved_at": None,
+    "saved_entries": 0,
+    "saved_bytes": 0,
+}
+
+
+def _collect() -> Dict[str, Any]:
+    """Hottest live entries of each cache, ranked by hit frequency (runs on the event loop)."""
+    ai = [[k, v, hits, round(left, 1)]
+          for k, v, hits, left in cache_service.ai_cache.ranked()[:CACHE_SNAPSHOT_MAX_ENTRIES]]
+
+    # Only clips reachable by (text, voice): fallback-voice clips are never indexed
+    indexed = {h for _, h, _, _ in cache_service.audio_index.ranked()}
+    audio, blobs, total = [], [], 0
+    for audio_hash, clip, freq, cost, left in cache_service.audio_cache.ranked():
+        if audio_hash not in indexed or total + len(clip) > CACHE_SNAPSHOT_MAX_BYTES:
+            continue
+        total += len(clip)
+        audio.append([audio_hash, len(clip), freq, round(cost, 1), round(left, 1)])
+        blobs.append(clip)
+
+    kept = {entry[0] for entry in audio}
+    audio_index = [[k, h, hits, round(left, 1)]
+                   for k, h, hits, left in cache_service.audio_index.ranked() if h in kept]
+    return {"saved_at": time.time(), "ai": ai, "audio_index": audio_index, "audio": audio, "_blobs": blobs}
+
+
+def _worker_path(path: str) -> str:
+    """This process's snapshot file: `path` itself unless running as one of several workers."""
+    return f"{path}.w{global_state.WORKER_INDEX}" if global_state.WORKERS > 1 else path
+
+
+def _snapshot_files(path: str) -> List[str]:
+    """`path` and every worker's snapshot next to it (from any worker count)."""
+    workers = [p for p in glob.glob(glob.escape(path) + ".w*") if _WORKER_FILE_RE.search(p)]
+    return [p for p in [path, *sorted(workers)] if os.path.exists(p)]
+
+
+def _write(path: str, snapshot: Dict[str, Any]) -> int:
+    blobs = snapshot.pop("_blobs")
+    header = fast_json.dumps(snapshot)
+    data = b"".join([MAGIC, struct.pack(">I", len(header)), header, *blobs])
+    # write-then-rename (the temp file is removed if the write fails), so a
+    # crash mid-write never leaves a truncated snapshot or a stray temp file
+    scratch_space.write_atomic(path, data)
+    return len(data)
+
+
+def _read(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("not a cache snapshot")
+        (header_len,) = struct.unpack(">I", f.read(4))
+        snapshot = fast_json.loads(f.read(header_len))
+        blobs = []
+        for entry in snapshot["audio"]:
+            blob = f.read(entry[1])
+            if len(blob) != entry[1]:
+                raise ValueError("truncated cache snapshot")
+            blobs.append(blob)
+    snapshot["_blobs"] = blobs
+    return snapshot
+
+
+async def save(path: str = None) -> bool:
+    """Snapshot this process's hottest entries; the file is written off the event loop."""
+    path = CACHE_SNAPSHOT_PATH if path is None else path
+    if not path:
+        return False
+    path = _worker_path(path)
+    start = time.perf_counter()
+    snapshot = _collect()
+    entries = len(snapshot["ai"]) + len(snapshot["audio"])
+    try:
+        size = await asyncio.to_thread(_write, path, snapshot)
+    except OSError as e:
+        logger.warning("Cache snapshot failed: %s", e)
+        return False
+    _state.update(saved_at=snapshot["saved_at"], saved_entries=entries, saved_bytes=size)
+    logger.info("Cache snapshot: %d entries, %d bytes in %.0fms",
+                entries, size, (time.perf_counter() - start) * 1000)
+    return True
+
+
+def restored() -> bool:
+    return _state["restored"]
+
+
+def _set_progress(done: int, total: int):
+    _state["restore_progress"] = done / total if total else 1.0
+    if "cache" in global_state.readiness and _state["restore_progress"] >= CACHE_RESTORE_READY_FRACTION:
+        global_state.readiness["cache"] = True
+
+
+async def restore(path: str = None) -> int:
+    """
+    Load the snapshot (and every worker's snapshot next to it) into empty slots
+    of the caches, hottest entries first, yielding to the event loop between
+    batches. Each entry keeps only what was left of its TTL when it was saved,
+    minus the time since; expired entries and keys that are already cached
+    (e.g. saved by several workers) are skipped. Returns the number restored.
+    """
+    path = CACHE_SNAPSHOT_PATH if path is None else path
+    files = _snapshot_files(path) if path and not _state["restored"] else []
+    if not files:
+        _state["restored"] = True
+        _set_progress(0, 0)
+        return 0
+
+    start = time.perf_counter()
+    audio, audio_index, ai, oldest = [], [], [], 0.0
+    for snapshot_path in files:
+        try:
+            snapshot = await asyncio.to_thread(_read, snapshot_path)
+        except (OSError, ValueError, KeyError, IndexError, struct.error) as e:
+            logger.warning("Cache snapshot %s unreadable, skipped: %s", snapshot_path, e)
+            continue
+        age = max(time.time() - snapshot["saved_at"], 0.0)
+        oldest = max(oldest, age)
+        audio += [(entry, blob, age) for entry, blob in zip(snapshot["audio"], snapshot["_blobs"])]
+        audio_index += [(entry, age) for entry in snapshot["audio_index"]]
+        ai += [(entry, age) for entry in snapshot["ai"]]
+
+    # Clips before the index entries that point at them; hottest first across files
+    audio.sort(key=lambda item: item[0][2], reverse=True)
+    audio_index.sort(key=lambda item: item[0][2], reverse=True)
+    ai.sort(key=lambda item: item[0][2], reverse=True)
+    work = (
+        [("audio", entry, blob, age) for entry, blob, age in audio]
+        + [("audio_index", entry, None, age) for entry, age in audio_index]
+        + [("ai", entry, None, age) for entry, age in ai]
+    )
+    loaded = skipped = 0
+    for done, (kind, entry, blob, age) in enumerate(work, 1):
+        if kind == "audio":
+            audio_hash, _, freq, cost, left = entry
+            left -= age
+            if left > 0 and audio_hash not in cache_service.audio_cache:
+                cache_service.audio_cache.set(audio_hash, blob, cost=cost, ttl=left, freq=freq)
+                loaded += 1
+            else:
+                skipped += 1
+        else:
+            cache = cache_service.audio_index if kind == "audio_index" else cache_service.ai_cache
+            key, value, hits, left = entry
+            left -= age
+            if left > 0 and key not in cache and (kind == "ai" or value in cache_service.audio_cache):
+                cache.set(key, value, ttl=left, hits=hits)
+                loaded += 1
+            else:
+                skipped += 1
+        if done % _RESTORE_BATCH == 0:
+            _set_progress(done, len(work))
+            await asyncio.sleep(0)
+
+    _state.update(restored=True, restored_entries=loaded, restore_skipped=skipped)
+    _set_progress(len(work), len(work))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    global_state.startup_profile["cache_restore_ms"] = round(elapsed_ms, 1)
+    logger.info("Cache restored: %d entries (%d expired or present) from %d snapshot(s) up to %.0fs old in %.0fms",
+                loaded, skipped, len(files), oldest, elapsed_ms)
+    return loaded
+
+
+async def run_periodic():
+    """Snapshot every CACHE_SNAPSHOT_INTERVAL_S seconds (each worker, to its own file)."""
+    while True:
+        await asyncio.sleep(CACHE_SNAPSHOT_INTERVAL_S)
+        await save()
+
+
+def stats() -> Dict[str, Any]:
+    return {"path": _worker_path(CACHE_SNAPSHOT_PATH) if CACHE_SNAPSHOT_PATH else "", **_state}
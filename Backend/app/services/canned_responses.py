@@ -0,0 +1,152 @@
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import global_state
+from app.services import audio_metadata, audio_store, cache_keys, cache_service, tts_service
+
+logger = logging.getLogger("canned_responses")
+
+# Deterministic replies (goodbye, safety refusal, fast-fail fallback) keyed by
+# (intent, persona, voice). Text and signals are fixed per intent and persona;
+# audio is rendered once per voice (at startup for CANNED_VOICES, otherwise on
+# first use) and pinned here, so these turns never wait for TTS and never lose
+# their clip to audio cache eviction.
+
+# Voices rendered at startup besides the default voice (comma-separated)
+CANNED_VOICES = [v.strip() for v in os.getenv("CANNED_VOICES", "").split(",") if v.strip()]
+
+DEFAULT_PERSONA = "default"
+
+# intent -> persona id -> (text, signals); DEFAULT_PERSONA covers custom personas
+RESPONSES: Dict[str, Dict[str, Tuple[str, Dict[str, str]]]] = {
+    "END": {
+        DEFAULT_PERSONA: ("Goodbye! Have a great day.", {"emotion": "happy", "gesture": "wave"}),
+        "professional": ("Thank you for reaching out. Have a great day.", {"emotion": "happy", "gesture": "bow"}),
+        "sarcastic": ("Finally. Try not to break anything on your way out.", {"emotion": "neutral", "gesture": "wave"}),
+        "excited": ("Bye bye! It was AMAZING talking to you!", {"emotion": "happy", "gesture": "wave"}),
+    },
+    "SAFETY_BLOCK": {
+        DEFAULT_PERSONA: ("Sorry, I can't help with that. Is there something else I can do for you?",
+                          {"emotion": "neutral", "gesture": "shrug"}),
+        "professional": ("I'm sorry, but I'm unable to assist with that request. Is there anything else I can help you with?",
+                         {"emotion": "neutral", "gesture": "bow"}),
+        "sarcastic": ("Nice try. That's a hard no. Got a question I can actually answer?",
+                      {"emotion": "neutral", "gesture": "shrug"}),
+        "excited": ("Whoa, I can't help with that one! But ask me anything else!",
+                    {"emotion": "surprised", "gesture": "shrug"}),
+    },
+    # Spoken instead of an error when the brain fails or its breaker is open
+    "FALLBACK": {
+        DEFAULT_PERSONA: ("Sorry, I'm having trouble thinking right now. Please try again in a moment.",
+                          {"emotion": "neutral", "gesture": "idle"}),
+    },
+}
+
+# (intent, persona, voice) -> (content hash, audio)
+_rendered: Dict[Tuple[str, str, str], Tuple[str, bytes]] = {}
+# content hash -> audio, so /audio/{hash} serves pinned clips after they left
+# the audio cache and the audio store
+_by_hash: Dict[str, bytes] = {}
+
+
+def _persona_id(persona_key: Optional[str], intent: str) -> str:
+    variants = RESPONSES[intent]
+    return persona_key if persona_key in variants else DEFAULT_PERSONA
+
+
+def is_canned(intent: Optional[str]) -> bool:
+    return intent in RESPONSES
+
+
+def reply(intent: str, persona_key: Optional[str] = None) -> Dict[str, Any]:
+    """{"text", "signals"} of a canned intent for a persona (a copy; safe to mutate)."""
+    text, signals = RESPONSES[intent][_persona_id(persona_key, intent)]
+    return {"text": text, "signals": dict(signals)}
+
+
+def _pin(slot: Tuple[str, str, str], audio_hash: str, audio: bytes):
+    _rendered[slot] = (audio_hash, audio)
+    _by_hash[audio_hash] = audio
+    audio_metadata.for_clip(audio_hash, audio)
+
+
+def _matches(intent: str, persona_key: Optional[str], text: Optional[str]) -> bool:
+    return text is None or text == RESPONSES[intent][_persona_id(persona_key, intent)][0]
+
+
+def audio_for(intent: str, persona_key: Optional[str], voice: str,
+              text: Optional[str] = None) -> Optional[Tuple[str, bytes]]:
+    """
+    Pinned (content hash, audio) of a canned reply, or None when this voice has
+    not been rendered yet (or `text` is not the canned text). Clips rendered by
+    another path (e.g. the normal TTS cache) are adopted on first lookup.
+    """
+    if not _matches(intent, persona_key, text):
+        return None
+    slot = (intent, _persona_id(persona_key, intent), voice)
+    rendered = _rendered.get(slot)
+    if rendered is None:
+        rendered = cache_service.lookup_audio(cache_keys.audio_key(reply(intent, persona_key)["text"], voice))
+        if rendered is not None:
+            _pin(slot, *rendered)
+    global_state.incr("canned.hits" if rendered else "canned.misses")
+    return rendered
+
+
+def clip(audio_hash: str) -> Optional[bytes]:
+    """Pinned canned audio by content hash (None if not a canned clip)."""
+    return _by_hash.get(audio_hash)
+
+
+def remember(intent: str, persona_key: Optional[str], voice: str, text: str, audio_hash: str, audio: bytes):
+    """Pin a clip that was just synthesized for a canned reply."""
+    if audio and audio != tts_service.SILENT_MP3 and _matches(intent, persona_key, text):
+        _pin((intent, _persona_id(persona_key, intent), voice), audio_hash, audio)
+
+
+async def prerender(voices=None):
+    """Render every canned reply for the default voice and CANNED_VOICES (missing clips only)."""
+    voices = voices or [tts_service.DEFAULT_VOICE, *CANNED_VOICES]
+    rendered = 0
+    for intent, variants in RESPONSES.items():
+        for persona_id, (text, _) in variants.items():
+            for voice in dict.fromkeys(voices):
+                slot = (intent, persona_id, voice)
+                if slot in _rendered:
+                    continue
+                key = cache_keys.audio_key(text, voice)
+                cached = cache_service.lookup_audio(key)
+                if cached is not None:
+                    _pin(slot, *cached)
+                    continue
+                try:
+                    async with global_state.TTS_SEMAPHORE:
+                        audio, backend = await tts_service.synthesize(text, voice=voice)
+                except Exception as e:
+                    logger.warning("Canned render failed for %s/%s/%s: %s", intent, persona_id, voice, e)
+                    continue
+                if not audio:
+                    continue
+                if not tts_service.is_cacheable(backend):
+                    # Left unpinned: the first live use renders it again with the preferred backend
+                    logger.info("Canned %s/%s/%s rendered by fallback %s, not pinned", intent, persona_id, voice, backend)
+                    continue
+                audio_hash = cache_service.put_audio(audio)
+                cache_service.audio_index[key] = audio_hash
+                await audio_store.save(audio_hash, audio)
+                _pin(slot, audio_hash, audio)
+                rendered += 1
+    logger.info("Canned responses: %d clips rendered, %d pinned", rendered, len(_rendered))
+    return rendered
+
+
+def stats() -> Dict[str, Any]:
+    counters = global_state.counters()
+    return {
+        "intents": {intent: len(variants) for intent, variants in RESPONSES.items()},
+        "pinned_clips": len(_rendered),
+        "pinned_bytes": sum(len(audio) for _, audio in _rendered.values()),
+        "hits": int(counters["canned.hits"]),
+        "misses": int(counters["canned.misses"]),
+    }
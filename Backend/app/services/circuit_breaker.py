@@ -0,0 +1,113 @@
+import logging
+import os
+import time
+from typing import Dict
+
+logger = logging.getLogger("circuit_breaker")
+
+# Defaults, overridable per deployment
+FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+RESET_TIMEOUT_S = float(os.getenv("BREAKER_RESET_TIMEOUT_S", "30"))
+HALF_OPEN_MAX_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the upstream's breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-upstream circuit breaker.
+
+    closed    -> calls go through; `failure_threshold` consecutive failures open it
+    open      -> calls are rejected immediately until `reset_timeout` has passed
+    half_open -> up to `half_open_max_probes` calls are let through as probes;
+                 a success closes the breaker, a failure re-opens it
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD,
+                 reset_timeout: float = RESET_TIMEOUT_S,
+                 half_open_max_probes: int = HALF_OPEN_MAX_PROBES):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_probes = half_open_max_probes
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now."""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+            self.opened_at = time.monotonic()
+            self.probes_in_flight = 0
+            logger.info("Breaker %s half-open, probing", self.name)
+
+        if self.state == HALF_OPEN:
+            # A probe that never reported back (e.g. cancelled) must not wedge the breaker
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.opened_at = time.monotonic()
+                self.probes_in_flight = 0
+            if self.probes_in_flight >= self.half_open_max_probes:
+                self.rejected += 1
+                return False
+            self.probes_in_flight += 1
+
+        return True
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info("Breaker %s closed", self.name)
+        self.state = CLOSED
+        self.failures = 0
+        self.probes_in_flight = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.trips += 1
+                logger.warning("Breaker %s opened after %d failure(s)", self.name, self.failures)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.probes_in_flight = 0
+
+    def check(self):
+        """Raise CircuitOpenError if the call must fast-fail."""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def snapshot(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+
+# --- Registry: one breaker per upstream (e.g. "llm:<model>", "tts:<voice>") ---
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict]:
+    return {name: b.snapshot() for name, b in sorted(_breakers.items())}
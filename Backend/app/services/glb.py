@@ -0,0 +1,72 @@
+import json
+import struct
+from typing import Any, Dict, Tuple
+
+# Minimal binary glTF (GLB) container reader/writer.
+# https://registry.khronos.org/glTF/specs/2.0/glTF-2.0.html#binary-gltf-layout
+
+GLB_MAGIC = 0x46546C67  # "glTF"
+CHUNK_JSON = 0x4E4F534A  # "JSON"
+CHUNK_BIN = 0x004E4942   # "BIN\0"
+
+
+class GLBError(ValueError):
+    """Raised for files that are not valid GLB containers."""
+
+
+def parse_glb(data: bytes) -> Tuple[Dict[str, Any], bytes]:
+    """Split GLB bytes into (glTF JSON dict, BIN chunk bytes)."""
+    if len(data) < 20:
+        raise GLBError("file too short")
+    magic, version, length = struct.unpack_from("<III", data, 0)
+    if magic != GLB_MAGIC or version != 2:
+        raise GLBError("not a glTF 2.0 binary")
+
+    gltf = None
+    bin_chunk = b""
+    offset = 12
+    end = min(length, len(data))
+    while offset + 8 <= end:
+        chunk_len, chunk_type = struct.unpack_from("<II", data, offset)
+        body = data[offset + 8: offset + 8 + chunk_len]
+        if chunk_type == CHUNK_JSON:
+            gltf = json.loads(body)
+        elif chunk_type == CHUNK_BIN:
+            bin_chunk = bytes(body)
+        offset += 8 + chunk_len
+
+    if gltf is None:
+        raise GLBError("missing JSON chunk")
+    return gltf, bin_chunk
+
+
+def read_glb(path: str) -> Tuple[Dict[str, Any], bytes]:
+    with open(path, "rb") as f:
+        return parse_glb(f.read())
+
+
+def read_glb_json(path: str) -> Dict[str, Any]:
+    """Read only the JSON chunk (no need to load the binary payload)."""
+    with open(path, "rb") as f:
+        header = f.read(20)
+        if len(header) < 20:
+            raise GLBError("file too short")
+        magic, version, _ = struct.unpack_from("<III", header, 0)
+        chunk_len, chunk_type = struct.unpack_from("<II", header, 12)
+        if magic != GLB_MAGIC or version != 2 or chunk_type != CHUNK_JSON:
+            raise GLBError("not a glTF 2.0 binary")
+        return json.loads(f.read(chunk_len))
+
+
+def _pad(data: bytes, fill: bytes) -> bytes:
+    return data + fill * (-len(data) % 4)
+
+
+def build_glb(gltf: Dict[str, Any], bin_chunk: bytes = b"") -> bytes:
+    json_bytes = _pad(json.dumps(gltf, separators=(",", ":")).encode("utf-8"), b" ")
+    parts = [struct.pack("<II", len(json_bytes), CHUNK_JSON), json_bytes]
+    if bin_chunk:
+        bin_bytes = _pad(bin_chunk, b"\x00")
+        parts += [struct.pack("<II", len(bin_bytes), CHUNK_BIN), bin_bytes]
+    body = b"".join(parts)
+    return struct.pack("<III", GLB_MAGIC, 2, 12 + len(body)) + body
@@ -0,0 +1,145 @@
+import functools
+import os
+import re
+from typing import FrozenSet, List, NamedTuple, Set, Tuple
+
+# Local grounding pre-check for the hallucination grader.
+# It only ever *accepts* a response (chit-chat, admitted ignorance, or near
+# verbatim overlap with the knowledge context); anything it is unsure about
+# still goes to the LLM grader. Every accepting rule skips the grader, so each
+# must be narrow: a negative claim ("X is not included") is still a claim, and
+# so is a bare "Yes, we do!" - its subject is in the question, not the reply.
+
+GROUNDING_PRECHECK = os.getenv("GROUNDING_PRECHECK", "1") == "1"
+# Share of the response's content words that must appear in the context
+GROUNDING_UNIGRAM_MIN = float(os.getenv("GROUNDING_UNIGRAM_MIN", "0.9"))
+# Share of the response's word trigrams that must appear verbatim in the context
+GROUNDING_TRIGRAM_MIN = float(os.getenv("GROUNDING_TRIGRAM_MIN", "0.5"))
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:['.,][a-z0-9]+)*")
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+# Capitalized words that are not sentence-initial: names, products, places
+_ENTITY_RE = re.compile(r"(?<![.!?]\s)(?<!^)\b[A-Z][a-zA-Z0-9]+")
+
+STOPWORDS = frozenset("""
+a an the and or but if then so of to in on at by for with from as is are was were be been being
+it its this that these those there here i me my we our you your he she they them their his her
+do does did done have has had will would can could should may might must shall not no yes
+what which who whom whose when where why how all any some each more most very just also too
+about into over under again than only own same such up down out off now
+""".split())
+
+# Words that carry no factual claim on their own
+CHIT_CHAT_WORDS = frozenset("""
+hello hi hey greetings welcome good morning afternoon evening day night nice meet meeting glad
+happy great thanks thank please sorry apologize apologies okay ok sure bye goodbye see later
+help assist assistance today anything else question questions ask feel free let know
+how doing well fine wonderful awesome there again pleasure absolutely certainly course
+i'm i'd i'll you're it's that's what's let's
+""".split())
+
+# Yes/no and negation words: they answer or flip a claim, so a reply containing
+# one is never chit-chat, and word overlap cannot verify it (the grader must)
+POLARITY_WORDS = frozenset("""
+yes yeah yep yup no nope nah not never none nothing nobody neither nor
+can't don't won't doesn't isn't aren't wasn't weren't didn't couldn't shouldn't wouldn't
+haven't hasn't hadn't mustn't cannot
+""".split())
+
+# A reply is chit-chat only if it says one of these (and nothing else of substance)
+PLEASANTRY_RE = re.compile(
+    r"^\s*(hello|hi|hey|greetings|good (morning|afternoon|evening)|howdy|yo)\b|"
+    r"\b(thanks|thank you|you're welcome|my pleasure|goodbye|bye|see you|welcome|"
+    r"(nice|glad|great) to (meet|see|hear|help)|how (can|may) i (help|assist)|anything else|"
+    r"let me know|feel free|have a (great|good|nice|wonderful) (day|evening|night|one)|"
+    r"how are you|doing (well|great|fine))\b",
+    re.IGNORECASE,
+)
+# The narrative prompt tells the avatar to admit when the answer is not in the documents.
+# Only phrases that say the *information* is missing; "not included", "I'm afraid" etc.
+# also open factual claims ("Shipping is not included in the price") and must be graded.
+ABSTAIN_RE = re.compile(
+    r"\b(i (do not|don't) know|"
+    r"i (cannot|can't|could not|couldn't) (find|answer|say)|"
+    r"i (do not|don't) have (any |that |this |enough )?(information|details)|"
+    r"i have no (information|details)|"
+    r"(not|isn't|is not) (mentioned |covered |included |stated |found )?(in|by) "
+    r"(the|my|our|your) (documents?|information|context|knowledge( base)?|materials?|sources?))\b",
+    re.IGNORECASE,
+)
+
+
+class Verdict(NamedTuple):
+    grounded: bool       # True = safe to skip the LLM grader
+    reason: str          # chit_chat | abstention | overlap | polarity | no_context | low_overlap | unsupported_entity | disabled
+    unigram: float = 0.0
+    trigram: float = 0.0
+
+
+def _stem(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(w) for w in _WORD_RE.findall(text.lower())]
+
+
+def _numbers(text: str) -> Set[str]:
+    return {n.replace(",", "") for n in _NUMBER_RE.findall(text)}
+
+
+@functools.lru_cache(maxsize=32)
+def _context_index(context: str) -> Tuple[FrozenSet[str], FrozenSet[Tuple[str, str, str]], FrozenSet[str], str]:
+    """Word set, trigram set, numbers and lowercased text of a knowledge context (reused across turns)."""
+    words = tokenize(context)
+    trigrams = frozenset(zip(words, words[1:], words[2:]))
+    return frozenset(words), trigrams, frozenset(_numbers(context)), context.lower()
+
+
+def precheck(user_input: str, response: str, context: str) -> Verdict:
+    """Decide whether `response` is obviously grounded without calling the LLM grader."""
+    if not GROUNDING_PRECHECK:
+        return Verdict(False, "disabled")
+
+    words = tokenize(response)
+    content = [w for w in words if w not in STOPWORDS and w not in CHIT_CHAT_WORDS]
+    polar = any(w in POLARITY_WORDS for w in words)
+
+    # Greetings / pleasantries: nothing that would need to be in the document
+    if not content and not polar and (not words or PLEASANTRY_RE.search(response)):
+        return Verdict(True, "chit_chat")
+
+    # "I don't know" style answers with at most a couple of topic words
+    if (ABSTAIN_RE.search(response) and len(content) <= 4 and not _numbers(response)
+            and " but " not in response.lower()):
+        return Verdict(True, "abstention")
+
+    # Yes/no answers and negations ("Returns are not accepted ...") flip a claim
+    # that word overlap would still match
+    if polar:
+        return Verdict(False, "polarity")
+
+    if not context or not context.strip():
+        return Verdict(False, "no_context")
+
+    context_words, context_trigrams, context_numbers, context_lower = _context_index(context)
+
+    # Every number and named entity must literally occur in the context
+    if not _numbers(response) <= context_numbers:
+        return Verdict(False, "unsupported_entity")
+    for entity in _ENTITY_RE.findall(response):
+        if entity.lower() not in context_lower and entity.lower() not in CHIT_CHAT_WORDS:
+            return Verdict(False, "unsupported_entity")
+
+    # No content words ("We do!") means nothing was matched, not everything
+    unigram = sum(w in context_words for w in content) / len(content) if content else 0.0
+    trigrams = list(zip(words, words[1:], words[2:]))
+    trigram = sum(t in context_trigrams for t in trigrams) / len(trigrams) if trigrams else unigram
+
+    if unigram >= GROUNDING_UNIGRAM_MIN and trigram >= GROUNDING_TRIGRAM_MIN:
+        return Verdict(True, "overlap", round(unigram, 3), round(trigram, 3))
+    return Verdict(False, "low_overlap", round(unigram, 3), round(trigram, 3))
@@ -0,0 +1,236 @@
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from app.config import global_state
+
+logger = logging.getLogger("scratch_space")
+
+# --- Config ---
+# Scratch root (debug captures by default); on tmpfs (/dev/shm) when available,
+# so short-lived files never hit a physical disk.
+SCRATCH_DIR = os.getenv("SCRATCH_DIR", "")
+# Files in scratch directories older than this are removed by the sweeper
+SCRATCH_MAX_AGE_S = float(os.getenv("SCRATCH_MAX_AGE_S", "900"))
+SCRATCH_SWEEP_INTERVAL_S = float(os.getenv("SCRATCH_SWEEP_INTERVAL_S", "300"))
+# Share of generated clips written to DEBUG_AUDIO_DIR for inspection (0 = off)
+DEBUG_AUDIO_SAMPLE_RATE = float(os.getenv("DEBUG_AUDIO_SAMPLE_RATE", "0"))
+DEBUG_AUDIO_DIR = os.getenv("DEBUG_AUDIO_DIR", "")
+# Newest captures kept; older ones are swept
+DEBUG_AUDIO_KEEP = int(os.getenv("DEBUG_AUDIO_KEEP", "50"))
+# Clips in the shared audio store are removed this long after they were last produced (0 = never)
+AUDIO_STORE_MAX_AGE_S = float(os.getenv("AUDIO_STORE_MAX_AGE_S", str(24 * 60 * 60)))
+
+# Directories left behind by older builds (temp files of failed syntheses)
+LEGACY_DIRS = ("tmp_audio",)
+_TMPFS_TYPES = {"tmpfs", "ramfs"}
+
+
+def _mounts() -> List[tuple]:
+    try:
+        with open("/proc/mounts") as f:
+            return [tuple(line.split()[1:3]) for line in f]
+    except OSError:
+        return []
+
+
+def filesystem_type(path: str) -> str:
+    """Filesystem type of the mount holding `path` ("" when unknown, e.g. not Linux)."""
+    path = os.path.realpath(path)
+    best, fs_type = "", ""
+    for mount_point, mount_type in _mounts():
+        inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+        if inside and len(mount_point) > len(best):
+            best, fs_type = mount_point, mount_type
+    return fs_type
+
+
+def is_tmpfs(path: str) -> bool:
+    return filesystem_type(path) in _TMPFS_TYPES
+
+
+def _pick_root() -> str:
+    if SCRATCH_DIR:
+        return SCRATCH_DIR
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK) and is_tmpfs(shm):
+        return os.path.join(shm, "personaflow")
+    return os.path.join(tempfile.gettempdir(), "personaflow_scratch")
+
+
+ROOT = _pick_root()
+os.makedirs(ROOT, exist_ok=True)
+DEBUG_AUDIO_DIR = DEBUG_AUDIO_DIR or os.path.join(ROOT, "debug_audio")
+
+_sweep_stats = {"runs": 0, "removed_files": 0, "removed_bytes": 0}
+_pending = set()
+
+
+# --- Disk I/O accounting ---
+
+class IOMeter:
+    """Disk bytes read and written on behalf of one request (including its background writes)."""
+
+    __slots__ = ("read_bytes", "write_bytes")
+
+    def __init__(self):
+        self.read_bytes = 0
+        self.write_bytes = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"disk_read_bytes": self.read_bytes, "disk_write_bytes": self.write_bytes}
+
+
+_meter: contextvars.ContextVar[Optional[IOMeter]] = contextvars.ContextVar("disk_io", default=None)
+
+
+def start_meter() -> IOMeter:
+    """Start metering the current request; tasks it spawns later report into the same meter."""
+    meter = IOMeter()
+    _meter.set(meter)
+    global_state.incr("disk.metered_requests")
+    return meter
+
+
+def record_read(nbytes: int):
+    global_state.incr("disk.read_bytes", nbytes)
+    meter = _meter.get()
+    if meter is not None:
+        meter.read_bytes += nbytes
+
+
+def record_write(nbytes: int):
+    global_state.incr("disk.write_bytes", nbytes)
+    meter = _meter.get()
+    if meter is not None:
+        meter.write_bytes += nbytes
+
+
+# --- Files ---
+
+def write_atomic(path: str, data: bytes):
+    """
+    Write via a temp file next to `path`, then rename: readers never see a
+    partial file, and the temp file is removed even when the write fails.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    record_write(len(data))
+
+
+# --- Sampled debug capture ---
+
+def _write_capture(path: str, audio: bytes):
+    os.makedirs(DEBUG_AUDIO_DIR, exist_ok=True)
+    write_atomic(path, audio)
+
+
+def capture_debug_audio(audio: bytes, name: str, ext: str = "mp3", rate: float = None) -> Optional[str]:
+    """
+    Write a sample of generated clips to DEBUG_AUDIO_DIR off the event loop.
+    Each capture gets its own file, so concurrent requests never contend for one.
+    Returns the path that will be written, or None when not sampled.
+    """
+    rate = DEBUG_AUDIO_SAMPLE_RATE if rate is None else rate
+    if not audio or rate <= 0 or random.random() >= rate:
+        return None
+    path = os.path.join(DEBUG_AUDIO_DIR, f"{int(time.time() * 1000)}-{name or uuid.uuid4().hex[:8]}.{ext}")
+
+    async def write():
+        try:
+            await asyncio.to_thread(_write_capture, path, audio)
+            logger.debug("Debug audio written to %s", path)
+        except OSError as e:
+            logger.warning("Failed to write debug audio: %s", e)
+
+    task = asyncio.get_running_loop().create_task(write())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+    return path
+
+
+# --- Sweeper ---
+
+def _remove(path: str, size: int):
+    try:
+        os.remove(path)
+    except OSError:
+        return
+    _sweep_stats["removed_files"] += 1
+    _sweep_stats["removed_bytes"] += size
+
+
+def _sweep_dir(directory: str, max_age_s: float, pattern_suffix: str = "", keep: int = 0):
+    """Remove files older than `max_age_s` (matching the suffix), then all but the newest `keep`."""
+    if not directory or not os.path.isdir(directory):
+        return
+    now = time.time()
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if not entry.is_file(follow_symlinks=False) or not entry.name.endswith(pattern_suffix):
+                continue
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if max_age_s and now - stat.st_mtime > max_age_s:
+                _remove(entry.path, stat.st_size)
+            else:
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+    if keep and len(entries) > keep:
+        entries.sort()
+        for _, path, size in entries[:-keep]:
+            _remove(path, size)
+
+
+def sweep():
+    """One sweep over every managed directory (blocking; run it off the event loop)."""
+    from app.services import audio_store
+
+    _sweep_dir(ROOT, SCRATCH_MAX_AGE_S)
+    for legacy in LEGACY_DIRS:
+        _sweep_dir(legacy, SCRATCH_MAX_AGE_S)
+    _sweep_dir(DEBUG_AUDIO_DIR, 0, keep=DEBUG_AUDIO_KEEP)
+    if audio_store.AUDIO_STORE_DIR:
+        # Half-written clips of crashed workers, then clips nobody rewrote for a long time
+        _sweep_dir(audio_store.AUDIO_STORE_DIR, SCRATCH_MAX_AGE_S, pattern_suffix=".tmp")
+        if AUDIO_STORE_MAX_AGE_S:
+            _sweep_dir(audio_store.AUDIO_STORE_DIR, AUDIO_STORE_MAX_AGE_S, pattern_suffix=".mp3")
+    _sweep_stats["runs"] += 1
+
+
+async def run_sweeper():
+    """Sweep at startup and then every SCRATCH_SWEEP_INTERVAL_S seconds (one worker only)."""
+    while True:
+        try:
+            await asyncio.to_thread(sweep)
+        except OSError as e:
+            logger.warning("Scratch sweep failed: %s", e)
+        await asyncio.sleep(SCRATCH_SWEEP_INTERVAL_S)
+
+
+def stats() -> Dict[str, object]:
+    counters = global_state.counters()
+    metered = counters["disk.metered_requests"]
+    return {
+        "root": ROOT,
+        "tmpfs": is_tmpfs(ROOT),
+        "read_bytes": int(counters["disk.read_bytes"]),
+        "write_bytes": int(counters["disk.write_bytes"]),
+        "write_bytes_per_request": round(counters["disk.write_bytes"] / metered, 1) if metered else 0.0,
+        "debug_audio_sample_rate": DEBUG_AUDIO_SAMPLE_RATE,
+        "sweeps": dict(_sweep_stats),
+    }
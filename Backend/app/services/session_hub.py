@@ -0,0 +1,207 @@
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+from app.config import global_state
+from app.services import fast_json
+
+logger = logging.getLogger("session_hub")
+
+# --- Limits ---
+# Outbound frames queued per connection before backpressure kicks in
+WS_SEND_QUEUE = int(os.getenv("WS_SEND_QUEUE", "64"))
+# A turn's frames wait at most this long for queue space; then the client is too slow
+WS_SEND_TIMEOUT_S = float(os.getenv("WS_SEND_TIMEOUT_S", "10"))
+# One heartbeat task for all sessions: ping every interval, close after idle timeout
+WS_HEARTBEAT_S = float(os.getenv("WS_HEARTBEAT_S", "20"))
+WS_IDLE_TIMEOUT_S = float(os.getenv("WS_IDLE_TIMEOUT_S", "60"))
+
+Frame = Union[Dict[str, Any], bytes]
+
+_ids = itertools.count(1)
+
+
+class Session:
+    """
+    One WebSocket connection.
+
+    Frames are written by a single sender task from a bounded queue, so a slow
+    client never blocks the event loop or other sessions. Droppable frames
+    (heartbeats, broadcast behaviors) are discarded when the queue is full;
+    turn replies wait for space and close the session if none frees up.
+    """
+
+    __slots__ = ("id", "websocket", "queue", "last_seen", "sender", "closed")
+
+    def __init__(self, websocket):
+        self.id = f"s{os.getpid()}-{next(_ids)}"
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE)
+        self.last_seen = time.monotonic()
+        self.sender: Optional[asyncio.Task] = None
+        self.closed = False
+
+    def start(self):
+        self.sender = asyncio.create_task(self._send_loop())
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+    def offer(self, frame: Frame) -> bool:
+        """Queue a droppable frame; False if the client is backed up."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            global_state.incr("ws.dropped_frames")
+            return False
+
+    async def send(self, frame: Frame):
+        """Queue a frame that must arrive, waiting for the client to catch up."""
+        if self.closed:
+            return
+        try:
+            await asyncio.wait_for(self.queue.put(frame), timeout=WS_SEND_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            logger.warning("Session %s too slow, closing", self.id)
+            global_state.incr("ws.slow_closes")
+            await self.close(code=1013)
+
+    async def _send_loop(self):
+        try:
+            while True:
+                frame = await self.queue.get()
+                if isinstance(frame, bytes):
+                    await self.websocket.send_bytes(frame)
+                else:
+                    await self.websocket.send_text(fast_json.dumps(frame).decode("utf-8"))
+        except Exception as e:
+            logger.debug("Session %s send failed: %s", self.id, e)
+        finally:
+            self.closed = True
+
+    async def close(self, code: int = 1000):
+        if self.closed:
+            return
+        self.closed = True
+        if self.sender is not None:
+            self.sender.cancel()
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+# --- Registry (per worker) ---
+_sessions: Dict[str, Session] = {}
+_heartbeat_task: Optional[asyncio.Task] = None
+
+
+def register(session: Session):
+    global _heartbeat_task
+    _sessions[session.id] = session
+    session.start()
+    global_state.incr("ws.sessions_opened")
+    if _heartbeat_task is None or _heartbeat_task.done():
+        _heartbeat_task = asyncio.create_task(_heartbeat_loop())
+
+
+async def unregister(session: Session, code: int = 1000):
+    if _sessions.pop(session.id, None) is not None:
+        global_state.incr("ws.sessions_closed")
+    await session.close(code=code)
+
+
+def get(session_id: str) -> Optional[Session]:
+    return _sessions.get(session_id)
+
+
+def broadcast(frame: Dict[str, Any], session_id: Optional[str] = None) -> int:
+    """Push a server-initiated frame to one or all sessions of this worker; returns how many accepted it."""
+    if session_id is not None:
+        session = _sessions.get(session_id)
+        return int(session is not None and session.offer(frame))
+    return sum(session.offer(frame) for session in list(_sessions.values()))
+
+
+# --- Cross-worker delivery (serve.py multi-worker mode) ---
+
+def _owner_pid(session_id: str) -> Optional[int]:
+    """Session ids are "s<pid>-<n>": the pid of the worker holding the connection."""
+    pid, _, _ = session_id[1:].partition("-")
+    return int(pid) if session_id.startswith("s") and pid.isdigit() else None
+
+
+async def dispatch(frame: Dict[str, Any], session_id: Optional[str] = None) -> Tuple[int, int]:
+    """
+    broadcast() across all workers. Returns (sessions that accepted the frame on
+    this worker, workers it was relayed to); relayed deliveries are not counted.
+    Raises LookupError when a targeted session is not connected to any worker.
+    """
+    delivered = broadcast(frame, session_id)
+    if session_id is not None and session_id in _sessions:
+        return delivered, 0
+    if session_id is not None:
+        owner = global_state.worker_index_of(_owner_pid(session_id) or -1)
+        if owner is None or owner == global_state.WORKER_INDEX:
+            raise LookupError(f"session {session_id} is not connected")
+        targets = [owner]
+    elif global_state.relay_enabled():
+        targets = [i for i in range(global_state.WORKERS) if i != global_state.WORKER_INDEX]
+    else:
+        targets = []
+
+    message = fast_json.dumps({"frame": frame, "session_id": session_id})
+    for index in targets:
+        await asyncio.to_thread(global_state.relay, index, message)
+    return delivered, len(targets)
+
+
+def _deliver_relayed(message: bytes):
+    relayed = fast_json.loads(message)
+    broadcast(relayed["frame"], relayed["session_id"])
+
+
+def start_relay():
+    """Deliver frames other workers relay to this one (no-op in single-process mode)."""
+    inbox = global_state.relay_inbox()
+    if inbox is None:
+        return
+    loop = asyncio.get_running_loop()
+
+    def read():
+        while True:
+            try:
+                message = inbox.recv_bytes()
+            except (EOFError, OSError):
+                return
+            loop.call_soon_threadsafe(_deliver_relayed, message)
+
+    threading.Thread(target=read, name="session-relay", daemon=True).start()
+
+
+async def _heartbeat_loop():
+    """Single task for every session: ping the quiet ones, close the dead ones."""
+    while _sessions:
+        await asyncio.sleep(WS_HEARTBEAT_S)
+        now = time.monotonic()
+        for session in list(_sessions.values()):
+            idle = now - session.last_seen
+            if idle > WS_IDLE_TIMEOUT_S:
+                logger.info("Session %s idle for %.0fs, closing", session.id, idle)
+                await unregister(session, code=1001)
+            elif idle > WS_HEARTBEAT_S:
+                session.offer({"type": "ping", "t": round(time.time(), 3)})
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        "active": len(_sessions),
+        "queued_frames": sum(s.queue.qsize() for s in _sessions.values()),
+    }
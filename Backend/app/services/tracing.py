@@ -0,0 +1,357 @@
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("tracing")
+
+# --- Config ---
+# Fraction of requests traced; 0 disables tracing (spans become no-ops).
+# A request can force tracing with the "X-Trace: 1" header.
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+# Flight recorder: keep the slowest N traces, plus the most recent N
+TRACE_KEEP = int(os.getenv("TRACE_KEEP", "50"))
+SERVICE_NAME = os.getenv("SERVICE_NAME", "personaflow-backend")
+
+REQUEST_ID_HEADER = b"x-request-id"
+FORCE_TRACE_HEADER = b"x-trace"
+
+
+class Span:
+    __slots__ = ("span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error = None
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6 if self.end_ns else 0.0
+
+
+class Trace:
+    """All spans of one request; the first span is the root."""
+
+    def __init__(self, name: str, request_id: str, attributes: Dict[str, Any]):
+        self.trace_id = secrets.token_hex(16)
+        self.request_id = request_id
+        self.root = Span(name, None, attributes)
+        self.spans: List[Span] = [self.root]
+        self._lock = threading.Lock()  # brain nodes may add spans from worker threads
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+
+    @property
+    def duration_ms(self) -> float:
+        return self.root.duration_ms
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span", default=None)
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="")
+
+
+def new_request_id() -> str:
+    return secrets.token_hex(8)
+
+
+def current_request_id() -> str:
+    return _request_id.get()
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+# --- Recording API ---
+
+class _NoopSpan:
+    """Returned when the request is not sampled; every call is a cheap no-op."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _SpanScope:
+    __slots__ = ("trace", "span", "token")
+
+    def __init__(self, trace: Trace, name: str, attributes: Dict[str, Any]):
+        parent = _current_span.get() or trace.root
+        self.trace = trace
+        self.span = Span(name, parent.span_id, attributes)
+
+    def __enter__(self):
+        self.trace.add(self.span)
+        self.token = _current_span.set(self.span)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.end_ns = time.time_ns()
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self.token)
+        return False
+
+    def set(self, **attributes):
+        self.span.attributes.update(attributes)
+
+
+def span(name: str, **attributes):
+    """Time a stage of the current request: `with tracing.span("cache.lookup"): ...`"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP
+    return _SpanScope(trace, name, attributes)
+
+
+def set_attributes(**attributes):
+    """Attach attributes to the innermost open span of the current trace."""
+    if _current_trace.get() is None:
+        return
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+@asynccontextmanager
+async def acquire(name: str, semaphore):
+    """`async with semaphore`, with the wait for a slot recorded as a span."""
+    if _current_trace.get() is None:
+        async with semaphore:
+            yield
+        return
+    with span(name):
+        await semaphore.__aenter__()
+    try:
+        yield
+    finally:
+        await semaphore.__aexit__(None, None, None)
+
+
+def traced(name: str):
+    """Decorator recording each call of a sync function (e.g. a LangGraph node) as a span."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _sampled(force: bool = False) -> bool:
+    if force:
+        return True
+    return TRACE_SAMPLE_RATE > 0 and (TRACE_SAMPLE_RATE >= 1 or random.random() < TRACE_SAMPLE_RATE)
+
+
+@contextmanager
+def trace(name: str, request_id: str = "", force: bool = False, **attributes):
+    """Root of a request; spans opened inside are recorded when the request is sampled."""
+    rid_token = _request_id.set(request_id or new_request_id())
+    if not _sampled(force):
+        try:
+            yield None
+        finally:
+            _request_id.reset(rid_token)
+        return
+
+    current = Trace(name, _request_id.get(), attributes)
+    trace_token = _current_trace.set(current)
+    span_token = _current_span.set(current.root)
+    try:
+        yield current
+    except BaseException as e:
+        current.root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.root.end_ns = time.time_ns()
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        _request_id.reset(rid_token)
+        recorder.record(current)
+
+
+# --- Flight recorder ---
+
+class FlightRecorder:
+    """Bounded store of the slowest and the most recent finished traces."""
+
+    def __init__(self, keep: int):
+        self.keep = keep
+        self._slowest = []  # min-heap of (duration_ms, seq, trace)
+        self._recent = deque(maxlen=keep)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def record(self, trace: Trace):
+        item = (trace.duration_ms, next(self._seq), trace)
+        with self._lock:
+            self.recorded += 1
+            self._recent.append(trace)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, item)
+            elif item[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, item)
+
+    def slowest(self, limit: int = None) -> List[Trace]:
+        with self._lock:
+            traces = [t for _, _, t in sorted(self._slowest, reverse=True)]
+        return traces[:limit]
+
+    def recent(self, limit: int = None) -> List[Trace]:
+        with self._lock:
+            traces = list(reversed(self._recent))
+        return traces[:limit]
+
+    def find(self, trace_or_request_id: str) -> Optional[Trace]:
+        with self._lock:
+            candidates = list(self._recent) + [t for _, _, t in self._slowest]
+        for t in candidates:
+            if trace_or_request_id in (t.trace_id, t.request_id):
+                return t
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._slowest.clear()
+            self._recent.clear()
+
+
+recorder = FlightRecorder(TRACE_KEEP)
+
+
+# --- Export ---
+
+def summary(trace: Trace) -> Dict[str, Any]:
+    """Compact view: span tree flattened with offsets from the request start."""
+    start = trace.root.start_ns
+    return {
+        "trace_id": trace.trace_id,
+        "request_id": trace.request_id,
+        "name": trace.root.name,
+        "duration_ms": round(trace.duration_ms, 2),
+        "error": trace.root.error,
+        "spans": [
+            {
+                "name": s.name,
+                "span_id": s.span_id,
+                "parent_id": s.parent_id,
+                "offset_ms": round((s.start_ns - start) / 1e6, 2),
+                "duration_ms": round(s.duration_ms, 2),
+                "attributes": s.attributes,
+                **({"error": s.error} if s.error else {}),
+            }
+            for s in trace.spans
+        ],
+    }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()]
+
+
+def to_otlp(traces: List[Trace]) -> Dict[str, Any]:
+    """OTLP/JSON (ExportTraceServiceRequest) so traces load into any OpenTelemetry collector."""
+    spans = []
+    for t in traces:
+        for s in t.spans:
+            attributes = dict(s.attributes)
+            if s is t.root:
+                attributes["request.id"] = t.request_id
+            spans.append({
+                "traceId": t.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": 2 if s is t.root else 1,  # SERVER / INTERNAL
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns or s.start_ns),
+                "attributes": _otlp_attributes(attributes),
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME, "process.pid": os.getpid()})},
+            "scopeSpans": [{"scope": {"name": "personaflow.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+# --- ASGI middleware ---
+
+class TracingMiddleware:
+    """
+    Assigns every HTTP request an id (kept from X-Request-ID when the client
+    sends one), echoes it in the response and roots the request's trace.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = ""
+        force = False
+        for key, value in scope.get("headers", ()):
+            if key == REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")[:64]
+            elif key == FORCE_TRACE_HEADER:
+                force = value == b"1"
+        request_id = request_id or new_request_id()
+
+        with trace(f"{scope['method']} {scope['path']}", request_id=request_id, force=force,
+                   **{"http.method": scope["method"], "http.target": scope["path"]}) as current:
+
+            async def send_with_id(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((REQUEST_ID_HEADER, request_id.encode("latin-1")))
+                    if current is not None:
+                        headers.append((b"x-trace-id", current.trace_id.encode("latin-1")))
+                        current.root.attributes["http.status_code"] = message["status"]
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_id)
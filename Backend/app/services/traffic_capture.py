@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+from app.services import cache_keys, tracing
+
+logger = logging.getLogger("traffic_capture")
+
+# Opt-in: append one JSON line per captured request to this file ("" = off)
+CAPTURE_PATH = os.getenv("CAPTURE_PATH", "")
+# Request paths that are captured
+CAPTURE_PATHS = tuple(p for p in os.getenv("CAPTURE_PATHS", "/generate/").split(",") if p)
+# "hash" (default): keep only a prompt digest. "redact": keep the prompt text with
+# emails/URLs/long numbers masked - that is raw user input on disk, so opt-in only.
+CAPTURE_PROMPT_MODE = os.getenv("CAPTURE_PROMPT_MODE", "hash")
+# Larger bodies are not parsed (still timed)
+CAPTURE_MAX_BODY = int(os.getenv("CAPTURE_MAX_BODY", str(256 * 1024)))
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_URL_RE = re.compile(r"https?://\S+")
+_LONG_NUMBER_RE = re.compile(r"\+?\d[\d\s().-]{5,}\d")
+
+
+def redact(text: str) -> str:
+    text = _EMAIL_RE.sub("<email>", text)
+    text = _URL_RE.sub("<url>", text)
+    return _LONG_NUMBER_RE.sub("<number>", text)
+
+
+def anonymize(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The parts of a /generate/ body that drive caching and cost: prompt digest
+    (or masked text with CAPTURE_PROMPT_MODE=redact), persona id/digest/voice and
+    a digest of the knowledge context.
+    Persona prompts and context documents are never written.
+    """
+    prompt = payload.get("prompt") or ""
+    persona = payload.get("persona") or {}
+    node_graph = payload.get("nodeGraph")
+    record = {"prompt_len": len(prompt)}
+    if CAPTURE_PROMPT_MODE == "redact":
+        record["prompt"] = redact(prompt)
+    else:
+        record["prompt_hash"] = cache_keys.prompt_digest(prompt)
+    record.update({
+        "persona": persona.get("id"),
+        "persona_hash": cache_keys.persona_digest(persona),
+        "voice": persona.get("voice"),
+        "ctx": cache_keys.context_digest(node_graph),
+        "ctx_len": len(node_graph if isinstance(node_graph, str) else cache_keys.canonical_json(node_graph or "")),
+    })
+    if payload.get("inline_audio_max_bytes") is not None:
+        record["inline"] = payload["inline_audio_max_bytes"]
+    return record
+
+
+class CaptureLog:
+    """Append-only JSONL log; each record is one O_APPEND write, so workers can share the file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self.records = 0
+
+    def write(self, record: Dict[str, Any]):
+        line = (json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            os.write(self._fd, line)
+            self.records += 1
+        except OSError as e:
+            logger.warning("Traffic capture write failed: %s", e)
+
+
+class CaptureMiddleware:
+    """ASGI middleware recording anonymized requests and their timing to CAPTURE_PATH."""
+
+    def __init__(self, app, path: str = None):
+        self.app = app
+        self.log = CaptureLog(path or CAPTURE_PATH)
+        if CAPTURE_PROMPT_MODE == "redact":
+            logger.warning("Traffic capture keeps prompt text (CAPTURE_PROMPT_MODE=redact) in %s", self.log.path)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in CAPTURE_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        ts = time.time()
+        start = time.perf_counter()
+        body = bytearray()
+        response = {"status": 0, "bytes": 0}
+
+        async def receive_and_keep():
+            message = await receive()
+            if message["type"] == "http.request" and len(body) <= CAPTURE_MAX_BODY:
+                body.extend(message.get("body", b""))
+            return message
+
+        async def send_and_measure(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_keep, send_and_measure)
+        finally:
+            # Runs inside TracingMiddleware: ties the record to the request's logs and trace
+            record = {"ts": round(ts, 3), "path": scope["path"], "request_id": tracing.current_request_id()}
+            try:
+                if len(body) > CAPTURE_MAX_BODY:
+                    raise ValueError("body too large")
+                record.update(anonymize(json.loads(body)))
+            except (ValueError, AttributeError, TypeError):
+                record["unparsed"] = True
+            record.update({
+                "status": response["status"],
+                "ms": round((time.perf_counter() - start) * 1000, 1),
+                "bytes": response["bytes"],
+            })
+            self.log.write(record)
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.config import global_state
+from app.services import circuit_breaker
+from app.services.circuit_breaker import get_breaker
+
+logger = logging.getLogger("tts")
+
+# --- Config ---
+# Preference order; the first healthy backend that fits the latency budget wins
+TTS_BACKENDS = [b.strip() for b in os.getenv("TTS_BACKENDS", "edge,espeak").split(",") if b.strip()]
+# Default latency budget per synthesis (ms); callers may pass their own
+TTS_LATENCY_BUDGET_MS = float(os.getenv("TTS_LATENCY_BUDGET_MS", "4000"))
+# Per-attempt timeout, below the request's TTS_TIMEOUT_S so a fallback still fits
+TTS_BACKEND_TIMEOUT_S = float(os.getenv("TTS_BACKEND_TIMEOUT_S", "6"))
+# JSON {"<edge voice>": "<espeak voice>"} extending LOCAL_VOICE_MAP
+TTS_VOICE_MAP = os.getenv("TTS_VOICE_MAP", "")
+
+ESPEAK_BIN = os.getenv("ESPEAK_BIN", "espeak-ng")
+ESPEAK_RATE_WPM = int(os.getenv("ESPEAK_RATE_WPM", "165"))
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+# Transcode local WAV to MP3 when ffmpeg is installed (0 = always serve WAV)
+TTS_LOCAL_MP3 = os.getenv("TTS_LOCAL_MP3", "1") == "1"
+
+# Edge voice -> espeak-ng voice. Unlisted voices fall back to "<lang>-<region>"
+# with a male/female variant picked from FEMALE_VOICE_NAMES.
+LOCAL_VOICE_MAP = {
+    "en-US-GuyNeural": "en-us+m3",
+    "en-US-JennyNeural": "en-us+f3",
+    "en-US-AriaNeural": "en-us+f2",
+    "en-GB-SoniaNeural": "en-gb+f3",
+    "en-GB-RyanNeural": "en-gb+m3",
+}
+FEMALE_VOICE_NAMES = {
+    "Jenny", "Aria", "Ana", "Michelle", "Sonia", "Libby", "Natasha", "Clara",
+    "Emma", "Ava", "Nanami", "Xiaoxiao", "Katja", "Denise", "Elvira", "Isabella",
+}
+
+# Rough ms per character before any call has been measured
+_INITIAL_MS_PER_CHAR = {"edge": 25.0, "espeak": 0.5}
+_EWMA_ALPHA = 0.2
+_MIN_CHARS = 20  # short texts are dominated by fixed overhead
+
+
+class TTSBackend:
+    """One synthesizer. Subclasses implement `_synthesize` and `map_voice`."""
+
+    name = "base"
+    local = False
+
+    def __init__(self):
+        self.ms_per_char = _INITIAL_MS_PER_CHAR.get(self.name, 10.0)
+        self.breaker = get_breaker(f"tts_backend:{self.name}")
+
+    def available(self) -> bool:
+        return True
+
+    def map_voice(self, voice: str) -> Optional[str]:
+        """Backend-specific voice for a persona voice, or None if unsupported."""
+        return voice
+
+    def estimate_ms(self, text: str) -> float:
+        return self.ms_per_char * max(len(text), _MIN_CHARS)
+
+    async def synthesize(self, text: str, voice: str) -> bytes:
+        """Audio bytes (MP3 or WAV), b"" on failure; updates health and latency stats."""
+        start = time.perf_counter()
+        try:
+            audio = await asyncio.wait_for(
+                self._synthesize(text, self.map_voice(voice)), timeout=TTS_BACKEND_TIMEOUT_S
+            )
+        except Exception as e:
+            logger.warning("TTS backend %s failed: %s", self.name, e)
+            audio = b""
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        global_state.incr(f"tts.{self.name}.calls")
+        if not audio:
+            global_state.incr(f"tts.{self.name}.failures")
+            self.breaker.record_failure()
+            return b""
+        global_state.incr(f"tts.{self.name}.ms", elapsed_ms)
+        self.breaker.record_success()
+        sample = elapsed_ms / max(len(text), _MIN_CHARS)
+        self.ms_per_char += _EWMA_ALPHA * (sample - self.ms_per_char)
+        return audio
+
+    async def _synthesize(self, text: str, voice: str) -> bytes:
+        raise NotImplementedError
+
+
+class EdgeTTSBackend(TTSBackend):
+    """Microsoft Edge neural voices (remote; best quality)."""
+
+    name = "edge"
+
+    async def _synthesize(self, text: str, voice: str) -> bytes:
+        # Imported on first use: edge_tts pulls in aiohttp (~200ms of app import)
+        import edge_tts
+
+        # Streamed straight into memory: no temp file to write, read back or leak
+        communicate = edge_tts.Communicate(text, voice)
+        chunks = []
+        async for message in communicate.stream():
+            if message["type"] == "audio":
+                chunks.append(message["data"])
+        b = b"".join(chunks)
+
+        if len(b) == 0:
+            logger.error("TTS stream returned no audio")
+        return b
+
+
+class EspeakBackend(TTSBackend):
+    """Local espeak-ng synthesis on the CPU: robotic but offline and millisecond-fast."""
+
+    name = "espeak"
+    local = True
+
+    def __init__(self):
+        super().__init__()
+        self.binary = shutil.which(ESPEAK_BIN)
+        self.ffmpeg = shutil.which(FFMPEG_BIN) if TTS_LOCAL_MP3 else None
+        self.voice_map = dict(LOCAL_VOICE_MAP)
+        if TTS_VOICE_MAP:
+            self.voice_map.update(json.loads(TTS_VOICE_MAP))
+
+    def available(self) -> bool:
+        return self.binary is not None
+
+    def map_voice(self, voice: str) -> Optional[str]:
+        if voice in self.voice_map:
+            return self.voice_map[voice]
+        parts = (voice or "").split("-")
+        if len(parts) < 3:
+            return None
+        name = parts[2].replace("Neural", "").replace("Multilingual", "")
+        variant = "f3" if name in FEMALE_VOICE_NAMES else "m3"
+        return f"{parts[0]}-{parts[1]}+{variant}".lower()
+
+    async def _run(self, *args, data: bytes) -> bytes:
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            out, err = await proc.communicate(data)
+        except asyncio.CancelledError:
+            proc.kill()
+            raise
+        if proc.returncode != 0:
+            raise RuntimeError(f"{args[0]} exited {proc.returncode}: {err.decode(errors='replace')[:200]}")
+        return out
+
+    async def _synthesize(self, text: str, voice: str) -> bytes:
+        # Text goes through stdin so it can never be parsed as an option
+        wav = await self._run(
+            self.binary, "--stdin", "--stdout", "-v", voice or "en-us", "-s", str(ESPEAK_RATE_WPM),
+            data=text.encode("utf-8"),
+        )
+        if not self.ffmpeg or not wav:
+            return wav
+        return await self._run(
+            self.ffmpeg, "-loglevel", "error", "-f", "wav", "-i", "pipe:0",
+            "-f", "mp3", "-b:a", "48k", "pipe:1",
+            data=wav,
+        )
+
+
+_BACKEND_TYPES = {"edge": EdgeTTSBackend, "espeak": EspeakBackend}
+_backends: Dict[str, TTSBackend] = {}
+
+
+def get_backends() -> List[TTSBackend]:
+    """Configured backends in preference order (created on first use)."""
+    if not _backends:
+        for name in TTS_BACKENDS:
+            if name not in _BACKEND_TYPES:
+                logger.warning("Unknown TTS backend '%s' ignored", name)
+                continue
+            _backends[name] = _BACKEND_TYPES[name]()
+    return list(_backends.values())
+
+
+def plan(text: str, voice: str, budget_ms: Optional[float] = None) -> List[TTSBackend]:
+    """
+    Order in which backends are tried for this text:
+    healthy backends that support the voice and fit the latency budget (in
+    preference order), then the remaining healthy ones fastest first, then
+    those whose breaker is open (tried only once it lets a probe through).
+    """
+    budget_ms = TTS_LATENCY_BUDGET_MS if budget_ms is None else budget_ms
+    candidates = [b for b in get_backends() if b.available() and b.map_voice(voice)]
+    healthy = [b for b in candidates if b.breaker.state != circuit_breaker.OPEN]
+    within = [b for b in healthy if b.estimate_ms(text) <= budget_ms]
+    over = sorted((b for b in healthy if b not in within), key=lambda b: b.estimate_ms(text))
+    return within + over + [b for b in candidates if b not in healthy]
+
+
+async def synthesize(text: str, voice: str, budget_ms: Optional[float] = None) -> Tuple[bytes, str]:
+    """(audio, backend name) from the first backend in plan() that succeeds; (b"", "") if all fail."""
+    for backend in plan(text, voice, budget_ms):
+        if not backend.breaker.allow():
+            continue
+        audio = await backend.synthesize(text, voice)
+        if audio:
+            logger.debug("TTS %s generated %d bytes", backend.name, len(audio))
+            return audio, backend.name
+    return b"", ""
+
+
+def is_fallback(name: str) -> bool:
+    """
+    True for audio from any backend but the preferred available one (e.g. espeak
+    while edge is down or over budget). Such clips are served, but not cached by
+    (text, voice), snapshotted or pinned: the next request retries the preferred
+    voice instead of replaying the fallback one for the cache TTL.
+    """
+    preferred = next((b.name for b in get_backends() if b.available()), None)
+    return name != preferred
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    counters = global_state.counters()
+    out = {}
+    for name in global_state.TTS_BACKEND_NAMES:
+        calls = counters[f"tts.{name}.calls"]
+        successes = calls - counters[f"tts.{name}.failures"]
+        backend = _backends.get(name)
+        out[name] = {
+            "configured": backend is not None,
+            "available": bool(backend and backend.available()),
+            "calls": int(calls),
+            "failures": int(counters[f"tts.{name}.failures"]),
+            "avg_ms": counters[f"tts.{name}.ms"] / successes if successes else 0.0,
+            "ms_per_char": round(backend.ms_per_char, 3) if backend else None,
+        }
+    return out
@@ -1,57 +1,69 @@
-import edge_tts
 import base64
-import uuid
-import os
-import asyncio
 import logging
+from typing import Optional, Tuple
+
+from app.services import tts_backends
 
 logger = logging.getLogger("tts")
 logger.setLevel(logging.DEBUG)
 
-TEMP_DIR = "tmp_audio"
-os.makedirs(TEMP_DIR, exist_ok=True)
+DEFAULT_VOICE = "en-US-GuyNeural"
+
+# ~0.26s of silent MPEG-1 Layer III (32 kbps, 44.1 kHz, mono): 10 frames whose
+# zeroed side info decodes to silence. Used as fast-fail audio when TTS is down.
+_SILENT_FRAME = b"\xff\xfb\x10\xc0" + b"\x00" * 100
+SILENT_MP3 = _SILENT_FRAME * 10
+
+async def text_to_speech_base64(text: str, voice: str = DEFAULT_VOICE):
+    """
+    Synthesize text and return the audio as a base64 string.
+    """
+    audio = await text_to_speech_bytes(text, voice)
+    return base64.b64encode(audio).decode("utf-8") if audio else ""
+
+async def text_to_speech_bytes(text: str, voice: str = DEFAULT_VOICE, budget_ms: Optional[float] = None) -> bytes:
+    """
+    Synthesize text with the best available backend (see tts_backends.plan)
+    and return the raw audio bytes (b"" on failure).
+    """
+    audio, _ = await synthesize(text, voice, budget_ms)
+    return audio
 
-async def text_to_speech_base64(text: str, voice: str = "en-US-GuyNeural"):
+async def synthesize(text: str, voice: str = DEFAULT_VOICE, budget_ms: Optional[float] = None) -> Tuple[bytes, str]:
     """
-    Use edge-tts to synthesize text to mp3 and return base64 string.
+    Like text_to_speech_bytes, but returns (audio, backend name), (b"", "") on
+    failure. Callers that cache by (text, voice) skip clips for which
+    is_cacheable() is False.
     """
     # Validate inputs
     if not text or not text.strip():
         logger.warning("TTS called with empty text")
-        return ""
+        return b"", ""
     
     if not voice:
         logger.warning("TTS called with empty voice, using default")
-        voice = "en-US-GuyNeural"
+        voice = DEFAULT_VOICE
     
     try:
         logger.debug(f"TTS generating audio: text='{text[:100]}...', voice='{voice}'")
-        filename = os.path.join(TEMP_DIR, f"{uuid.uuid4().hex}.mp3")
-        communicate = edge_tts.Communicate(text, voice)
-        await communicate.save(filename)
-        
-        # Check if file was created and has content
-        if not os.path.exists(filename):
-            logger.error("TTS file was not created")
-            return ""
-        
-        with open(filename, "rb") as f:
-            b = f.read()
-        
+        b, backend = await tts_backends.synthesize(text, voice, budget_ms=budget_ms)
         if len(b) == 0:
-            logger.error("TTS file is empty")
-            return ""
-        
-        # Cleanup
-        try:
-            os.remove(filename)
-        except OSError as e:
-            logger.warning(f"Failed to remove temp file: {e}")
-        
-        result = base64.b64encode(b).decode("utf-8")
+            logger.error("TTS produced no audio from any backend")
+            return b"", ""
         logger.debug(f"TTS generated {len(b)} bytes of audio")
-        return result
+        return b, backend
         
     except Exception as e:
         logger.exception(f"TTS error: {e}")
-        return ""
+        return b"", ""
+
+def is_cacheable(backend: str) -> bool:
+    """Whether audio from `backend` may be cached by text and voice (see tts_backends.is_fallback)."""
+    return not tts_backends.is_fallback(backend)
+
+
+def audio_media_type(data: bytes) -> str:
+    """MIME type of synthesized audio (local backends may produce WAV)."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return "audio/wav"
+    return "audio/mpeg"
@@ -1,13 +1,30 @@
+import time
+_import_start = time.perf_counter()
+
+import asyncio
 import logging
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.services import tts_service, cache_service
-# from app.routers.health import router as health_router
+from app.services import tts_service, cache_service, cache_keys, cache_snapshot, canned_responses, audio_store, scratch_space, session_hub, tracing, traffic_capture
+from app.config import global_state
+from app.routers.health import router as health_router
 # from app.routers.interact import router as interact_router
 from app.routers.generate import router as generate_router
 from app.routers.trigger import router as trigger_router
-# from app.routers.metrics import router as metrics_router
+from app.routers.metrics import router as metrics_router
+from app.routers.audio import router as audio_router
+from app.routers.animations import router as animations_router
+from app.routers.session import router as session_router
+from app.routers.debug import router as debug_router
+
+try:
+    from app import brain
+except ImportError:
+    brain = None
+
+# Imports must stay cheap: heavy LangChain/LangGraph modules load lazily in app.brain
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "500"))
 
 # --- Logging ---
 log_level = logging.DEBUG if os.getenv("DEBUG", "1") == "1" else logging.INFO
@@ -19,6 +36,11 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 logger.info("Logging initialized")
 
+import_ms = (time.perf_counter() - _import_start) * 1000
+global_state.startup_profile["import_ms"] = round(import_ms, 1)
+if import_ms > IMPORT_BUDGET_MS:
+    logger.warning("Import took %.0fms, over the %.0fms budget", import_ms, IMPORT_BUDGET_MS)
+
 # --- FastAPI app ---
 app = FastAPI(title="PersonaFlow Backend (Dev)")
 
@@ -28,14 +50,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Trace-ID"],
 )
+# Opt-in anonymized request log for offline replay (tools/replay_traffic.py);
+# added before tracing so it runs inside it and sees the request/trace ids
+if traffic_capture.CAPTURE_PATH:
+    app.add_middleware(traffic_capture.CaptureMiddleware)
+# Request ids and sampled traces (added last = outermost, so traces include CORS handling and capture)
+app.add_middleware(tracing.TracingMiddleware)
 
 # --- Include routers ---
-# app.include_router(health_router, prefix="/health")
+app.include_router(health_router, prefix="/health")
 # app.include_router(interact_router, prefix="/interact")
 app.include_router(generate_router, prefix="/generate")
 app.include_router(trigger_router)  # No prefix - endpoint is /trigger-action
-# app.include_router(metrics_router, prefix="/metrics")
+app.include_router(metrics_router)  # No prefix - endpoint is /metrics
+app.include_router(audio_router, prefix="/audio")
+app.include_router(animations_router, prefix="/animations")
+app.include_router(session_router)  # No prefix - endpoint is /ws/session
+app.include_router(debug_router, prefix="/debug")
 
 @app.get("/")
 async def root():
@@ -43,25 +76,80 @@ async def root():
 
 # --- Prewarm TTS cache at startup ---
 async def prewarm_tts():
-    from app.config.global_state import TTS_SEMAPHORE
-
     for text in ["Hello!", "Welcome!"]:
-        k = f"{text}::default"
-        if k not in cache_service.audio_cache:
+        k = cache_keys.audio_key(text, tts_service.DEFAULT_VOICE)
+        if cache_service.lookup_audio(k) is None:
             try:
-                async with TTS_SEMAPHORE:
-                    audio = await tts_service.text_to_speech_base64(text)
-                if audio:
-                    cache_service.audio_cache[k] = audio
+                async with global_state.TTS_SEMAPHORE:
+                    audio, backend = await tts_service.synthesize(text)
+                if audio and tts_service.is_cacheable(backend):
+                    audio_hash = cache_service.put_audio(audio)
+                    cache_service.audio_index[k] = audio_hash
+                    await audio_store.save(audio_hash, audio)
                     logger.info("Prewarmed TTS for: %s", text)
             except Exception as e:
                 logger.warning("Prewarm TTS failed for '%s': %s", text, e)
 
+# --- Background startup work (does not block serving /health/live) ---
+_background_tasks = set()
+
+def _spawn_background(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def load_brain():
+    """Import and compile the brain off the event loop; gates /health/ready."""
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(brain.warm)
+        global_state.readiness["brain"] = True
+    except Exception as e:
+        global_state.startup_errors["brain"] = str(e)
+        logger.warning("Brain failed to load: %s", e)
+    global_state.startup_profile["brain_load_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+async def run_prewarm():
+    start = time.perf_counter()
+    await prewarm_tts()
+    # Goodbye / refusal / fallback replies per persona, pinned in memory
+    await canned_responses.prerender()
+    global_state.startup_profile["tts_prewarm_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info("TTS prewarm completed")
+
+async def warm_caches(prewarm: bool):
+    # Restore the last snapshot first, so prewarm only synthesizes what is missing
+    await cache_snapshot.restore()
+    if prewarm:
+        await run_prewarm()
+
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up PersonaFlow backend...")
-    await prewarm_tts()
-    logger.info("TTS prewarm completed")
+    if brain is not None:
+        global_state.readiness["brain"] = brain.is_loaded()
+        if not brain.is_loaded():
+            _spawn_background(load_brain())
+    # Prewarm is best effort and never gates readiness; the snapshot restore
+    # gates it only with CACHE_RESTORE_READY_FRACTION > 0. In multi-worker mode
+    # every worker restores all workers' snapshots into its own caches; only the
+    # "prewarm" leader synthesizes what is still missing (into the shared audio store).
+    if cache_snapshot.CACHE_RESTORE_READY_FRACTION > 0 and not cache_snapshot.restored():
+        global_state.readiness["cache"] = False
+    _spawn_background(warm_caches(global_state.claim_leader("prewarm")))
+    # Every worker snapshots its own caches (to its own file) periodically and on shutdown
+    if cache_snapshot.CACHE_SNAPSHOT_PATH:
+        _spawn_background(cache_snapshot.run_periodic())
+    # Scratch files, debug captures and stale stored clips are swept by one worker
+    if global_state.claim_leader("scratch_sweep"):
+        _spawn_background(scratch_space.run_sweeper())
+    # Triggers posted to another worker reach this worker's sessions through its relay pipe
+    session_hub.start_relay()
+    global_state.startup_profile["startup_ms"] = round((time.perf_counter() - _import_start) * 1000, 1)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await cache_snapshot.save()
 
 
 
@@ -0,0 +1,154 @@
+"""
+Multi-worker launcher for the PersonaFlow backend.
+
+    WORKERS=4 python serve.py
+
+The parent process binds the listening socket, switches global state to shared
+memory (upstream concurrency limits, metrics counters, leader flags) and forks
+the workers right away, so /health/live answers within the cold-start budget.
+Each worker loads the brain and restores the cache snapshot in the background;
+the "prewarm" leader worker also prewarms the TTS cache and the canned replies.
+Crashed workers are restarted after their semaphore permits and leader roles
+are reclaimed, with exponential backoff; a worker that keeps crashing soon
+after start is given up on after WORKER_MAX_RESTARTS attempts. SIGINT/SIGTERM
+are forwarded to all workers.
+"""
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from app.config import global_state
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WORKERS = int(os.getenv("WORKERS", str(os.cpu_count() or 1)))
+# Restart delay doubles per consecutive crash, from BACKOFF_S up to BACKOFF_MAX_S
+RESTART_BACKOFF_S = float(os.getenv("WORKER_RESTART_BACKOFF_S", "0.5"))
+RESTART_BACKOFF_MAX_S = float(os.getenv("WORKER_RESTART_BACKOFF_MAX_S", "30"))
+# Consecutive crashes (each within STABLE_S of starting) before a worker is given up on
+MAX_RESTARTS = int(os.getenv("WORKER_MAX_RESTARTS", "5"))
+STABLE_S = float(os.getenv("WORKER_STABLE_S", "60"))
+
+logger = logging.getLogger("serve")
+
+_children = {}
+_started = {}  # worker index -> monotonic start time
+_crashes = {}  # worker index -> consecutive quick crashes
+_shutting_down = False
+
+
+def _bind_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _spawn(app, sock: socket.socket, index: int):
+    pid = os.fork()
+    if pid:
+        _children[pid] = index
+        _started[index] = time.monotonic()
+        return
+
+    # --- worker ---
+    global_state.WORKER_INDEX = index
+    global_state.register_worker()
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=os.getenv("LOG_LEVEL", "info"))
+    server = uvicorn.Server(config)
+    status = 1
+    try:
+        server.run(sockets=[sock])
+        status = 0
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        logger.exception("Worker %d crashed", index)
+    finally:
+        # os._exit skips the parent's inherited atexit handlers; the status is
+        # what the supervisor sees
+        os._exit(status)
+
+
+def _shutdown(signum, frame):
+    global _shutting_down
+    _shutting_down = True
+    for pid in list(_children):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+def _wait(seconds: float):
+    # time.sleep resumes after a signal handler; poll so shutdown is not delayed
+    deadline = time.monotonic() + seconds
+    while not _shutting_down and time.monotonic() < deadline:
+        time.sleep(max(0.0, min(0.1, deadline - time.monotonic())))
+
+
+def main():
+    global_state.enable_multiprocess(WORKERS)
+
+    # Import after enable_multiprocess() so every module sees the shared primitives
+    import main as backend
+
+    sock = _bind_socket()
+
+    # Nothing is warmed here: prewarm synthesizes over network TTS and must not
+    # delay the first worker. Workers warm up in their startup event (main.py).
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    for i in range(WORKERS):
+        _spawn(backend.app, sock, i)
+    logger.info("Started %d workers on http://%s:%d", WORKERS, HOST, PORT)
+
+    failed = []
+
+    while _children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        index = _children.pop(pid, None)
+        if index is None or _shutting_down:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        reclaimed = global_state.reclaim_worker(index)
+
+        crashes = _crashes.get(index, 0) + 1 if time.monotonic() - _started[index] < STABLE_S else 1
+        _crashes[index] = crashes
+        if crashes > MAX_RESTARTS:
+            logger.error("Worker %d (pid %d) exited with status %d; %d quick crashes in a row, not restarting it",
+                         index, pid, code, crashes)
+            failed.append(index)
+            continue
+        delay = min(RESTART_BACKOFF_S * 2 ** (crashes - 1), RESTART_BACKOFF_MAX_S)
+        logger.warning("Worker %d (pid %d) exited with status %d, restarting in %.1fs "
+                       "(released %d permit(s), roles %s)",
+                       index, pid, code, delay, reclaimed["permits"], reclaimed["roles"] or "none")
+        _wait(delay)
+        if not _shutting_down:
+            _spawn(backend.app, sock, index)
+
+    sock.close()
+    if failed:
+        logger.error("Workers %s gave up after repeated crashes", sorted(failed))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+# Tests import the backend as `app.*`, like the tools under Backend/tools
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# No snapshots or stored clips outside the test's own temp dirs
+os.environ.setdefault("CACHE_SNAPSHOT_PATH", "")
+os.environ.setdefault("GROQ_API_KEY", "test")
+
+
+@pytest.fixture
+def clean_caches():
+    from app.services import cache_service
+
+    caches = (cache_service.ai_cache, cache_service.audio_cache, cache_service.audio_index,
+              cache_service.audio_meta, cache_service.negative_cache)
+    for cache in caches:
+        cache.clear()
+    yield cache_service
+    for cache in caches:
+        cache.clear()
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from app.services import animation_catalog
+
+
+def _clips(*names):
+    clips = {}
+    for body in animation_catalog.BODY_TYPES:
+        for i, name in enumerate(names):
+            category, stem = name.split("/")
+            clips[f"{body}/{name}"] = {"name": stem, "body": body, "category": category, "bytes": 1000 + i}
+    return clips
+
+
+LIBRARY = _clips(
+    "idle/M_Standing_Idle_001",
+    "dance/F_Dances_001",
+    *(f"expression/M_Standing_Expressions_{n:03}" for n in (1, 2, *range(4, 19))),
+    *(f"expression/M_Talking_Variations_{n:03}" for n in range(1, 4)),
+)
+
+
+@pytest.fixture
+def manifest(monkeypatch):
+    manifest = {"clips": LIBRARY, "signals": animation_catalog.map_signals(LIBRARY)}
+    monkeypatch.setattr(animation_catalog, "get_manifest", lambda: manifest)
+    return manifest
+
+
+def test_numbered_expressions_are_not_guessed():
+    signals = animation_catalog.map_signals(LIBRARY)["feminine"]
+    assert "wave" not in signals["gesture"] and "sad" not in signals["emotion"]
+    mapped = [clip_id for kind in signals.values() for clip_ids in kind.values() for clip_id in clip_ids]
+    assert not any("Standing_Expressions" in clip_id for clip_id in mapped)
+
+
+def test_unmapped_signals_preload_idle(manifest):
+    idle = ["feminine/idle/M_Standing_Idle_001"]
+    assert [c["id"] for c in animation_catalog.preload_set("feminine", ["wave"], ["confused"])] == idle
+    talk = [c["id"] for c in animation_catalog.preload_set("feminine", ["talk"], [])]
+    assert talk and all("Talking_Variations" in clip_id for clip_id in talk)
+
+
+def test_signal_map_override(tmp_path, monkeypatch):
+    overrides = tmp_path / "signals.json"
+    overrides.write_text(json.dumps({"gesture": {"wave": ["expression/*Standing_Expressions_018"]}}))
+    monkeypatch.setattr(animation_catalog, "ANIMATION_SIGNAL_MAP", str(overrides))
+    gestures = animation_catalog.map_signals(LIBRARY)["masculine"]["gesture"]
+    assert gestures["wave"] == ["masculine/expression/M_Standing_Expressions_018"]
+    assert "nod" not in gestures and gestures["idle"]
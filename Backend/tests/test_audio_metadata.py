@@ -0,0 +1,75 @@
+import io
+import math
+import struct
+import wave
+
+from app.services import audio_metadata, tts_service
+from tools.bench_audio_metadata import EDGE_FRAME_MS, synthetic_mp3
+
+
+def _wav(samples, rate=22050):
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+    return buf.getvalue()
+
+
+def test_silent_mp3_duration_and_levels():
+    meta = audio_metadata.describe(tts_service.SILENT_MP3)
+    assert meta["format"] == "mp3"
+    assert meta["frames"] == 10
+    assert meta["duration_ms"] == round(10 * 1152 / 44100 * 1000)
+    assert meta["sample_rate"] == 44100 and meta["channels"] == 1
+    assert meta["peak_db"] is None and meta["rms_db"] is None
+    assert meta["voiced_ratio"] == 0.0
+
+
+def test_edge_format_mp3():
+    clip = synthetic_mp3(3)
+    meta = audio_metadata.describe(clip)
+    assert meta["duration_ms"] == 125 * EDGE_FRAME_MS
+    assert meta["bitrate_kbps"] == 48.0
+    assert meta["sample_rate"] == 24000
+    assert meta["levels"] == "estimated"
+    assert 0.9 < meta["voiced_ratio"] < 1.0  # every 25th frame is silent
+    assert meta["peak_db"] >= meta["rms_db"]
+
+
+def test_resyncs_after_junk_and_skips_id3():
+    clip = synthetic_mp3(1)
+    id3 = b"ID3\x04\x00\x00\x00\x00\x00\x20" + b"\x00" * 32
+    junk = b"\xff\x00garbage\xff\xff"
+    meta = audio_metadata.describe(id3 + clip[:144 * 20] + junk + clip[144 * 20:])
+    assert meta["frames"] == audio_metadata.describe(clip)["frames"]
+
+
+def test_not_audio():
+    assert audio_metadata.describe(b"") is None
+    assert audio_metadata.describe(b"hello world, not audio at all") is None
+
+
+def test_wav_levels_and_duration():
+    samples = [int(16384 * math.sin(i / 7)) for i in range(22050)]
+    meta = audio_metadata.describe(_wav(samples))
+    assert meta["format"] == "wav"
+    assert meta["duration_ms"] == 1000
+    assert meta["levels"] == "sampled"
+    assert abs(meta["peak_db"] - -6.0) < 0.2
+    assert abs(meta["rms_db"] - -9.0) < 0.3
+
+
+def test_streamed_wav_placeholder_size():
+    data = bytearray(_wav([1000] * 2205))
+    data[40:44] = b"\x00\x00\x00\x00"  # data chunk size as written by espeak-ng --stdout
+    assert audio_metadata.describe(bytes(data))["duration_ms"] == 100
+
+
+def test_for_clip_caches_by_hash(clean_caches):
+    clip = synthetic_mp3(1)
+    audio_hash = clean_caches.put_audio(clip)
+    meta = audio_metadata.for_clip(audio_hash, clip)
+    assert clean_caches.audio_meta[audio_hash] is meta
+    assert audio_metadata.for_clip(audio_hash, b"") is meta
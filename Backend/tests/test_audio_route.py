@@ -0,0 +1,78 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import audio
+from app.services import audio_store, canned_responses
+
+CLIP = bytes(range(256)) * 4
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=1000-", (1000, 1023)),
+    ("bytes=-24", (1000, 1023)),
+    ("bytes=1000-5000", (1000, 1023)),
+    ("bytes=1024-", None),
+    ("bytes=5-2", None),
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=-0", None),
+    ("bytes=a-b", None),
+])
+def test_parse_range(header, expected):
+    assert audio._parse_range(header, len(CLIP)) == expected
+
+
+@pytest.fixture
+def client(clean_caches, monkeypatch, tmp_path):
+    monkeypatch.setattr(audio_store, "AUDIO_STORE_DIR", str(tmp_path))
+    app = FastAPI()
+    app.include_router(audio.router, prefix="/audio")
+    return TestClient(app), clean_caches.put_audio(CLIP)
+
+
+def test_full_clip_with_cache_headers(client):
+    c, audio_hash = client
+    r = c.get(f"/audio/{audio_hash}")
+    assert r.status_code == 200 and r.content == CLIP
+    assert r.headers["etag"] == f'"{audio_hash}"'
+    assert "immutable" in r.headers["cache-control"]
+    assert c.get(f"/audio/{audio_hash}", headers={"If-None-Match": f'"{audio_hash}"'}).status_code == 304
+
+
+def test_range_requests(client):
+    c, audio_hash = client
+    r = c.get(f"/audio/{audio_hash}", headers={"Range": "bytes=10-19"})
+    assert r.status_code == 206 and r.content == CLIP[10:20]
+    assert r.headers["content-range"] == f"bytes 10-19/{len(CLIP)}"
+    r = c.get(f"/audio/{audio_hash}", headers={"Range": "bytes=2000-"})
+    assert r.status_code == 416 and r.headers["content-range"] == f"bytes */{len(CLIP)}"
+
+
+def test_stored_clip_is_served_after_eviction(client, tmp_path):
+    c, audio_hash = client
+    (tmp_path / f"{audio_hash}.mp3").write_bytes(CLIP)
+    audio.cache_service.audio_cache.clear()
+    r = c.get(f"/audio/{audio_hash}")
+    assert r.status_code == 200 and r.content == CLIP
+
+
+def test_unknown_and_invalid_hashes(client):
+    c, _ = client
+    assert c.get("/audio/" + "0" * 32).status_code == 404
+    assert c.get("/audio/../../etc/passwd").status_code == 404
+    assert c.get("/audio/NOTAHASH").status_code == 404
+
+
+def test_pinned_canned_clip_outlives_cache_and_store(client, monkeypatch):
+    c, _ = client
+    monkeypatch.setattr(canned_responses, "_rendered", {})
+    monkeypatch.setattr(canned_responses, "_by_hash", {})
+    text = canned_responses.reply("END")["text"]
+    clip = b"\xff\xf3\x64\xc0" + b"\x02" * 140
+    audio_hash = audio.cache_service.put_audio(clip)
+    canned_responses.remember("END", None, "voice", text, audio_hash, clip)
+    audio.cache_service.audio_cache.clear()  # TTL expired; nothing in the audio store either
+    r = c.get(f"/audio/{audio_hash}", headers={"Range": "bytes=0-3"})
+    assert r.status_code == 206 and r.content == clip[:4]
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app import brain
+from app.config import global_state
+
+
+class _Grader:
+    def __init__(self, parsed):
+        self.parsed = parsed
+
+    def with_structured_output(self, schema, include_raw=False):
+        return self
+
+    def invoke(self, messages):
+        return {"raw": SimpleNamespace(usage_metadata=None), "parsed": self.parsed,
+                "parsing_error": None if self.parsed else ValueError("truncated tool call")}
+
+
+@pytest.fixture
+def grade(monkeypatch):
+    def run(parsed):
+        monkeypatch.setattr(brain, "_get_runtime", lambda: SimpleNamespace(llm_flash=None))
+        monkeypatch.setattr(brain, "_budgeted_llm", lambda llm, node, state: _Grader(parsed))
+        monkeypatch.setattr(brain, "_build_prompt", lambda node, values: ([], 0))
+        return brain.llm_grade({"user_input": "q", "response_text": "a", "knowledge_context": "c"})
+    return run
+
+
+def test_grader_budget_fits_the_verdict():
+    assert brain.NODE_BUDGETS["hallucination_check"]["max_tokens"] >= 64
+
+
+def test_verdicts(grade):
+    assert grade(brain.GradeHallucinations(binary_score="yes")) is True
+    assert grade(brain.GradeHallucinations(binary_score="no")) is False
+
+
+def test_unparseable_verdict_is_counted(grade):
+    before = global_state.counters()["grounding.unparsed"]
+    assert grade(None) is True
+    assert global_state.counters()["grounding.unparsed"] == before + 1
@@ -0,0 +1,74 @@
+from app.services.byte_cache import ByteBudgetCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_stays_within_byte_budget():
+    cache = ByteBudgetCache(max_bytes=100, ttl=60)
+    for i in range(10):
+        cache.set(i, b"x" * 30)
+    assert cache.resident_bytes <= 100
+    assert len(cache) == 3
+    assert cache.evictions == 7
+
+
+def test_oversized_value_is_rejected():
+    cache = ByteBudgetCache(max_bytes=10, ttl=60)
+    cache.set("big", b"x" * 11)
+    assert "big" not in cache
+    assert cache.rejected == 1
+
+
+def test_frequently_hit_entry_survives():
+    cache = ByteBudgetCache(max_bytes=100, ttl=60)
+    cache.set("hot", b"h" * 40)
+    cache.set("cold", b"c" * 40)
+    for _ in range(5):
+        cache.get("hot")
+    cache.set("new", b"n" * 40)
+    assert "hot" in cache
+    assert "cold" not in cache
+
+
+def test_expensive_entry_beats_cheap_one_of_same_size():
+    cache = ByteBudgetCache(max_bytes=100, ttl=60)
+    cache.set("slow", b"s" * 40, cost=500)
+    cache.set("fast", b"f" * 40, cost=1)
+    cache.set("new", b"n" * 40, cost=10)
+    assert "slow" in cache and "new" in cache
+    assert "fast" not in cache
+
+
+def test_large_one_off_goes_before_small_one():
+    cache = ByteBudgetCache(max_bytes=100, ttl=60)
+    cache.set("small", b"s" * 10)
+    cache.set("large", b"l" * 80)
+    cache.set("new", b"n" * 20)
+    assert "small" in cache
+    assert "large" not in cache
+
+
+def test_entries_expire_after_ttl():
+    timer = FakeTimer()
+    cache = ByteBudgetCache(max_bytes=100, ttl=10, timer=timer)
+    cache.set("a", b"abc")
+    cache.set("b", b"abc", ttl=30)
+    timer.now = 11
+    assert cache.get("a") is None
+    assert cache.get("b") == b"abc"
+    assert cache.expirations == 1
+
+
+def test_ranked_orders_by_frequency():
+    cache = ByteBudgetCache(max_bytes=100, ttl=60)
+    cache.set("a", b"a")
+    cache.set("b", b"b", freq=3)
+    cache.get("a")
+    keys = [key for key, *_ in cache.ranked()]
+    assert keys == ["b", "a"]
@@ -0,0 +1,40 @@
+from app.services import cache_keys
+
+
+def test_prompt_normalization_shares_keys():
+    assert cache_keys.normalize_prompt("  Hello!  ") == "hello"
+    assert cache_keys.prompt_digest("HELLO") == cache_keys.prompt_digest("hello?!")
+    assert cache_keys.prompt_digest("hello") != cache_keys.prompt_digest("hello world")
+
+
+def test_normalize_text_keeps_case_and_collapses_whitespace():
+    assert cache_keys.normalize_text("Hi  there\n") == "Hi there"
+    assert cache_keys.normalize_text(None) == ""
+
+
+def test_brain_key_ignores_voice_and_field_order():
+    base = {"id": "sarcastic", "prompt": "Be  rude", "voice": "en-US-GuyNeural"}
+    other_voice = {"prompt": "Be rude", "id": "sarcastic", "voice": "en-GB-RyanNeural"}
+    assert cache_keys.brain_key("hi", base) == cache_keys.brain_key("Hi!", other_voice)
+    assert cache_keys.brain_key("hi", base) != cache_keys.brain_key("hi", {"id": "excited"})
+
+
+def test_brain_key_depends_on_context():
+    assert cache_keys.brain_key("hi", None, "doc a") != cache_keys.brain_key("hi", None, "doc b")
+    assert cache_keys.brain_key("hi", None, {"b": 1, "a": 2}) == cache_keys.brain_key("hi", None, {"a": 2, "b": 1})
+
+
+def test_audio_key_is_case_sensitive_in_text_only():
+    assert cache_keys.audio_key("Hello  there", "en-US-GuyNeural") == cache_keys.audio_key("Hello there", "EN-us-guyneural")
+    assert cache_keys.audio_key("Hello", "v") != cache_keys.audio_key("hello", "v")
+    assert len(cache_keys.audio_key("Hello", "v")) == 2 * cache_keys.DIGEST_SIZE
+
+
+def test_key_stats_track_distinct_components():
+    cache_keys.reset_stats()
+    cache_keys.brain_key("a", None)
+    cache_keys.brain_key("b", None)
+    stats = cache_keys.key_stats()
+    assert stats["brain.prompt"]["distinct"] == 2
+    assert stats["brain.persona"]["distinct"] == 1
+    cache_keys.reset_stats()
@@ -0,0 +1,77 @@
+import asyncio
+
+from app.services import cache_snapshot
+
+
+def test_round_trip_keeps_hot_entries_and_ttls(clean_caches, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_snapshot, "_state", dict(cache_snapshot._state, restored=False))
+    path = str(tmp_path / "cache.snap")
+    clip = b"\xff\xf3\x64\xc0" + b"\x01" * 140
+    audio_hash = clean_caches.put_audio(clip, cost=250)
+    clean_caches.audio_index["audio-key"] = audio_hash
+    fallback_hash = clean_caches.put_audio(b"RIFF\x00\x00\x00\x00WAVE fallback voice")
+    clean_caches.ai_cache["hot"] = {"text": "hot reply", "signals": {}}
+    clean_caches.ai_cache.set("short", {"text": "short-lived"}, ttl=5)
+    for _ in range(3):
+        clean_caches.ai_cache.get("hot")
+
+    assert asyncio.run(cache_snapshot.save(path))
+    for cache in (clean_caches.ai_cache, clean_caches.audio_cache, clean_caches.audio_index):
+        cache.clear()
+
+    assert asyncio.run(cache_snapshot.restore(path)) == 4
+    assert clean_caches.lookup_audio("audio-key") == (audio_hash, clip)
+    assert fallback_hash not in clean_caches.audio_cache
+    assert clean_caches.ai_cache["hot"]["text"] == "hot reply"
+    assert clean_caches.ai_cache.hits["hot"] >= 3
+    assert clean_caches.ai_cache.expires["short"] - clean_caches.ai_cache.timer() <= 5
+    assert cache_snapshot.restored()
+
+
+def test_expired_entries_are_skipped(clean_caches, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_snapshot, "_state", dict(cache_snapshot._state, restored=False))
+    path = str(tmp_path / "cache.snap")
+    clean_caches.ai_cache.set("soon", {"text": "x"}, ttl=1)
+    asyncio.run(cache_snapshot.save(path))
+    clean_caches.ai_cache.clear()
+
+    real_time = cache_snapshot.time.time
+    monkeypatch.setattr(cache_snapshot.time, "time", lambda: real_time() + 10)
+    assert asyncio.run(cache_snapshot.restore(path)) == 0
+    assert "soon" not in clean_caches.ai_cache
+
+
+def test_corrupt_snapshot_starts_cold(clean_caches, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_snapshot, "_state", dict(cache_snapshot._state, restored=False))
+    path = tmp_path / "cache.snap"
+    path.write_bytes(b"not a snapshot")
+    assert asyncio.run(cache_snapshot.restore(str(path))) == 0
+    assert cache_snapshot.restored()
+
+
+def test_workers_snapshot_separately_and_restore_the_union(clean_caches, tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_snapshot, "_state", dict(cache_snapshot._state, restored=False))
+    monkeypatch.setattr(cache_snapshot.global_state, "WORKERS", 2)
+    path = str(tmp_path / "cache.snap")
+    for index in range(2):
+        monkeypatch.setattr(cache_snapshot.global_state, "WORKER_INDEX", index)
+        clean_caches.ai_cache.clear()
+        clean_caches.ai_cache[f"hot-{index}"] = {"text": f"worker {index}"}
+        assert asyncio.run(cache_snapshot.save(path))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["cache.snap.w0", "cache.snap.w1"]
+
+    clean_caches.ai_cache.clear()
+    assert asyncio.run(cache_snapshot.restore(path)) == 2
+    assert clean_caches.ai_cache["hot-0"]["text"] == "worker 0"
+    assert clean_caches.ai_cache["hot-1"]["text"] == "worker 1"
+
+
+def test_failed_write_leaves_no_temp_file(clean_caches, tmp_path, monkeypatch):
+    clean_caches.ai_cache["hot"] = {"text": "hot reply"}
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(cache_snapshot.os, "replace", fail)
+    assert not asyncio.run(cache_snapshot.save(str(tmp_path / "cache.snap")))
+    assert list(tmp_path.iterdir()) == []
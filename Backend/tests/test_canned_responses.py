@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.services import canned_responses
+
+
+@pytest.fixture(autouse=True)
+def no_pinned(monkeypatch):
+    monkeypatch.setattr(canned_responses, "_rendered", {})
+    monkeypatch.setattr(canned_responses, "_by_hash", {})
+
+
+def test_reply_per_persona_with_default_fallback():
+    sarcastic = canned_responses.reply("END", "sarcastic")
+    assert sarcastic["text"] == canned_responses.RESPONSES["END"]["sarcastic"][0]
+    custom = canned_responses.reply("SAFETY_BLOCK", "my-custom-persona")
+    assert custom["text"] == canned_responses.RESPONSES["SAFETY_BLOCK"][canned_responses.DEFAULT_PERSONA][0]
+    assert canned_responses.reply("FALLBACK", "excited") == canned_responses.reply("FALLBACK")
+
+
+def test_reply_signals_are_copies():
+    canned_responses.reply("END", "excited")["signals"]["gesture"] = "changed"
+    assert canned_responses.reply("END", "excited")["signals"]["gesture"] == "wave"
+
+
+def test_only_canned_intents():
+    assert canned_responses.is_canned("END") and canned_responses.is_canned("SAFETY_BLOCK")
+    assert not canned_responses.is_canned("CHAT") and not canned_responses.is_canned(None)
+
+
+def test_audio_is_pinned_per_voice(clean_caches):
+    text = canned_responses.reply("END", "sarcastic")["text"]
+    assert canned_responses.audio_for("END", "sarcastic", "voice-a", text) is None
+    canned_responses.remember("END", "sarcastic", "voice-a", text, "a" * 32, b"clip-a")
+    assert canned_responses.audio_for("END", "sarcastic", "voice-a", text) == ("a" * 32, b"clip-a")
+    assert canned_responses.audio_for("END", "sarcastic", "voice-b", text) is None
+    # The brain answered with other text (e.g. an older cached reply): no canned audio
+    assert canned_responses.audio_for("END", "sarcastic", "voice-a", "Bye.") is None
+
+
+def test_silent_placeholder_is_never_pinned(clean_caches):
+    text = canned_responses.reply("FALLBACK")["text"]
+    canned_responses.remember("FALLBACK", None, "v", text, "b" * 32, canned_responses.tts_service.SILENT_MP3)
+    assert canned_responses.audio_for("FALLBACK", None, "v", text) is None
+
+
+def test_prerender_renders_each_variant_once(clean_caches, monkeypatch):
+    calls = []
+
+    async def tts(text, voice=None, budget_ms=None):
+        calls.append((text, voice))
+        return f"{voice}:{text}".encode(), "edge"
+
+    async def save(audio_hash, audio):
+        pass
+
+    monkeypatch.setattr(canned_responses.tts_service, "synthesize", tts)
+    monkeypatch.setattr(canned_responses.audio_store, "save", save)
+    variants = sum(len(v) for v in canned_responses.RESPONSES.values())
+    assert asyncio.run(canned_responses.prerender(["v1", "v2"])) == 2 * variants
+    assert asyncio.run(canned_responses.prerender(["v1", "v2"])) == 0
+    assert len(calls) == 2 * variants
+    text = canned_responses.reply("SAFETY_BLOCK", "excited")["text"]
+    assert canned_responses.audio_for("SAFETY_BLOCK", "excited", "v2", text)[1] == f"v2:{text}".encode()
+
+
+def test_prerender_does_not_pin_fallback_audio(clean_caches, monkeypatch):
+    async def tts(text, voice=None, budget_ms=None):
+        return f"{voice}:{text}".encode(), "espeak"
+
+    monkeypatch.setattr(canned_responses.tts_service, "synthesize", tts)
+    assert asyncio.run(canned_responses.prerender(["v1"])) == 0
+    assert canned_responses.stats()["pinned_clips"] == 0 and len(clean_caches.audio_index) == 0
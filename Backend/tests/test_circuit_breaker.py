@@ -0,0 +1,67 @@
+import pytest
+
+from app.services import circuit_breaker
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("t", failure_threshold=3, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    assert breaker.trips == 1 and breaker.rejected == 1
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("t", failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_limited_probes_then_closes(clock):
+    breaker = CircuitBreaker("t", failure_threshold=1, reset_timeout=10, half_open_max_probes=1)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # second probe waits for the first
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("t", failure_threshold=3, reset_timeout=10)
+    for _ in range(3):
+        breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+
+def test_lost_probe_does_not_wedge_half_open(clock):
+    breaker = CircuitBreaker("t", failure_threshold=1, reset_timeout=10, half_open_max_probes=1)
+    breaker.record_failure()
+    clock[0] += 10
+    assert breaker.allow()  # probe that never reports back
+    clock[0] += 10
+    assert breaker.allow()
+
+
+def test_registry_returns_one_breaker_per_upstream():
+    assert circuit_breaker.get_breaker("tts:test-voice") is circuit_breaker.get_breaker("tts:test-voice")
+    assert "tts:test-voice" in circuit_breaker.breaker_stats()
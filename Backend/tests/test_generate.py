@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.routers import generate
+from app.services import circuit_breaker, tts_service
+
+
+@pytest.fixture
+def turn(clean_caches, monkeypatch):
+    async def brain(user_input, **kwargs):
+        return {"text": f"Reply to {user_input}", "behavior": {"gesture": "talk"}, "intent": "CHAT"}
+
+    saved = []
+    monkeypatch.setattr(generate, "run_chat_brain", brain)
+    monkeypatch.setattr(generate.audio_store, "schedule_save", lambda h, a: saved.append(h))
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    return lambda prompt, voice: asyncio.run(generate.run_turn(prompt, {"id": "professional", "voice": voice}))
+
+
+def test_failed_tts_returns_unadvertised_silence(turn, clean_caches, monkeypatch):
+    async def tts(text, voice=None, budget_ms=None):
+        return b"", ""
+
+    monkeypatch.setattr(generate.tts_service, "synthesize", tts)
+    result = turn("hello", "voice-down")
+    assert result["audio"] == tts_service.SILENT_MP3
+    assert result["audio_hash"] == ""
+    assert len(clean_caches.audio_cache) == 0
+    assert "audio_meta" not in result["signals"]
+
+
+def test_synthesized_clip_is_stored_once_with_its_cost(turn, clean_caches, monkeypatch):
+    async def tts(text, voice=None, budget_ms=None):
+        return b"\xff\xf3\x64\xc0" + b"\x01" * 140, "edge"
+
+    monkeypatch.setattr(generate.tts_service, "synthesize", tts)
+    result = turn("hello", "voice-up")
+    assert result["audio_hash"] and result["audio_hash"] in clean_caches.audio_cache
+    (_, _, freq, cost, _), = clean_caches.audio_cache.ranked()
+    assert freq == 1 and cost > 1e-3
+    assert result["signals"]["audio_meta"]["format"] == "mp3"
+
+
+def test_fallback_voice_is_served_but_not_cached_by_text(turn, clean_caches, monkeypatch):
+    calls = []
+
+    async def tts(text, voice=None, budget_ms=None):
+        calls.append(text)
+        return b"RIFF\x00\x00\x00\x00WAVE" + text.encode(), "espeak"
+
+    monkeypatch.setattr(generate.tts_service, "synthesize", tts)
+    result = turn("hello", "voice-degraded")
+    assert result["audio_hash"] in clean_caches.audio_cache
+    assert len(clean_caches.audio_index) == 0
+    turn("hello", "voice-degraded")
+    assert len(calls) == 2
@@ -0,0 +1,53 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+
+import pytest
+
+from app.config import global_state
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    """Multi-worker primitives without touching the module-level ones used by other tests."""
+    ctx = multiprocessing.get_context("fork")
+    sem = global_state.SharedSemaphore(2, ctx, workers=2)
+    monkeypatch.setattr(global_state, "_shared_semaphores", [sem])
+    monkeypatch.setattr(global_state, "_leader_flags", {"prewarm": ctx.Value("i", 0)})
+    return sem
+
+
+def _hold_and_die(sem, index):
+    global_state.WORKER_INDEX = index
+    global_state.claim_leader("prewarm")
+
+    async def hold():
+        await sem.__aenter__()
+        os.kill(os.getpid(), signal.SIGKILL)
+
+    asyncio.run(hold())
+
+
+def test_crashed_worker_permits_and_roles_are_reclaimed(shared):
+    proc = multiprocessing.get_context("fork").Process(target=_hold_and_die, args=(shared, 1))
+    proc.start()
+    proc.join(10)
+    assert proc.exitcode == -signal.SIGKILL
+
+    assert global_state.reclaim_worker(1) == {"permits": 1, "roles": ["prewarm"]}
+    assert global_state.claim_leader("prewarm")
+
+    async def take_all():
+        async with shared, shared:
+            return True
+
+    assert asyncio.run(asyncio.wait_for(take_all(), 1))
+
+
+def test_live_workers_keep_their_permits(shared):
+    async def hold():
+        async with shared:
+            return global_state.reclaim_worker(1)
+
+    assert asyncio.run(hold()) == {"permits": 0, "roles": []}
@@ -0,0 +1,87 @@
+import pytest
+
+from app.services import grounding
+
+CONTEXT = (
+    "Our store sells running shoes and hiking boots. Returns are accepted within 30 days "
+    "with a receipt. The Portland store opens at 9am and closes at 8pm."
+)
+
+
+@pytest.mark.parametrize("response", ["Hello! How can I help you today?", "Thanks, have a great day!"])
+def test_chit_chat_skips_grader(response):
+    assert grounding.precheck("hi", response, CONTEXT).reason == "chit_chat"
+
+
+def test_near_verbatim_answer_is_grounded():
+    verdict = grounding.precheck("returns?", "Returns are accepted within 30 days with a receipt.", CONTEXT)
+    assert verdict.grounded and verdict.reason == "overlap"
+
+
+def test_number_not_in_context_goes_to_grader():
+    verdict = grounding.precheck("returns?", "Returns are accepted within 60 days with a receipt.", CONTEXT)
+    assert not verdict.grounded and verdict.reason == "unsupported_entity"
+
+
+def test_unknown_entity_goes_to_grader():
+    verdict = grounding.precheck("where?", "The Seattle store sells running shoes.", CONTEXT)
+    assert not verdict.grounded and verdict.reason == "unsupported_entity"
+
+
+def test_paraphrase_goes_to_grader():
+    verdict = grounding.precheck("boots?", "We stock waterproof trail gear for mountaineering expeditions.", CONTEXT)
+    assert not verdict.grounded and verdict.reason == "low_overlap"
+
+
+def test_no_context_goes_to_grader():
+    assert grounding.precheck("q", "Returns take 30 days.", "").reason == "no_context"
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setattr(grounding, "GROUNDING_PRECHECK", False)
+    assert grounding.precheck("hi", "Hello!", CONTEXT) == grounding.Verdict(False, "disabled")
+
+
+@pytest.mark.parametrize("response", [
+    "I don't know the warranty terms, sorry.",
+    "I'm sorry, I can't find that in the documents.",
+    "I don't have any information about gift cards.",
+    "That is not mentioned in the documents I have.",
+])
+def test_admitted_ignorance_skips_grader(response):
+    assert grounding.precheck("gift cards?", response, CONTEXT).reason == "abstention"
+
+
+@pytest.mark.parametrize("response", [
+    "Shipping is not included in the price.",
+    "Gift cards are not covered by returns.",
+    "I'm afraid we don't ship internationally.",
+    "I'm not sure, but we are open on Sundays.",
+    "Sorry, I can't help with refunds without a receipt.",
+])
+def test_negative_factual_claims_go_to_grader(response):
+    verdict = grounding.precheck("shipping?", response, CONTEXT)
+    assert not verdict.grounded
+    assert verdict.reason != "abstention"
+
+
+@pytest.mark.parametrize("response", [
+    "Yes, we do!",
+    "No, we do not.",
+    "No.",
+    "Yes, I can help you with that today.",
+])
+def test_yes_no_answers_go_to_grader(response):
+    verdict = grounding.precheck("do you ship to Canada?", response, CONTEXT)
+    assert not verdict.grounded
+    assert verdict.reason == "polarity"
+
+
+@pytest.mark.parametrize("response", ["We do!", "Sure!"])
+def test_bare_answers_without_content_go_to_grader(response):
+    assert not grounding.precheck("do you ship to Canada?", response, CONTEXT).grounded
+
+
+def test_negated_context_sentence_goes_to_grader():
+    verdict = grounding.precheck("returns?", "Returns are not accepted within 30 days with a receipt.", CONTEXT)
+    assert not verdict.grounded
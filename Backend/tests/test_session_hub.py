@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from app.services import session_hub
+
+
+class FakeSession:
+    def __init__(self, session_id):
+        self.id = session_id
+        self.frames = []
+
+    def offer(self, frame):
+        self.frames.append(frame)
+        return True
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    registry = {sid: FakeSession(sid) for sid in ("s100-1", "s100-2")}
+    monkeypatch.setattr(session_hub, "_sessions", registry)
+    return registry
+
+
+def test_dispatch_to_all_local_sessions(sessions):
+    assert asyncio.run(session_hub.dispatch({"type": "behavior"})) == (2, 0)
+    assert all(s.frames == [{"type": "behavior"}] for s in sessions.values())
+
+
+def test_dispatch_to_one_session(sessions):
+    assert asyncio.run(session_hub.dispatch({"type": "behavior"}, session_id="s100-2")) == (1, 0)
+    assert sessions["s100-1"].frames == []
+
+
+@pytest.mark.parametrize("session_id", ["s100-9", "s999-1", "bogus"])
+def test_unknown_session_is_an_error(sessions, session_id):
+    with pytest.raises(LookupError):
+        asyncio.run(session_hub.dispatch({"type": "behavior"}, session_id=session_id))
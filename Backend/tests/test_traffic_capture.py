@@ -0,0 +1,17 @@
+from app.services import cache_keys, traffic_capture
+
+PAYLOAD = {"prompt": "Mail me at jane@example.com about order 1234567", "persona": {"id": "excited"}}
+
+
+def test_prompt_is_hashed_by_default():
+    record = traffic_capture.anonymize(PAYLOAD)
+    assert "prompt" not in record
+    assert record["prompt_hash"] == cache_keys.prompt_digest(PAYLOAD["prompt"])
+    assert "jane" not in str(record)
+
+
+def test_masked_prompt_text_is_opt_in(monkeypatch):
+    monkeypatch.setattr(traffic_capture, "CAPTURE_PROMPT_MODE", "redact")
+    record = traffic_capture.anonymize(PAYLOAD)
+    assert record["prompt"] == "Mail me at <email> about order <number>"
+    assert "prompt_hash" not in record
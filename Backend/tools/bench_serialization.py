@@ -0,0 +1,88 @@
+"""
+Measure JSON serialization cost on the /generate/ hot path.
+
+    cd Backend
+    python -m tools.bench_serialization [--audio-kb 300] [--graph-kb 800] [--runs 200]
+
+Response side: FastAPI's default (validate + jsonable_encoder + json.dumps)
+against the model_construct() + orjson path used by the router, for a reply
+carrying an inline base64 clip. Request side: stdlib json vs orjson parsing of
+a body with a large nodeGraph, including pydantic validation. Reports ms per
+call and the CPU saved per response.
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from app.models.generate_model import GenerateRequest, GenerateResponse
+from app.services import fast_json
+
+
+def _timed(fn, runs: int) -> float:
+    fn()  # warm-up
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _response_fields(audio_kb: int):
+    audio = os.urandom(audio_kb * 1024)
+    return {
+        "text": "This is a spoken reply of typical length. " * 4,
+        "audio": base64.b64encode(audio).decode("ascii"),
+        "audio_url": "/audio/" + "0" * 64,
+        "audio_mime": "audio/mpeg",
+        "signals": {"emotion": "happy", "gesture": "wave", "cached": False, "ms": 812.4},
+    }
+
+
+def _request_body(graph_kb: int) -> bytes:
+    node = {"id": "n", "type": "document", "data": {"text": "Opening hours and return policy. " * 8}}
+    nodes = []
+    while len(json.dumps(nodes)) < graph_kb * 1024:
+        nodes.append(dict(node, id=f"n{len(nodes)}"))
+    return json.dumps({
+        "prompt": "When does the store open?",
+        "persona": {"id": "professional", "voice": "en-US-GuyNeural"},
+        "nodeGraph": {"nodes": nodes, "edges": []},
+    }).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--audio-kb", type=int, default=300, help="inline audio size before base64")
+    parser.add_argument("--graph-kb", type=int, default=800, help="nodeGraph size in the request body")
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    fields = _response_fields(args.audio_kb)
+    default_ms = _timed(
+        lambda: json.dumps(jsonable_encoder(GenerateResponse.model_validate(fields))).encode(), args.runs
+    )
+    orjson_ms = _timed(lambda: fast_json.json_response(GenerateResponse.model_construct(**fields)), args.runs)
+    pydantic_ms = _timed(lambda: GenerateResponse.model_validate(fields).model_dump_json(), args.runs)
+    print(f"response ({len(fast_json.dumps(fields)) // 1024} kB):")
+    print(f"  validate + jsonable_encoder + json.dumps  {default_ms:8.3f} ms")
+    print(f"  model_validate + model_dump_json          {pydantic_ms:8.3f} ms")
+    print(f"  model_construct + orjson                  {orjson_ms:8.3f} ms")
+    print(f"  saved per response                        {default_ms - orjson_ms:8.3f} ms")
+
+    body = _request_body(args.graph_kb)
+    stdlib_ms = _timed(lambda: GenerateRequest.model_validate(json.loads(body)), max(args.runs // 10, 5))
+    fast_ms = _timed(lambda: GenerateRequest.model_validate(fast_json.loads(body)), max(args.runs // 10, 5))
+    print(f"request ({len(body) // 1024} kB body):")
+    print(f"  json.loads + validate                     {stdlib_ms:8.3f} ms")
+    print(f"  orjson.loads + validate                   {fast_ms:8.3f} ms")
+    print(f"  saved per request                         {stdlib_ms - fast_ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare TTS backends on canned phrases and a longer reply.
+
+    cd Backend
+    python -m tools.bench_tts_backends [--runs N] [--voice VOICE] [--backends edge,espeak]
+
+Reports per backend and phrase: median/p95 latency, audio size and failures.
+Unavailable backends (e.g. espeak-ng not installed) are listed and skipped.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.services import tts_backends, tts_service
+
+PHRASES = [
+    "Hello!",
+    "Welcome!",
+    "One moment, please.",
+    "Sorry, I'm having trouble thinking right now. Please try again in a moment.",
+    "Our store opens at nine in the morning and closes at eight in the evening, "
+    "and you can find the returns desk right next to the main entrance.",
+]
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def bench(backends, voice: str, runs: int):
+    for backend in backends:
+        if not backend.available():
+            print(f"{backend.name:7} unavailable (not installed)")
+            continue
+        print(f"{backend.name:7} voice={backend.map_voice(voice)}")
+        for text in PHRASES:
+            timings, sizes, failures = [], [], 0
+            for _ in range(runs):
+                start = time.perf_counter()
+                audio = await backend.synthesize(text, voice)
+                elapsed = (time.perf_counter() - start) * 1000
+                if audio:
+                    timings.append(elapsed)
+                    sizes.append(len(audio))
+                else:
+                    failures += 1
+            if timings:
+                print(f"  {len(text):4} chars  median {statistics.median(timings):8.1f}ms  "
+                      f"p95 {_percentile(timings, 0.95):8.1f}ms  "
+                      f"{statistics.mean(sizes) / 1e3:6.1f} kB  failures {failures}/{runs}")
+            else:
+                print(f"  {len(text):4} chars  all {runs} runs failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--voice", default=tts_service.DEFAULT_VOICE)
+    parser.add_argument("--backends", default=",".join(tts_backends.TTS_BACKENDS),
+                        help="comma-separated backend names")
+    args = parser.parse_args()
+
+    backends = [tts_backends._BACKEND_TYPES[name.strip()]() for name in args.backends.split(",")]
+    asyncio.run(bench(backends, args.voice, args.runs))
+
+
+if __name__ == "__main__":
+    main()
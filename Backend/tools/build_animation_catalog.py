@@ -0,0 +1,36 @@
+"""
+Build (or incrementally refresh) the animation clip manifest.
+
+    cd Backend
+    python -m tools.build_animation_catalog [--library DIR] [--out FILE]
+
+Only clips whose size or mtime changed since the last manifest are re-read.
+"""
+import argparse
+import time
+
+from app.services import animation_catalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--library", default=None, help="animation library root")
+    parser.add_argument("--out", default=None, help="manifest path")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = animation_catalog.build_manifest(path=args.out, root=args.library)
+    elapsed = time.perf_counter() - start
+
+    clips = manifest["clips"].values()
+    print(f"Indexed {len(manifest['clips'])} clips "
+          f"({sum(c['bytes'] for c in clips) / 1e6:.1f} MB) in {elapsed:.2f}s")
+    for body, kinds in manifest["signals"].items():
+        for kind, values in kinds.items():
+            for value, clip_ids in values.items():
+                size = sum(manifest["clips"][c]["bytes"] for c in clip_ids)
+                print(f"  {body:9} {kind:7} {value:13} {len(clip_ids)} clips, {size / 1e3:.0f} kB")
+
+
+if __name__ == "__main__":
+    main()
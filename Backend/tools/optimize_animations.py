@@ -0,0 +1,55 @@
+"""
+Build compact animation-only GLB bundles from the clip library.
+
+    cd Backend
+    python -m tools.optimize_animations [--out DIR] [--fps N] [--rot-tol DEG] [--pos-tol M] [--no-quantize]
+
+Writes <out>/<body>.glb (shared skeleton + every clip as a named animation) and
+<out>/report.json with per-clip size/accuracy figures. Clips already processed
+with the same settings are reused from <out>/.cache.
+"""
+import argparse
+import time
+
+from app.services import animation_optimizer
+
+
+def main():
+    defaults = animation_optimizer.DEFAULT_SETTINGS
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--out", default=None, help="bundle output directory")
+    parser.add_argument("--fps", type=int, default=defaults["fps"], help="resample rate (0 = keep source keys)")
+    parser.add_argument("--rot-tol", type=float, default=defaults["rotation_tolerance_deg"],
+                        help="rotation tolerance in degrees")
+    parser.add_argument("--pos-tol", type=float, default=defaults["translation_tolerance"],
+                        help="translation/scale tolerance in scene units")
+    parser.add_argument("--no-quantize", action="store_true", help="keep float32 rotations")
+    args = parser.parse_args()
+
+    settings = {
+        "fps": args.fps,
+        "rotation_tolerance_deg": args.rot_tol,
+        "translation_tolerance": args.pos_tol,
+        "scale_tolerance": args.pos_tol,
+        "quantize_rotations": not args.no_quantize,
+    }
+
+    start = time.perf_counter()
+    report = animation_optimizer.run_pipeline(out_dir=args.out, settings=settings)
+    elapsed = time.perf_counter() - start
+
+    print(f"Done in {elapsed:.1f}s ({report['reused_clips']} clips reused from cache)")
+    for name, bundle in report["bundles"].items():
+        clips = bundle["per_clip"].values()
+        keys_before = sum(c["keys_before"] for c in clips)
+        keys_after = sum(c["keys_after"] for c in clips)
+        worst_rot = max((c["max_rotation_error_deg"] for c in clips), default=0.0)
+        worst_pos = max((c["max_translation_error"] for c in clips), default=0.0)
+        print(f"  {name:12} {bundle['clips']:3} clips  "
+              f"{bundle['source_bytes'] / 1e6:6.2f} MB -> {bundle['bundle_bytes'] / 1e6:5.2f} MB "
+              f"({bundle['ratio']:.1%})  keys {keys_before} -> {keys_after}  "
+              f"max err {worst_rot:.3f} deg / {worst_pos:.4f}")
+
+
+if __name__ == "__main__":
+    main()
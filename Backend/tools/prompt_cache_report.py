@@ -0,0 +1,73 @@
+"""
+Report the cacheable prompt prefix per persona and brain node.
+
+    cd Backend
+    python -m tools.prompt_cache_report [--context DOC.txt] [--personas personas.json] [--min-prefix 1024]
+
+Renders each node's prompt (app/brain.py PROMPT_LAYOUTS) for every persona and
+counts estimated tokens per segment. Everything before the "turn" segment is
+the stable prefix a provider can cache across turns; a prefix shorter than
+--min-prefix tokens is not cached by most providers and counts as 0.
+--personas is a JSON object {"name": "persona prompt", ...} (default: the
+built-in PERSONAS). Without --context a synthetic ~4k-token document is used.
+"""
+import argparse
+import json
+from pathlib import Path
+
+from app import brain
+
+SAMPLE_TURN = {
+    "user_input": "What are your opening hours on public holidays?",
+    "response_text": "On public holidays we open at ten and close at four.",
+}
+
+
+def _sample_context() -> str:
+    paragraph = ("Our store opens at nine in the morning and closes at eight in the evening. "
+                 "Returns are accepted within thirty days with a receipt. ")
+    return paragraph * 110
+
+
+def report(persona: str, context: str, min_prefix: int):
+    rows = []
+    values = dict(SAMPLE_TURN, persona_prompt=persona, knowledge_context=context)
+    for node in brain.PROMPT_LAYOUTS:
+        segments = {}
+        for segment, text in brain.render_segments(node, values):
+            segments[segment] = segments.get(segment, 0) + brain.estimate_tokens(text)
+        total = sum(segments.values())
+        prefix = total - segments.get("turn", 0)
+        cacheable = prefix if prefix >= min_prefix else 0
+        rows.append((node, segments, prefix, total, cacheable))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--context", type=Path, help="knowledge document (text)")
+    parser.add_argument("--personas", type=Path, help='JSON {"name": "persona prompt"}')
+    parser.add_argument("--min-prefix", type=int, default=1024,
+                        help="shortest prefix (tokens) the provider caches")
+    args = parser.parse_args()
+
+    context = args.context.read_text() if args.context else _sample_context()
+    context = brain._truncate_context(context, brain.NODE_BUDGETS["narrative"]["max_context_tokens"])
+    personas = json.loads(args.personas.read_text()) if args.personas else brain.PERSONAS
+    segment_names = brain.global_state.PROMPT_SEGMENTS
+
+    print(f"context: ~{brain.estimate_tokens(context)} tokens, min cacheable prefix: {args.min_prefix}")
+    for name, persona in personas.items():
+        rows = report(persona, context, args.min_prefix)
+        turn_total = sum(total for _, _, _, total, _ in rows)
+        turn_cacheable = sum(cacheable for *_, cacheable in rows)
+        print(f"\n{name}: {turn_cacheable}/{turn_total} prompt tokens per turn cacheable "
+              f"({turn_cacheable / turn_total:.1%})")
+        print(f"  {'node':20}" + "".join(f"{s:>13}" for s in segment_names) + f"{'prefix':>9}{'ratio':>8}")
+        for node, segments, prefix, total, cacheable in rows:
+            print(f"  {node:20}" + "".join(f"{segments.get(s, 0):13}" for s in segment_names)
+                  + f"{prefix:9}{cacheable / total:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Replay a set of brain turns through the grounding pre-check and compare with the LLM grader.
+
+    cd Backend
+    python -m tools.replay_grounding REPLAY.jsonl [--grader] [--show N]
+
+Each JSONL row: {"user_input": ..., "response": ..., "context": ... | "context_path": ...,
+                 "label": "yes" | "no" (optional reference verdict)}
+Without --grader, rows are compared against "label"; with --grader every row is
+also sent to the LLM grader (needs GROQ_API_KEY). Reports how often the grader
+would be skipped, the grader tokens saved, and where the two disagree.
+"""
+import argparse
+import json
+import time
+from collections import Counter
+from pathlib import Path
+
+from app.services import grounding
+
+
+def _load(path: Path):
+    rows = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if "context_path" in row and "context" not in row:
+                row["context"] = (path.parent / row["context_path"]).read_text()
+            rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("replay", type=Path)
+    parser.add_argument("--grader", action="store_true", help="also run the LLM grader on every row")
+    parser.add_argument("--show", type=int, default=10, help="disagreements to print")
+    args = parser.parse_args()
+
+    brain = None
+    if args.grader:
+        from app import brain
+
+    rows = _load(args.replay)
+    reasons = Counter()
+    skipped = 0
+    tokens_saved = 0
+    false_accepts, missed_skips = [], []
+    compared = 0
+    precheck_ms = 0.0
+
+    for row in rows:
+        user_input, response, context = row.get("user_input", ""), row["response"], row.get("context", "")
+        start = time.perf_counter()
+        verdict = grounding.precheck(user_input, response, context)
+        precheck_ms += (time.perf_counter() - start) * 1000
+        reasons[verdict.reason] += 1
+        if verdict.grounded:
+            skipped += 1
+            # The grader re-sends the whole context plus input and response (~4 chars/token)
+            tokens_saved += (len(context) + len(user_input) + len(response)) // 4
+
+        reference = row.get("label")
+        if brain is not None:
+            reference = "yes" if brain.llm_grade({
+                "user_input": user_input, "response_text": response,
+                "knowledge_context": context, "budgets": {},
+            }) else "no"
+        if reference not in ("yes", "no"):
+            continue
+        compared += 1
+        if verdict.grounded and reference == "no":
+            false_accepts.append((verdict, row))
+        elif not verdict.grounded and reference == "yes":
+            missed_skips.append((verdict, row))
+
+    total = len(rows) or 1
+    print(f"rows: {len(rows)}  precheck: {precheck_ms / total:.3f} ms/row")
+    print(f"grader skipped: {skipped} ({skipped / total:.1%}), ~{tokens_saved} grader prompt tokens saved")
+    for reason, count in reasons.most_common():
+        print(f"  {reason:20} {count}")
+    if compared:
+        print(f"compared with {'LLM grader' if brain else 'labels'}: {compared} rows")
+        print(f"  pre-check accepted, reference says hallucination: {len(false_accepts)}")
+        print(f"  pre-check unsure, reference says grounded:       {len(missed_skips)} "
+              f"(grader calls that could have been skipped)")
+        for verdict, row in false_accepts[:args.show]:
+            print(f"  ! {verdict.reason}: {row['response'][:120]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Replay a captured /generate/ traffic log against this build with mock upstreams.
+
+    cd Backend
+    CAPTURE_PATH=capture.jsonl uvicorn main:app ...          # record (opt-in)
+    python -m tools.replay_traffic capture.jsonl [--speed 2] [--out report.json] [--compare baseline.json]
+
+Requests are re-issued in-process (httpx ASGI transport) on their original
+schedule, compressed by --speed. The brain and TTS are replaced by mocks with
+configurable latency, so runs are repeatable and free; caches, breakers,
+semaphores and serialization are the real ones. Prompts, personas and contexts
+map one-to-one onto synthetic stand-ins, so cache keys collide exactly as they
+did in production. The report (latency percentiles, brain/TTS cache hit ratios,
+audio cache stats) can be diffed against another build's report with --compare.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+from collections import Counter
+from pathlib import Path
+
+# Replaying must not capture itself or trace every request
+os.environ.pop("CAPTURE_PATH", None)
+os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+os.environ.setdefault("DEBUG", "0")
+os.environ.setdefault("GROQ_API_KEY", "replay")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from app.routers import generate  # noqa: E402
+from app.services import cache_service, tts_backends  # noqa: E402
+
+
+class MockUpstreams:
+    """Stand-ins for the LLM brain and TTS with latency drawn around a mean."""
+
+    def __init__(self, brain_ms: float, tts_base_ms: float, tts_ms_per_char: float,
+                 fail_rate: float, seed: int):
+        self.brain_ms = brain_ms
+        self.tts_base_ms = tts_base_ms
+        self.tts_ms_per_char = tts_ms_per_char
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.brain_calls = 0
+        self.tts_calls = 0
+        # Mock audio stands in for the preferred backend, so it is cached like real audio
+        self.tts_backend = next((b.name for b in tts_backends.get_backends() if b.available()), "edge")
+
+    def _jitter(self, ms: float) -> float:
+        return max(ms * self.random.lognormvariate(0, 0.25), 0) / 1000
+
+    async def run_chat_brain(self, user_input: str, persona_key: str = None, context_text: str = "",
+                             persona_prompt: str = None, budgets: dict = None):
+        self.brain_calls += 1
+        await asyncio.sleep(self._jitter(self.brain_ms))
+        if self.random.random() < self.fail_rate:
+            raise RuntimeError("mock brain failure")
+        # One deterministic answer per brain input, roughly reply-sized
+        seed = hashlib.blake2b(f"{user_input}|{persona_prompt}|{context_text}".encode(), digest_size=8).hexdigest()
+        text = f"Answer {seed}. " + "This is a spoken reply of typical length. " * 3
+        return {"text": text, "behavior": {"emotion": "neutral", "gesture": "talk"}}
+
+    async def synthesize(self, text: str, voice: str = None, budget_ms: float = None):
+        self.tts_calls += 1
+        await asyncio.sleep(self._jitter(self.tts_base_ms + self.tts_ms_per_char * len(text)))
+        if self.random.random() < self.fail_rate:
+            return b"", ""
+        # ~6 kB of MP3 per second of speech at ~15 chars/s
+        audio = hashlib.blake2b(text.encode(), digest_size=64).digest() * (len(text) * 400 // 64 + 1)
+        return audio, self.tts_backend
+
+
+def load_capture(path: Path):
+    records = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if not record.get("unparsed"):
+                    records.append(record)
+    records.sort(key=lambda r: r["ts"])
+    return records
+
+
+def to_request(record):
+    """Synthetic request whose cache keys collide exactly like the captured one's."""
+    prompt = record.get("prompt") or f"prompt {record.get('prompt_hash', '')}"
+    persona = {"id": record.get("persona") or "professional"}
+    if record.get("voice"):
+        persona["voice"] = record["voice"]
+    if record.get("persona_hash"):
+        persona["prompt"] = f"persona {record['persona_hash']}"
+    body = {"prompt": prompt, "persona": persona}
+    if record.get("ctx_len"):
+        stub = f"context {record['ctx']} "
+        body["nodeGraph"] = (stub * (record["ctx_len"] // len(stub) + 1))[: record["ctx_len"]]
+    if "inline" in record:
+        body["inline_audio_max_bytes"] = record["inline"]
+    return body
+
+
+def _percentiles(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 1)
+
+    return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": round(ordered[-1], 1),
+            "mean": round(statistics.mean(ordered), 1)}
+
+
+def _build_id() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+async def replay(records, speed: float, mocks: MockUpstreams):
+    latencies, statuses = [], Counter()
+    transport = httpx.ASGITransport(app=main.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=120) as client:
+        async def issue(record):
+            start = time.perf_counter()
+            try:
+                response = await client.post(record.get("path", "/generate/"), json=to_request(record))
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        loop = asyncio.get_running_loop()
+        t0 = records[0]["ts"]
+        started = loop.time()
+        tasks = []
+        for record in records:
+            delay = (record["ts"] - t0) / speed - (loop.time() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(issue(record)))
+        await asyncio.gather(*tasks)
+        wall_s = loop.time() - started
+
+    n = len(records)
+    return {
+        "build": _build_id(),
+        "requests": n,
+        "speed": speed,
+        "wall_s": round(wall_s, 2),
+        "status": dict(statuses),
+        "latency_ms": _percentiles(latencies),
+        "captured_latency_ms": _percentiles([r["ms"] for r in records if "ms" in r]),
+        "brain": {"calls": mocks.brain_calls, "hit_ratio": round(1 - mocks.brain_calls / n, 4) if n else 0},
+        "tts": {"calls": mocks.tts_calls, "hit_ratio": round(1 - mocks.tts_calls / n, 4) if n else 0},
+        "audio_cache": cache_service.audio_cache.stats(),
+    }
+
+
+def _flatten(report, prefix=""):
+    out = {}
+    for key, value in report.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+    return out
+
+
+def compare(baseline, current):
+    base, cur = _flatten(baseline), _flatten(current)
+    print(f"{'metric':34} {'baseline':>12} {'current':>12} {'delta':>9}")
+    for name in sorted(set(base) & set(cur)):
+        b, c = base[name], cur[name]
+        delta = f"{(c - b) / b:+.1%}" if b else ""
+        print(f"{name:34} {b:12.4g} {c:12.4g} {delta:>9}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("capture", type=Path)
+    parser.add_argument("--speed", type=float, default=1.0, help="rate multiplier (2 = twice as fast)")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N requests")
+    parser.add_argument("--brain-ms", type=float, default=800, help="mock brain latency")
+    parser.add_argument("--tts-base-ms", type=float, default=150, help="mock TTS fixed latency")
+    parser.add_argument("--tts-ms-per-char", type=float, default=8, help="mock TTS latency per character")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of failing upstream calls")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path, help="write the JSON report here")
+    parser.add_argument("--compare", type=Path, help="baseline report to diff against")
+    args = parser.parse_args()
+
+    records = load_capture(args.capture)
+    if args.limit:
+        records = records[: args.limit]
+    if not records:
+        raise SystemExit("No replayable records in capture")
+
+    mocks = MockUpstreams(args.brain_ms, args.tts_base_ms, args.tts_ms_per_char, args.fail_rate, args.seed)
+    generate.run_chat_brain = mocks.run_chat_brain
+    generate.tts_service.synthesize = mocks.synthesize
+
+    report = asyncio.run(replay(records, args.speed, mocks))
+    report["capture"] = str(args.capture)
+    print(json.dumps(report, indent=1))
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=1))
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), report)
+
+
+if __name__ == "__main__":
+    main_cli()
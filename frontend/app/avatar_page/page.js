@@ -150,7 +150,7 @@ function AvatarViewer() {
 
       // Set audio for lip sync - ONLY play after response is generated, and ONLY ONCE
       if (result.audio) {
-        const audioSrc = `data:audio/mpeg;base64,${result.audio}`;
+        const audioSrc = `data:${result.audio_mime || 'audio/mpeg'};base64,${result.audio}`;
         
         // Stop any currently playing audio to prevent overlap
         if (audioRef.current) {
@@ -214,11 +214,12 @@ function AvatarViewer() {
       setCurrentBehavior('idle');
     } finally {
       setLoading(false);
-      // If no audio was provided, reset to idle after a short delay
+      // If no audio was inlined, reset to idle once the clip would have finished
+      // (duration precomputed by the backend), or after a short delay
       if (!result?.audio) {
         setTimeout(() => {
           setCurrentBehavior('idle');
-        }, 2000);
+        }, result?.signals?.audio_meta?.duration_ms || 2000);
       }
     }
   };
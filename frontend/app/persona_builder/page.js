@@ -148,7 +148,7 @@ export default function PersonaBuilder() {
             {response.audio && (
               <div style={{ marginTop: 20 }}>
                 <audio controls>
-                  <source src={`data:audio/mpeg;base64,${response.audio}`} type="audio/mpeg" />
+                  <source src={`data:${response.audio_mime || 'audio/mpeg'};base64,${response.audio}`} type={response.audio_mime || 'audio/mpeg'} />
                 </audio>
               </div>
             )}
@@ -21,7 +21,12 @@ if [ ! -f ".env" ]; then
 fi
 
 # Start the server
+# WORKERS>1 runs the multi-worker launcher (shared limits, metrics and prewarm)
 echo "Starting FastAPI backend on http://localhost:8000"
 echo "Press Ctrl+C to stop"
-uvicorn main:app --reload --port 8000
+if [ "${WORKERS:-1}" -gt 1 ]; then
+    PORT=8000 python serve.py
+else
+    uvicorn main:app --reload --port 8000
+fi
 